@@ -1,6 +1,9 @@
+from .backend import set_backend, get_backend
 from . import dca
 from . import filters
 from . import wiener
 from . import auth
 from . import schedule
-from . import cashflow
\ No newline at end of file
+from . import cashflow
+from . import summary
+from . import cache
\ No newline at end of file
@@ -0,0 +1,57 @@
+import os
+import warnings
+from enum import Enum
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+class BackendEnum(str, Enum):
+    numpy = 'numpy'
+    numba = 'numba'
+
+numba_available = numba is not None
+
+_settings = {'backend': BackendEnum.numpy}
+
+def set_backend(backend:str):
+    """set_backend Select the implementation of the hot loops in dca, wiener and filters.
+    The numba backend compiles the loops the first time they are called. If Numba is
+    not installed the numpy backend is kept.
+
+    Args:
+        backend (str): Either 'numpy' or 'numba'
+    """
+    backend = BackendEnum(backend)
+    if backend == BackendEnum.numba and not numba_available:
+        warnings.warn('numba is not installed. The numpy backend is used')
+        backend = BackendEnum.numpy
+    _settings['backend'] = backend
+
+def get_backend()->BackendEnum:
+    """get_backend Backend in use
+
+    Returns:
+        BackendEnum: Either 'numpy' or 'numba'
+    """
+    return _settings['backend']
+
+def use_numba()->bool:
+    return _settings['backend'] == BackendEnum.numba
+
+class jit:
+    """jit Wrap a loop kernel written for Numba nopython mode. It is compiled lazily the first
+    time it is called, so importing the package does not pay the compilation.
+    """
+    def __init__(self, func):
+        self.func = func
+        self._compiled = None
+
+    def __call__(self, *args):
+        if self._compiled is None:
+            self._compiled = numba.njit(cache=True)(self.func)
+        return self._compiled(*args)
+
+if os.environ.get('DCAPY_BACKEND'):
+    set_backend(os.environ['DCAPY_BACKEND'])
@@ -0,0 +1 @@
+from .cache import ForecastCache, stable_hash, set_cache, get_cache
@@ -0,0 +1,215 @@
+import os
+import json
+import hashlib
+from enum import Enum
+from datetime import date
+from collections import OrderedDict
+from typing import Union, Optional
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from ..cashflow import CashFlowBlock
+
+def _jsonable(obj):
+    if isinstance(obj, BaseModel):
+        return json.loads(obj.json())
+    if isinstance(obj, np.random.Generator):
+        obj = obj.bit_generator.seed_seq
+    if isinstance(obj, np.random.SeedSequence):
+        return {'entropy': str(obj.entropy), 'spawn_key': list(obj.spawn_key)}
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (date, pd.Period)):
+        return str(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+def stable_hash(*objs)->str:
+    """stable_hash Hash of the content of the objects, pydantic models, dates, seeds, numbers and
+    containers of them. It does not change between sessions, so it can address stored results.
+
+    Returns:
+        str: Hexadecimal sha1 digest
+    """
+    payload = json.dumps(objs, sort_keys=True, default=_jsonable)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def _nbytes(value:Union[pd.DataFrame,CashFlowBlock])->int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return int(value.values.nbytes + np.asarray(value.dates).nbytes)
+
+def _copy(value:Union[pd.DataFrame,CashFlowBlock]):
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return value.copy(update={'values': value.values.copy()})
+
+def _pack_index(index)->dict:
+    if isinstance(index, pd.PeriodIndex):
+        return {'index': index.asi8, 'index_freq': np.array(index.freqstr)}
+    return {'index': np.asarray(index)}
+
+def _unpack_index(arrays, name=None):
+    if 'index_freq' in arrays:
+        return pd.PeriodIndex(pd.arrays.PeriodArray(arrays['index'], dtype=pd.PeriodDtype(str(arrays['index_freq']))), name=name)
+    return pd.Index(arrays['index'], name=name)
+
+def _pack(value:Union[pd.DataFrame,CashFlowBlock])->dict:
+    if isinstance(value, pd.DataFrame):
+        arrays = {'kind': np.array('frame'), 'columns': np.array(list(value.columns), dtype=str),
+            'index_name': np.array('' if value.index.name is None else value.index.name)}
+        for i, c in enumerate(value.columns):
+            col = value[c].to_numpy()
+            arrays[f'col_{i}'] = col.astype(str) if col.dtype == object else col
+        arrays.update(_pack_index(value.index))
+        return arrays
+    arrays = {'kind': np.array('block'), 'name': np.array(value.name), 'freq': np.array(value.freq.value),
+        'names': np.array(value.names, dtype=str), 'targets': np.array([i.value for i in value.targets], dtype=str),
+        'values': value.values}
+    arrays.update(_pack_index(value.dates))
+    return arrays
+
+def _unpack(arrays)->Union[pd.DataFrame,CashFlowBlock]:
+    if str(arrays['kind']) == 'frame':
+        name = str(arrays['index_name']) or None
+        data = {}
+        for i, c in enumerate(arrays['columns']):
+            col = arrays[f'col_{i}']
+            data[str(c)] = col.astype(object) if col.dtype.kind == 'U' else col
+        return pd.DataFrame(data, index=_unpack_index(arrays, name=name))
+    dates = _unpack_index(arrays)
+    return CashFlowBlock(
+        name=str(arrays['name']), dates=dates if isinstance(dates, pd.PeriodIndex) else dates.values,
+        freq=str(arrays['freq']), names=arrays['names'].tolist(), targets=arrays['targets'].tolist(), values=arrays['values']
+    )
+
+class ForecastCache:
+    """ForecastCache Content addressed store of forecasts and cashflow blocks. The entries are kept in
+    memory in least recently used order up to max_bytes. If a directory is given every entry is also
+    written to disk as a npz file, so the results survive the session. The disk tier is only cleaned
+    by invalidate. The stored and returned values are copies.
+
+    Args:
+        max_bytes (int, optional): Memory budget. Defaults to 256 MB.
+        directory (str, optional): Directory of the disk tier. Defaults to None, memory only.
+    """
+    def __init__(self, max_bytes:int=2**28, directory:str=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key:str):
+        return key in self._entries or (self.directory is not None and os.path.exists(self._path(key)))
+
+    def _path(self, key:str)->str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def _store(self, key:str, value, nbytes:int):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, n) = self._entries.popitem(last=False)
+            self.nbytes -= n
+            self.evictions += 1
+
+    def get(self, key:str)->Optional[Union[pd.DataFrame,CashFlowBlock]]:
+        """get Stored value of a key. The memory tier is looked up first and the disk tier next
+
+        Args:
+            key (str): Key
+
+        Returns:
+            Optional[Union[pd.DataFrame,CashFlowBlock]]: Copy of the value. None if it is not stored
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy(self._entries[key][0])
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key), allow_pickle=False) as arrays:
+                value = _unpack(arrays)
+            self._store(key, value, _nbytes(value))
+            self.hits += 1
+            self.disk_hits += 1
+            return _copy(value)
+        self.misses += 1
+        return None
+
+    def put(self, key:str, value:Union[pd.DataFrame,CashFlowBlock]):
+        """put Store a value
+
+        Args:
+            key (str): Key
+            value (Union[pd.DataFrame,CashFlowBlock]): Forecast or cashflow block
+        """
+        value = _copy(value)
+        self._store(key, value, _nbytes(value))
+        if self.directory is not None:
+            tmp = self._path(key) + '.tmp'
+            with open(tmp, 'wb') as file:
+                np.savez(file, **_pack(value))
+            os.replace(tmp, self._path(key))
+
+    def invalidate(self, *keys:str):
+        """invalidate Remove the keys from both tiers. Without keys every entry is removed
+
+        Args:
+            keys (str): Keys to remove
+        """
+        if len(keys) == 0:
+            keys = list(self._entries.keys())
+            if self.directory is not None:
+                keys += [i[:-4] for i in os.listdir(self.directory) if i.endswith('.npz')]
+        for key in keys:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            if self.directory is not None and os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+
+    def stats(self)->dict:
+        """stats Counters of the cache
+
+        Returns:
+            dict: hits, disk_hits, misses, evictions, entries in memory and bytes in memory
+        """
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+            'evictions': self.evictions, 'entries': len(self._entries), 'nbytes': self.nbytes}
+
+_settings = {'cache': None}
+
+def set_cache(cache:Optional[ForecastCache]):
+    """set_cache Cache used by the generate_forecast and generate_cashflow methods of the periods.
+    Only reproducible results are cached, that is, deterministic models or probabilistic ones
+    with seed or ppf.
+
+    Args:
+        cache (Optional[ForecastCache]): Cache. None disables it
+    """
+    assert cache is None or isinstance(cache, ForecastCache)
+    _settings['cache'] = cache
+
+def get_cache()->Optional[ForecastCache]:
+    """get_cache Cache in use
+
+    Returns:
+        Optional[ForecastCache]: Cache. None if it is disabled
+    """
+    return _settings['cache']
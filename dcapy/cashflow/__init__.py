@@ -1 +1 @@
-from .cashflow import CashFlow, ChgPts, CashFlowModel, CashFlowParams, npv_cashflows, irr_cashflows
\ No newline at end of file
+from .cashflow import CashFlow, ChgPts, CashFlowModel, CashFlowParams, CashFlowBlock, cashflow_block, npv_cashflows, irr_cashflows, npv_matrix, irr_matrix, fcf_grid
\ No newline at end of file
@@ -2,13 +2,13 @@ from dcapy.dca.dca import ProbVar
 from pydantic import BaseModel, Field, validator
 from typing import Union, List, Optional
 from datetime import date
+import warnings
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
 import matplotlib.pyplot as plt 
 import seaborn as sns
 from enum import Enum
-from ..dca import converter_factor
+from ..dca import converter_factor, substream, is_stream
 from ..wiener import Brownian, MeanReversion, GeometricBrownian
 from ..dca import FreqEnum
 
@@ -123,7 +123,7 @@ class CashFlow(BaseModel):
 
         csh = self.get_cashflow(freq_output=freq_output)
 
-        irr = npf.irr(csh.values)
+        irr = irr_matrix(csh.values)[0]
 
         return irr
 
@@ -132,11 +132,7 @@ class CashFlow(BaseModel):
         rates = np.atleast_1d(rates)
         csh = self.get_cashflow(freq_output=freq_output)
 
-        npv_list = []
-        for i in rates:
-            npv_i = npf.npv(i,csh.values)
-            npv_list.append(npv_i)
-        return pd.DataFrame({'npv':npv_list}, index=rates)
+        return pd.DataFrame({'npv':npv_matrix(csh.values, rates)[0]}, index=rates)
 
 class TargetEnum(str, Enum):
     income = 'income'
@@ -176,19 +172,93 @@ class CashFlowParams(BaseModel):
         if isinstance(self.value,list):
             return self.value[i]
         if isinstance(self.value,ProbVar):
-            return self.value.get_sample(size=1, seed=seed, ppf=ppf)
+            if is_stream(seed) and ppf is None:
+                return np.atleast_1d(self.value.get_sample(size=i+1, seed=substream(seed,'value')))[i:i+1]
+            #Without a seed or a percentil the iterations are sliced from samples drawn at once
+            if ppf is not None or seed is not None or self.value.seed is not None:
+                return self.value.get_sample(size=1, seed=seed, ppf=ppf)
+            return self.value.take(slice(i,i+1))
         if isinstance(self.value,(Brownian,MeanReversion,GeometricBrownian)):
             df = self.value.generate(processes=i+1,freq_output=freq_output,interval=interval,seed=seed)
             idx = [i.to_timestamp().strftime('%Y-%m-%d') if ~isinstance(i,int) else i for i in df.index]
             return ChgPts(date=idx, value=df.iloc[:,i].values.tolist())
 
+    def _get_values(self, attr:str, n:int, seed:int=None, freq_output:str=None, ppf:float=None, interval:float=None):
+        v = getattr(self,attr)
+        if isinstance(v,float):
+            return np.full(n,v)
+        if isinstance(v,ChgPts):
+            return [v]*n
+        if isinstance(v,list):
+            v = [v[i] for i in range(n)]
+            return v if isinstance(v[0],ChgPts) else np.array(v, dtype=float)
+        if isinstance(v,ProbVar):
+            #A random stream draws every iteration from its own substream of the attribute
+            if is_stream(seed) and ppf is None:
+                return np.atleast_1d(v.get_sample(size=n, seed=substream(seed,attr)))
+            #With a seed or a percentil every iteration gets the same sample
+            if ppf is not None or seed is not None or v.seed is not None:
+                return np.full(n,v.get_sample(size=1, seed=seed, ppf=ppf))
+            return v.draw(n)
+        if isinstance(v,(Brownian,MeanReversion,GeometricBrownian)):
+            return v.generate(processes=n,freq_output=freq_output,interval=interval,seed=substream(seed,attr))
+
+    def get_values(self, n:int, seed:int=None, freq_output:str=None, ppf:float=None, interval:float=None):
+        """get_values Get the values of the param for n iterations at once
+
+        Args:
+            n (int): Number of iterations
+            seed (int, optional): Seed. Defaults to None.
+            freq_output (str, optional): Output frequency of Wiener processes. Defaults to None.
+            ppf (float, optional): Percentil. Defaults to None.
+            interval (float, optional): Interval of Wiener processes. Defaults to None.
+
+        Returns:
+            Union[np.ndarray,List[ChgPts],pd.DataFrame]: Array with shape (n,) for scalar values,
+            list of n ChgPts or a DataFrame with n columns for Wiener processes
+        """
+        return self._get_values('value', n, seed=seed, freq_output=freq_output, ppf=ppf, interval=interval)
+
+    def get_wis(self, n:int, seed:int=None, freq_output:str=None, ppf:float=None, interval:float=None):
+        """get_wis Get the working interest of the param for n iterations at once
+
+        Args:
+            n (int): Number of iterations
+            seed (int, optional): Seed. Defaults to None.
+            freq_output (str, optional): Output frequency of Wiener processes. Defaults to None.
+            ppf (float, optional): Percentil. Defaults to None.
+            interval (float, optional): Interval of Wiener processes. Defaults to None.
+
+        Returns:
+            Union[np.ndarray,List[ChgPts],pd.DataFrame]: Array with shape (n,) for scalar values,
+            list of n ChgPts or a DataFrame with n columns for Wiener processes
+        """
+        return self._get_values('wi', n, seed=seed, freq_output=freq_output, ppf=ppf, interval=interval)
+
+    def draw(self, n:int):
+        """draw Draw new samples of the probabilistic value and working interest for n iterations.
+        get_value and get_wi without seed slice them until they are drawn again, so every run
+        draws them once at the start.
+
+        Args:
+            n (int): Number of iterations
+        """
+        for v in [self.value, self.wi]:
+            if isinstance(v,ProbVar) and v.seed is None:
+                v.draw(n)
+
     def get_wi(self,i:int, seed:int=None, freq_output:str=None, interval:float=None, ppf=None):
         if isinstance(self.wi,(ChgPts,float)):
             return self.wi 
         if isinstance(self.wi,list):
             return self.wi[i]
         if isinstance(self.wi,ProbVar):
-            return self.wi.get_sample(size=1, seed=seed, ppf=ppf)
+            if is_stream(seed) and ppf is None:
+                return np.atleast_1d(self.wi.get_sample(size=i+1, seed=substream(seed,'wi')))[i:i+1]
+            #Without a seed or a percentil the iterations are sliced from samples drawn at once
+            if ppf is not None or seed is not None or self.wi.seed is not None:
+                return self.wi.get_sample(size=1, seed=seed, ppf=ppf)
+            return self.wi.take(slice(i,i+1))
         if isinstance(self.wi,(Brownian,MeanReversion,GeometricBrownian)):
             df = self.wi.generate(processes=i+1,freq_output=freq_output,interval=interval,seed=seed)
             idx = [i.to_timestamp().strftime('%Y-%m-%d') for i in df.index]
@@ -380,7 +450,7 @@ class CashFlowModel(BaseModel):
 
         fcf = self.fcf(freq_output=freq_output)
 
-        irr = npf.irr(fcf['fcf'].values)
+        irr = irr_matrix(fcf['fcf'].values)[0]
 
         return irr
 
@@ -389,16 +459,391 @@ class CashFlowModel(BaseModel):
         rates = np.atleast_1d(rates)
         fcf = self.fcf(freq_output=freq_output)
 
-        npv_list = []
-        for i in rates:
-            npv_i = npf.npv(i,fcf['fcf'].values)
-            npv_list.append(npv_i)
-        return pd.DataFrame({'npv':npv_list}, index=rates)
+        return pd.DataFrame({'npv':npv_matrix(fcf['fcf'].values, rates)[0]}, index=rates)
+
+
+class CashFlowBlock(BaseModel):
+    """CashFlowBlock Cashflows of many iterations stored as a single array with shape 
+    (cashflows, iterations, dates). Null values are the dates out of the span of a cashflow. 
+
+    Attributes:
+        name (str): Name of the block. The CashFlowModels are named as name_iteration
+        dates (Union[pd.PeriodIndex,np.ndarray]): Dates of the block
+        freq (FreqEnum): Frequency of the dates
+        names (List[str]): Name of every cashflow
+        targets (List[TargetEnum]): Target of every cashflow. income, opex or capex
+        values (np.ndarray): Cashflow values with shape (cashflows, iterations, dates)
+    """
+    name : str
+    dates : Union[pd.PeriodIndex,np.ndarray]
+    freq : FreqEnum = Field('M')
+    names : List[str]
+    targets : List[TargetEnum]
+    values : np.ndarray
+
+    class Config:
+        arbitrary_types_allowed = True
 
+    @property
+    def iterations(self)->int:
+        return self.values.shape[1]
+
+    def fcf(self)->np.ndarray:
+        """fcf Free cashflow of every iteration
+
+        Returns:
+            np.ndarray: Array with shape (iterations, dates)
+        """
+        return np.nansum(self.values, axis=0)
+
+    def fcf_matrix(self)->np.ndarray:
+        """fcf_matrix Free cashflow of every iteration shifted to start at the first date of 
+        the iteration, as the fcf of the materialized CashFlowModels do. The rows are padded with zeros
+
+        Returns:
+            np.ndarray: Array with shape (iterations, dates)
+        """
+        fcf = self.fcf()
+        valid = (~np.isnan(self.values)).any(axis=0)
+        first = np.where(valid.any(axis=1), valid.argmax(axis=1), 0)
+        cols = np.arange(fcf.shape[1]) + first[:,None]
+        return np.where(cols < fcf.shape[1], np.take_along_axis(fcf, np.minimum(cols, fcf.shape[1]-1), axis=1), 0.)
+
+    def npv(self, rates)->pd.DataFrame:
+        """npv Net present value of every iteration
+
+        Args:
+            rates (Union[float,list,np.ndarray]): Discount rates in the frequency of the block
+
+        Returns:
+            pd.DataFrame: npv indexed by the rates with the iteration column
+        """
+        return _npv_frame(npv_matrix(self.fcf_matrix(), rates), rates)
+
+    def irr(self)->pd.DataFrame:
+        """irr Internal rate of return of every iteration
+
+        Returns:
+            pd.DataFrame: irr of every iteration
+        """
+        return pd.DataFrame({'irr':irr_matrix(self.fcf_matrix())})
+
+    def to_models(self)->List[CashFlowModel]:
+        """to_models Materialize the block as a list of CashFlowModels, one per iteration
+
+        Returns:
+            List[CashFlowModel]: list of cashflow models
+        """
+        is_date_mode = isinstance(self.dates, pd.PeriodIndex)
+        freq = FreqEnum(self.freq)
+        valid = ~np.isnan(self.values)
+        list_models = []
+        for i in range(self.iterations):
+            cashflow_model_dict = {}
+            for k, (name, target) in enumerate(zip(self.names, self.targets)):
+                span = np.flatnonzero(valid[k,i])
+                if span.shape[0] == 0:
+                    continue
+                start, end = self.dates[span[0]], self.dates[span[-1]]
+                cashflow = CashFlow.construct(
+                    name = name,
+                    const_value = self.values[k,i,span[0]:span[-1]+1].tolist(),
+                    start = start.start_time.date() if is_date_mode else int(start),
+                    end = end.start_time.date() if is_date_mode else int(end),
+                    freq_input = freq,
+                    freq_output = freq
+                )
+                cashflow_model_dict.setdefault(TargetEnum(target).value,[]).append(cashflow)
+            list_models.append(CashFlowModel.construct(name=f'{self.name}_{i}', **cashflow_model_dict))
+        return list_models
+
+
+def _grid_positions(index, grid)->np.ndarray:
+    #Position of each index value in the grid. Dates are compared by their period ordinals
+    if isinstance(grid, pd.PeriodIndex):
+        return np.asarray(index.asi8) - grid[0].ordinal
+    return np.asarray(index, dtype=int) - int(grid[0])
+
+def _param_array(value, n:int, grid, freq_output:str, agg:str='mean'):
+    #Convert the values of a param for n iterations to either an array with shape (n,)
+    #or an array with shape (n, dates) aligned with the grid. Missing dates are null
+    if isinstance(value, np.ndarray):
+        return value
+    is_date_mode = isinstance(grid, pd.PeriodIndex)
+    if isinstance(value, pd.DataFrame):
+        idx = value.index.to_timestamp().to_period(freq_output) if is_date_mode else value.index
+        value = value.groupby(idx).agg(agg)
+        series_list = [value.iloc[:,i] for i in range(n)]
+    else:
+        series_list = []
+        for v in value:
+            idx = pd.to_datetime(v.date).to_period(freq_output) if is_date_mode else v.date
+            series_list.append(pd.Series(v.value, index=idx).groupby(level=0).agg(agg))
+    arr = np.full((n,len(grid)), np.nan)
+    for i, series in enumerate(series_list):
+        pos = _grid_positions(series.index, grid)
+        in_grid = (pos>=0) & (pos<len(grid))
+        arr[i,pos[in_grid]] = series.values[in_grid]
+    return arr
+
+def cashflow_block(forecast:pd.DataFrame, cashflow_params:List[CashFlowParams], name:str, csh_name:str=None,
+    freq_output:str='M', freq_input:str='D', seed:int=None, ppf:float=None)->CashFlowBlock:
+    """cashflow_block Evaluate the cashflow params over all the forecast iterations at once. The forecast 
+    columns are arranged as arrays with shape (iterations, dates) and multiplied by the broadcasted values
+    and working interests of the params.
+
+    Args:
+        forecast (pd.DataFrame): Forecast with the iteration column
+        cashflow_params (List[CashFlowParams]): Cashflow params
+        name (str): Name of the block
+        csh_name (str, optional): Suffix of the cashflows names. Defaults to name.
+        freq_output (str, optional): Output frequency. Defaults to 'M'.
+        freq_input (str, optional): Input frequency. Used on number mode. Defaults to 'D'.
+        seed (int, optional): Seed. Defaults to None.
+        ppf (float, optional): Percentil. Defaults to None.
+
+    Returns:
+        CashFlowBlock: Cashflows block
+    """
+    if csh_name is None:
+        csh_name = name
+    if len(cashflow_params)==0:
+        raise ValueError('No Cashflow Params are set')
+
+    is_date_mode = isinstance(forecast.index, pd.PeriodIndex)
+
+    #Broadcast the number of iterations between the forecast and the cashflows to be consistent.
+    #Example: If the Forecast have 10 iterations the cashflow params must have either 10 or 1 iterations.
+    forecast_iterations = forecast['iteration'].unique()
+    shapes = np.broadcast_shapes(len(forecast_iterations),*[p.iter for p in cashflow_params])
+    n = shapes[0]
+    iterate_new_shape = np.searchsorted(np.sort(forecast_iterations), forecast_iterations * np.ones(shapes))
+    forecast_iterations = np.sort(forecast_iterations)
+
+    #Dates grid. It is extended beyond the forecast to hold the cashflows defined by periods
+    ext = max([abs(p.periods) for p in cashflow_params if p.periods] + [0])
+    if is_date_mode:
+        index = forecast.index.asfreq(freq_output)
+        grid = pd.period_range(start=index.min(), periods=index.max().ordinal - index.min().ordinal + ext + 1, freq=freq_output)
+    else:
+        index = np.floor(forecast.index.values * converter_factor(freq_output,freq_input)).astype(int)
+        grid = np.arange(index.min(), index.max() + ext + 1)
+    D = len(grid)
+
+    #Forecast span per iteration
+    pos = _grid_positions(index, grid)
+    it = np.searchsorted(forecast_iterations, forecast['iteration'].values)
+    start = np.full(len(forecast_iterations), D)
+    end = np.full(len(forecast_iterations), -1)
+    np.minimum.at(start, it, pos)
+    np.maximum.at(end, it, pos)
+    start, end = start[iterate_new_shape], end[iterate_new_shape]
+    cols = np.arange(D)
+    span = (cols >= start[:,None]) & (cols <= end[:,None])
+
+    names, targets, values = [], [], []
+    for param in cashflow_params:
+        if param.multiply and param.multiply not in forecast.columns:
+            warnings.warn(f'{param.multiply} is not in forecast columns. {list(forecast.columns)}. param {param.name} is skipped')
+            continue
+        kw = dict(seed=substream(seed,param.name), freq_output=freq_output, ppf=ppf)
+        param_value = _param_array(param.get_values(n, **kw), n, grid, freq_output, agg=param.agg)
+        param_wi = _param_array(param.get_wis(n, **kw), n, grid, freq_output, agg=param.agg)
+        param_wi = param_wi if param_wi.ndim == 2 else param_wi[:,None]
+        freq_conv = converter_factor(param.freq_value,freq_output) if param.freq_value else 1
+
+        if param.multiply:
+            col = np.full((len(forecast_iterations),D), np.nan)
+            col[it,pos] = forecast[param.multiply].values
+            col = col[iterate_new_shape]
+            if param_value.ndim == 2:
+                csh = col * param_value * param_wi
+                if np.isnan(csh[span]).all():
+                    warnings.warn(f'param {param.name} array values not multiplied with forecast. There is no index match')
+            else:
+                csh = col * (param_value * freq_conv)[:,None] * param_wi
+            mask = span
+        elif param_value.ndim == 2:
+            csh = param_value * param_wi
+            mask = span
+        else:
+            csh = np.broadcast_to((param_value * freq_conv)[:,None] * param_wi, (n,D))
+            if param.periods and param.periods < 0:
+                # When the cashflow is at the end when abandoning a well
+                mask = (cols >= end[:,None]) & (cols < end[:,None] + (abs(param.periods) if is_date_mode else 1))
+            elif param.periods:
+                mask = (cols >= start[:,None]) & (cols < start[:,None] + param.periods)
+            else:
+                mask = span
+        csh = np.where(mask, np.nan_to_num(csh, nan=0.), np.nan)
+
+        names.append(f'{param.name}_{csh_name}')
+        targets.append(param.target)
+        values.append(csh)
+
+    return CashFlowBlock(
+        name=name, dates=grid, freq=freq_output, names=names, targets=targets, 
+        values=np.stack(values) if values else np.empty((0,n,D))
+    )
+
+
+def npv_matrix(fcf:np.ndarray, rates)->np.ndarray:
+    """npv_matrix Net present value of many cashflows and discount rates with a single matrix product. 
+    The first value of every cashflow is not discounted
+
+    Args:
+        fcf (np.ndarray): Cashflows with shape (iterations, periods)
+        rates (Union[float,list,np.ndarray]): Discount rates per period
+
+    Returns:
+        np.ndarray: Net present values with shape (iterations, rates)
+    """
+    fcf = np.atleast_2d(np.asarray(fcf, dtype=float))
+    rates = np.atleast_1d(np.asarray(rates, dtype=float))
+    discount = np.power(1 + rates[:,None], -np.arange(fcf.shape[1]))
+    return fcf @ discount.T
+
+def _irr_roots(fcf:np.ndarray)->np.ndarray:
+    #Roots of the cashflow polynomials as the eigenvalues of stacked companion matrices,
+    #grouped by polynomial degree. The root closest to zero is returned as numpy_financial.irr
+    irr = np.full(fcf.shape[0], np.nan)
+    nonzero = fcf != 0
+    first = nonzero.argmax(axis=1)
+    last = fcf.shape[1] - 1 - nonzero[:,::-1].argmax(axis=1)
+    degree = np.where(nonzero.any(axis=1), last - first, 0)
+
+    for d in np.unique(degree[degree>0]):
+        rows = np.flatnonzero(degree==d)
+        #Polynomial coefficients from the highest degree. Leading and trailing zeros stripped
+        p = np.take_along_axis(fcf[rows], first[rows,None] + np.arange(d+1), axis=1)[:,::-1]
+        companion = np.zeros((rows.shape[0],d,d))
+        companion[:,np.arange(1,d),np.arange(d-1)] = 1
+        companion[:,0,:] = -p[:,1:] / p[:,:1]
+        res = np.linalg.eigvals(companion)
+        mask = (res.imag == 0) & (res.real > 0)
+        with np.errstate(divide='ignore'):
+            rate = np.where(mask, 1/res.real - 1, np.inf)
+        closest = np.abs(rate).argmin(axis=1)
+        irr[rows] = np.where(mask.any(axis=1), rate[np.arange(rows.shape[0]),closest], np.nan)
+    return irr
+
+def _irr_bisection(fcf:np.ndarray, bound:float=30., iters:int=100):
+    #Bisection on u = -log(1+irr) for cashflows with a single positive root. The polynomial is
+    #evaluated on its reversed form when exp(u) > 1 so the powers never overflow.
+    t = np.arange(fcf.shape[1])
+    def npv_sign(u):
+        v = np.where(u[:,None] <= 0, fcf, fcf[:,::-1])
+        return np.sign(np.sum(v * np.exp(-np.abs(u)[:,None] * t), axis=1))
+    lo = np.full(fcf.shape[0], -bound)
+    hi = np.full(fcf.shape[0], bound)
+    sign_lo = npv_sign(lo)
+    bracketed = sign_lo * npv_sign(hi) < 0
+    for _ in range(iters):
+        mid = (lo + hi) / 2
+        same = npv_sign(mid) == sign_lo
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    return np.expm1(-(lo + hi) / 2), bracketed
+
+def irr_matrix(fcf:np.ndarray)->np.ndarray:
+    """irr_matrix Internal rate of return of many cashflows. As numpy_financial.irr, the solution 
+    closest to zero is returned and null when there is no real solution. Cashflows with a single sign change
+    have one solution, found by a batched bisection. The rest are solved from the roots of their polynomials.
+
+    Args:
+        fcf (np.ndarray): Cashflows with shape (iterations, periods)
+
+    Returns:
+        np.ndarray: Internal rates of return with shape (iterations,)
+    """
+    fcf = np.atleast_2d(np.asarray(fcf, dtype=float))
+    irr = np.full(fcf.shape[0], np.nan)
+
+    #Sign changes between consecutive non-zero values. By Descartes' rule of signs
+    #no sign change means no solution and one sign change means a single solution
+    signs = np.sign(fcf)
+    filled = np.maximum.accumulate(np.where(signs != 0, np.arange(fcf.shape[1]), 0), axis=1)
+    prev = np.take_along_axis(signs, np.concatenate([np.zeros((fcf.shape[0],1),dtype=int), filled[:,:-1]], axis=1), axis=1)
+    changes = np.sum((signs * prev) < 0, axis=1)
+
+    single = np.flatnonzero(changes == 1)
+    if single.shape[0] > 0:
+        rate, bracketed = _irr_bisection(fcf[single])
+        irr[single[bracketed]] = rate[bracketed]
+        single = single[~bracketed]
+
+    roots = np.concatenate([single, np.flatnonzero(changes > 1)])
+    if roots.shape[0] > 0:
+        irr[roots] = _irr_roots(fcf[roots])
+    return irr
+
+def _stack_fcf(list_cashflows:list, freq_output:str=None)->np.ndarray:
+    #Free cashflows of the models as rows of a matrix padded with zeros
+    list_fcf = [v.fcf(freq_output=freq_output)['fcf'].values for v in list_cashflows]
+    fcf = np.zeros((len(list_fcf), max([len(i) for i in list_fcf] + [0])))
+    for i,v in enumerate(list_fcf):
+        fcf[i,:len(v)] = v
+    return fcf
+
+def _cashflow_ordinals(cashflow:CashFlow, freq_output:str):
+    #Ordinals of the dates and values of a cashflow in the output frequency. Cashflows given as lists 
+    #in the output frequency, as the ones materialized from blocks, are read without building a Series
+    if isinstance(cashflow.const_value, list) and cashflow.chgpts is None and not cashflow.periods and FreqEnum(cashflow.freq_input) == FreqEnum(freq_output):
+        start = pd.Period(cashflow.start, freq=freq_output).ordinal if isinstance(cashflow.start, date) else int(cashflow.start)
+        return start + np.arange(len(cashflow.const_value)), np.asarray(cashflow.const_value, dtype=float)
+    series = cashflow.get_cashflow(freq_output=freq_output)
+    ordinals = series.index.asi8 if isinstance(series.index, pd.PeriodIndex) else np.asarray(series.index, dtype=int)
+    return np.asarray(ordinals), series.values.astype(float)
+
+def fcf_grid(list_cashflows:List[CashFlowModel], freq_output:str, targets:List[TargetEnum]=None):
+    """fcf_grid Free cashflow of the models on a continuous grid of dates in the output frequency, so the 
+    cashflows of different models can be added by their position. The cashflows shared by several models, 
+    like the general ones, are evaluated once.
+
+    Args:
+        list_cashflows (List[CashFlowModel]): Cashflow models
+        freq_output (str): Output frequency
+        targets (List[TargetEnum], optional): Targets to include. Defaults to None, income, opex and capex.
+
+    Returns:
+        Tuple[int,np.ndarray,np.ndarray]: Ordinal of the first date of the grid, free cashflow with shape 
+        (models, dates) and position of the first date of every model. Models without cashflows start at 
+        the end of the grid
+    """
+    targets = [TargetEnum(i).value for i in (targets or list(TargetEnum))]
+    evaluated = {}
+    rows = []
+    for model in list_cashflows:
+        row = []
+        for c in [c for t in targets for c in (getattr(model, t) or [])]:
+            if id(c) not in evaluated:
+                evaluated[id(c)] = _cashflow_ordinals(c, freq_output)
+            if evaluated[id(c)][0].shape[0] > 0:
+                row.append(evaluated[id(c)])
+        rows.append(row)
+
+    ordinals = [o for row in rows for o, _ in row]
+    if len(ordinals) == 0:
+        return 0, np.zeros((len(rows),0)), np.zeros(len(rows), dtype=int)
+    start = min(o.min() for o in ordinals)
+    size = max(o.max() for o in ordinals) - start + 1
+    fcf = np.zeros((len(rows), size))
+    first = np.full(len(rows), size)
+    for i, row in enumerate(rows):
+        for o, v in row:
+            fcf[i, o - start] += np.nan_to_num(v)
+            first[i] = min(first[i], o.min() - start)
+    return int(start), fcf, first
+
+def _npv_frame(npv:np.ndarray, rates)->pd.DataFrame:
+    rates = np.atleast_1d(rates)
+    return pd.DataFrame(
+        {'npv':npv.ravel(), 'iteration':np.repeat(np.arange(npv.shape[0]),rates.shape[0])}, 
+        index=np.tile(rates,npv.shape[0])
+    )
 
 def npv_cashflows(list_cashflows:list,rates, freq_rate:str,freq_cashflow:str):
     
-    npv_list = []
     rates = np.atleast_1d(rates)
 
     #Convert the Frequency of the rates to the cashflow frequency
@@ -408,32 +853,11 @@ def npv_cashflows(list_cashflows:list,rates, freq_rate:str,freq_cashflow:str):
     c = converter_factor(freq_rate,freq_cashflow)
     rates = np.power(1 + rates,c) - 1
 
-    for i,v in enumerate(list_cashflows):
-        npv_i = v.npv(rates,freq_output=freq_cashflow)
-        npv_i['iteration'] = i
-        npv_list.append(npv_i)
+    fcf = _stack_fcf(list_cashflows, freq_output=freq_cashflow)
 
-    return pd.concat(npv_list,axis=0)
+    return _npv_frame(npv_matrix(fcf, rates), rates)
 
 def irr_cashflows(list_cashflows, freq_output):
-		irr_list = []
-		for i,v in enumerate(list_cashflows):
-			irr_i = v.irr(freq_output=freq_output)
-			irr_list.append(irr_i)
-
-
-		return pd.DataFrame({'irr':irr_list})
-    
-
-
-
-
-
-
-
-
-
-
-
-    
+    fcf = _stack_fcf(list_cashflows, freq_output=freq_output)
 
+    return pd.DataFrame({'irr':irr_matrix(fcf)})
@@ -1,4 +1,4 @@
-from .arps import arps_exp_rate,arps_exp_cumulative,arps_arm_cumulative,arps_hyp_cumulative,arps_cumulative, arps_hyp_rate, arps_rate_time, arps_forecast,Arps
-from .dca import DCA, Forecast, ProbVar
-from .timeconverter import converter_factor, list_freq,time_converter_matrix, FreqEnum
-from .wor import bsw_to_wor, wor_to_bsw, wor_forecast, Wor
\ No newline at end of file
+from .arps import arps_exp_rate,arps_exp_cumulative,arps_arm_cumulative,arps_hyp_cumulative,arps_cumulative, arps_hyp_rate, arps_rate_time, arps_forecast, arps_rate_cumulative, arps_fit, arps_jacobian, arps_initial_guess, fit_arps_batch, Arps
+from .dca import DCA, Forecast, ProbVar, ExecutorEnum, chunk_sizes, chunk_seeds, frozen_dist, substream, set_legacy_seeds, get_legacy_seeds, worker_settings, init_worker, random_state, is_stream, SamplingEnum, uniform_design, design_ppfs
+from .timeconverter import converter_factor, converter_factors, to_ordinal, list_freq,time_converter_matrix, FreqEnum
+from .wor import bsw_to_wor, wor_to_bsw, wor_forecast, wor_forecast_batch, Wor
\ No newline at end of file
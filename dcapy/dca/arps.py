@@ -9,16 +9,18 @@ from scipy import stats
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pydantic import BaseModel, Field, Extra
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Iterator
 from rich.panel import Panel
 from rich.layout import Layout
 from rich.text import Text
 import yaml
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 #Local Imports
-from .dca import DCA, ProbVar
-from .timeconverter import list_freq, converter_factor, time_converter_matrix, check_value_or_prob, FreqEnum
+from .dca import DCA, ProbVar, ExecutorEnum, chunk_sizes, chunk_seeds, substream, worker_settings, init_worker, SamplingEnum, design_ppfs
+from .timeconverter import list_freq, converter_factor, time_converter_matrix, check_value_or_prob, FreqEnum, to_ordinal
 from ..filters import zscore, exp_wgh_avg
 from ..console import console
+from ..summary import Summary
 
 def arps_exp_rate(time_array:np.ndarray,qi:float,di:float)->np.ndarray:
     """arps_exp_rate Calculate the rate of Exponential, b=0, Arps Declination
@@ -102,6 +104,60 @@ def arps_arm_cumulative(time_array:np.ndarray,qi:float,di:float,b:float,ti=0)->n
     time_array = np.atleast_1d(time_array)
     return (qi/di)*np.log((di*time_array + 1)/(di*ti+1))
 
+def arps_params(time_array:Union[np.ndarray, list],qi:Union[np.ndarray,float],di:Union[np.ndarray,float],
+                 b:Union[np.ndarray,float],ti:Union[np.ndarray,float]=0.0)->tuple:
+    """arps_params Normalize the Arps parameters as column arrays, one row per iteration, and estimate the 
+    elapsed time since ti. Negative elapsed times are set to null.
+
+    Args:
+        time_array (Union[np.ndarray, list]): array of times to make forecast. Either shape (time,) or (iterations, time)
+        qi (Union[np.ndarray,float]): Initial Rate
+        di (Union[np.ndarray,float]): Nominal Declination Rate
+        b (Union[np.ndarray,float]): Arps Coefficient
+        ti (Union[np.ndarray,float], optional): Initial time at which is referenced the initial rate qi. Defaults to 0.0.
+
+    Returns:
+        tuple: time_diff with shape (iterations, time), qi, di and b with shape (iterations, 1)
+    """
+    qi, di, b, ti = [np.atleast_1d(i).reshape(-1,1) for i in [qi,di,b,ti]]
+    time_diff = np.atleast_1d(time_array).astype(float) - ti
+    time_diff[time_diff<0] = np.nan
+    shape = np.broadcast_shapes(time_diff.shape, qi.shape, di.shape, b.shape)
+    time_diff = np.broadcast_to(time_diff, shape)
+    qi, di, b = [np.broadcast_to(i,(shape[0],1)) for i in [qi,di,b]]
+    return time_diff, qi, di, b
+
+def arps_by_type(b:np.ndarray, exponential, hyperbolic, harmonic=None)->np.ndarray:
+    """arps_by_type Evaluate each row only with the formula of its declination type. The formulas are 
+    callables that receive the rows to evaluate as a boolean mask.
+
+    Args:
+        b (np.ndarray): Arps Coefficient with shape (iterations, 1)
+        exponential (callable): Formula for b=0
+        hyperbolic (callable): Formula for b>0. Used for b=1 when harmonic is None
+        harmonic (callable, optional): Formula for b=1. Defaults to None.
+
+    Returns:
+        np.ndarray: Evaluated array with shape (iterations, time)
+    """
+    b = b[:,0]
+    types = [(b==0, exponential)]
+    if harmonic is None:
+        types.append((b!=0, hyperbolic))
+    else:
+        types.extend([(b==1, harmonic), ((b!=0)&(b!=1), hyperbolic)])
+
+    f = None
+    for rows, formula in types:
+        if rows.all():
+            return formula(slice(None))
+        if rows.any():
+            values = formula(rows)
+            if f is None:
+                f = np.empty((b.shape[0],values.shape[1]))
+            f[rows] = values
+    return f
+
 #Arps Decline Curve
 def arps_forecast(time_array:Union[np.ndarray, list],qi:Union[np.ndarray,float],di:Union[np.ndarray,float],
                  b:Union[np.ndarray,float],
@@ -118,40 +174,12 @@ def arps_forecast(time_array:Union[np.ndarray, list],qi:Union[np.ndarray,float],
     Returns:
         np.ndarray: Production forecast in a numpy array
     """
-    params_dict = {
-        'qi': qi,
-        'di': di,
-        'b': b,
-        'ti': ti
-    }
-    #print(params_dict)
-    for i in params_dict:
-        if isinstance(params_dict[i],np.ndarray):
-            params_dict[i] = params_dict[i].reshape(-1,1)
-        else:
-            try:
-                # TODO Review atleast2D
-               params_dict[i] = np.atleast_2d(params_dict[i]).reshape(-1,1)
-            except Exception as e:
-                print(e)
-                raise
-    
-    time_diff = np.atleast_1d(time_array).astype(float) - params_dict['ti']
-    time_diff[time_diff<0] = np.nan
-    
-    f = np.where(
-        params_dict['b']==0,
-        arps_exp_rate(
-            time_diff,
-            params_dict['qi'],
-            params_dict['di'],
-        ),
-        arps_hyp_rate(
-            time_diff,
-            params_dict['qi'],
-            params_dict['di'],
-            params_dict['b']
-        )
+    time_diff, qi, di, b = arps_params(time_array,qi,di,b,ti)
+
+    f = arps_by_type(
+        b,
+        exponential = lambda r: arps_exp_rate(time_diff[r],qi[r],di[r]),
+        hyperbolic = lambda r: arps_hyp_rate(time_diff[r],qi[r],di[r],b[r]),
     )
     
     return np.squeeze(f.T)
@@ -171,38 +199,108 @@ def arps_cumulative(time_array:Union[np.ndarray, list],qi:Union[np.ndarray,float
     Returns:
         np.ndarray: Production cumulative forecast in a numpy array
     """
-    params_dict = {
-    'qi': qi,
-    'di': di,
-    'b': b,
-    'ti': ti
-    }
-    #print(params_dict)
-    for i in params_dict:
-        if isinstance(params_dict[i],np.ndarray):
-            params_dict[i] = params_dict[i].reshape(-1,1)
-        else:
-            try:
-                # TODO Review atleast2D
-               params_dict[i] = np.atleast_1d(params_dict[i]).reshape(-1,1)
-            except Exception as e:
-                print(e)
-                raise
-    
-    time_diff = np.atleast_1d(time_array).astype(float) - params_dict['ti']
-    time_diff[time_diff<0] = np.nan
-    
-    f = np.where(
-        params_dict['b']==0,
-        arps_exp_cumulative(time_diff,params_dict['qi'],params_dict['di']),
-        np.where(
-            params_dict['b']==1,
-            arps_arm_cumulative(time_diff,params_dict['qi'],params_dict['di'],params_dict['b']),
-            arps_hyp_cumulative(time_diff,params_dict['qi'],params_dict['di'],params_dict['b'])
-        ))
+    time_diff, qi, di, b = arps_params(time_array,qi,di,b,ti)
+
+    f = arps_by_type(
+        b,
+        exponential = lambda r: arps_exp_cumulative(time_diff[r],qi[r],di[r]),
+        harmonic = lambda r: arps_arm_cumulative(time_diff[r],qi[r],di[r],b[r]),
+        hyperbolic = lambda r: arps_hyp_cumulative(time_diff[r],qi[r],di[r],b[r])
+    )
       
     return np.squeeze(f.T)
 
+def _arps_rate_cum_rows(time_diff:np.ndarray, qi:np.ndarray, qi_cum:np.ndarray, di:np.ndarray, b:np.ndarray, 
+    decline:str, rate:np.ndarray, cum:np.ndarray, where=True):
+    #Evaluate rate and cumulative of rows with the same declination type in place. Only the rows in where are 
+    #written. The operations follow the same order of the individual rate and cumulative functions so the 
+    #results are identical
+    if decline == 'exponential':
+        np.multiply(-di, time_diff, out=rate, where=where)
+        np.exp(rate, out=rate, where=where)
+        np.subtract(1., rate, out=cum, where=where)
+        np.multiply(qi_cum/di, cum, out=cum, where=where)
+        np.multiply(qi, rate, out=rate, where=where)
+    elif decline == 'harmonic':
+        np.multiply(b*di, time_diff, out=rate, where=where)
+        np.add(1, rate, out=rate, where=where)
+        np.multiply(di, time_diff, out=cum, where=where)
+        np.add(cum, 1, out=cum, where=where)
+        np.log(cum, out=cum, where=where)
+        np.multiply(qi_cum/di, cum, out=cum, where=where)
+        np.power(rate, 1/b, out=rate, where=where)
+        np.divide(qi, rate, out=rate, where=where)
+    else:
+        np.multiply(b*di, time_diff, out=rate, where=where)
+        np.add(rate, 1, out=rate, where=where)
+        np.power(rate, (b-1)/b, out=cum, where=where)
+        np.subtract(cum, 1., out=cum, where=where)
+        np.multiply(qi_cum/(di*(b-1)), cum, out=cum, where=where)
+        np.power(rate, 1/b, out=rate, where=where)
+        np.divide(qi, rate, out=rate, where=where)
+
+def arps_rate_cumulative(time_array:Union[np.ndarray, list],qi:Union[np.ndarray,float],di:Union[np.ndarray,float],
+                 b:Union[np.ndarray,float],ti:Union[np.ndarray,float]=0.0, cum_factor:float=1., volume:bool=False, 
+                 out:tuple=None)->tuple:
+    """arps_rate_cumulative Estimate the rate and the cumulative forecast, and optionally the volume per period, 
+    in a single pass. The results are the same of arps_forecast and arps_cumulative but with shape (iterations, time), 
+    so flattening them gives the iterations one after the other without copies. The rows of every declination 
+    type are written directly into the outputs.
+
+    Args:
+        time_array (Union[np.ndarray, list]): array of times to make forecast
+        qi (Union[np.ndarray,float]): Initial Rate
+        di (Union[np.ndarray,float]): Nominal Declination Rate
+        b (Union[np.ndarray,float]): Arps Coefficient
+        ti (Union[np.ndarray,float], optional): Initial time at which is referenced the initial rate qi. Defaults to 0.0.
+        cum_factor (float, optional): Factor applied to qi for the cumulative. Defaults to 1.
+        volume (bool, optional): Estimate the volume per period as the gradient of the cumulative, null 
+            cumulatives taken as zero. Defaults to False.
+        out (tuple, optional): Arrays with shape (iterations, time) to store the rate, the cumulative and the volume. 
+            Reusing them between calls avoids allocating the outputs. Defaults to None.
+
+    Returns:
+        tuple: rate, cumulative and volume if requested
+    """
+    time_diff, qi, di, b = arps_params(time_array,qi,di,b,ti)
+    n_out = 3 if volume else 2
+    if out is None:
+        out = tuple(np.empty(time_diff.shape) for _ in range(n_out))
+    else:
+        assert len(out) >= n_out and all(i.shape == time_diff.shape for i in out[:n_out]), \
+            f'out must have {n_out} arrays with shape {time_diff.shape}'
+    rate, cum = out[0], out[1]
+    qi_cum = qi*cum_factor
+
+    b_rows = b[:,0]
+    for decline, rows in [('exponential',b_rows==0),('harmonic',b_rows==1),('hyperbolic',(b_rows!=0)&(b_rows!=1))]:
+        if rows.all():
+            _arps_rate_cum_rows(time_diff, qi, qi_cum, di, b, decline, rate, cum)
+            break
+        if rows.any():
+            #The coefficients of the rows of other types may divide by zero but they are not written
+            with np.errstate(divide='ignore', invalid='ignore'):
+                _arps_rate_cum_rows(time_diff, qi, qi_cum, di, b, decline, rate, cum, where=rows[:,None])
+
+    if not volume:
+        return rate, cum
+
+    vol = out[2]
+    assert cum.shape[1] >= 2, 'At least two time steps are required to estimate the volume'
+    #Null cumulatives are taken as zero in place and restored afterwards
+    nulls = np.isnan(cum)
+    has_nulls = nulls.any()
+    if has_nulls:
+        cum[nulls] = 0.
+    #Central differences as np.gradient with unit spacing
+    np.subtract(cum[:,2:], cum[:,:-2], out=vol[:,1:-1])
+    np.divide(vol[:,1:-1], 2., out=vol[:,1:-1])
+    np.subtract(cum[:,1], cum[:,0], out=vol[:,0])
+    np.subtract(cum[:,-1], cum[:,-2], out=vol[:,-1])
+    if has_nulls:
+        cum[nulls] = np.nan
+    return rate, cum, vol
+
 def arps_rate_time(qi:Union[np.ndarray,float],di:Union[np.ndarray,float],
                  b:Union[np.ndarray,float], rate:Union[int,float,np.ndarray],ti:Union[int,float,np.ndarray]=0)->int:
     """arps_rate_time Estimate the time at which the rate is reached given Arps parameters
@@ -231,6 +329,170 @@ def arps_rate_time(qi:Union[np.ndarray,float],di:Union[np.ndarray,float],
    
     return time_until.astype(int)
         
+def iteration_gradient(values:np.ndarray, iter:int)->np.ndarray:
+    """iteration_gradient Estimate the gradient of a flattened forecast column for every iteration at once. 
+    The column must be ordered by iteration, each one with the same number of time steps.
+
+    Args:
+        values (np.ndarray): Flattened column with shape (iter * time,)
+        iter (int): Number of iterations
+
+    Returns:
+        np.ndarray: Flattened gradient with the same shape of values
+    """
+    return np.gradient(np.asarray(values,dtype=float).reshape(iter,-1),axis=1).flatten()
+
+def iteration_cumsum(values:np.ndarray, iter:int, delta_time:Union[np.ndarray,float]=1)->np.ndarray:
+    """iteration_cumsum Estimate the cumulative of a flattened rate column multiplied by the time steps
+    for every iteration at once. Null values are skipped from the sum and kept as null in the output.
+
+    Args:
+        values (np.ndarray): Flattened rate column with shape (iter * time,)
+        iter (int): Number of iterations
+        delta_time (Union[np.ndarray,float], optional): Time steps with shape (time,). Defaults to 1.
+
+    Returns:
+        np.ndarray: Flattened cumulative with the same shape of values
+    """
+    volume = np.asarray(values,dtype=float).reshape(iter,-1) * delta_time
+    cum = np.nancumsum(volume,axis=1)
+    cum[np.isnan(volume)] = np.nan
+    return cum.flatten()
+
+def arps_jacobian(time_array:np.ndarray,qi:float,di:float,b:float)->np.ndarray:
+    """arps_jacobian Closed form partial derivatives of the Arps rate with respect to qi, di and b.
+
+    Args:
+        time_array (np.ndarray): Array of numbers that represents the periods of time
+        qi (float): Initial Rate
+        di (float): Nominal Declination Rate
+        b (float): Arps Coefficient
+
+    Returns:
+        np.ndarray: Jacobian with shape (time, 3). Columns are the derivatives with respect to qi, di and b
+    """
+    t = np.atleast_1d(time_array).astype(float)
+    x = di*t
+    y = b*x
+    if b == 0:
+        dq_dqi = np.exp(-x)
+        dq_ddi = -qi*t*dq_dqi
+    else:
+        dq_dqi = np.power(1+y,-1/b)
+        dq_ddi = -qi*t*dq_dqi/(1+y)
+    #d(ln q)/db = (ln(1+y) - y/(1+y))/b^2. A series expansion avoids the cancellation when y is close to zero
+    small = np.abs(y) < 1e-3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dlnq_db = np.where(
+            small,
+            np.square(x)*(1/2 - 2*y/3 + 3*np.square(y)/4),
+            (np.log1p(y) - y/(1+y))/np.square(b)
+        )
+    dq_db = qi*dq_dqi*dlnq_db
+    return np.column_stack([dq_dqi,dq_ddi,dq_db])
+
+def arps_initial_guess(time_array:np.ndarray, rate:np.ndarray, b_bounds:list=[0.,1.])->np.ndarray:
+    """arps_initial_guess Initial guess of qi, di and b from a log-linear regression of the rates
+
+    Args:
+        time_array (np.ndarray): Array of numbers that represents the periods of time
+        rate (np.ndarray): Rates
+        b_bounds (list, optional): Bounds for b parameter. Defaults to [0.,1.].
+
+    Returns:
+        np.ndarray: qi, di and b
+    """
+    positive = rate > 0
+    if positive.sum() < 2:
+        return np.array([np.max(rate, initial=1.), 1e-3, np.mean(b_bounds)])
+    slope, intercept = np.polyfit(time_array[positive], np.log(rate[positive]), 1)
+    return np.array([np.exp(intercept), max(-slope, 1e-8), np.mean(b_bounds)])
+
+def arps_fit(time:np.ndarray, rate:np.ndarray, b:float=None, filter=None, kw_filter:dict={}, beta:float=1, 
+    b_bounds:list=[0.,1.], p0:list=None)->dict:
+    """arps_fit Fit a production time series to the Arps Ecuation. The rates are smoothed by an exponential weighted 
+    average, the zero rates are filtered and optionally an anomaly detection filter is applied before the fit.
+    The least squares solver uses the closed form Jacobian and starts from either the given p0 or a log-linear
+    regression of the rates.
+
+    Args:
+        time (np.ndarray): Time array. Either numbers or dates
+        rate (np.ndarray): Rate array
+        b (float, optional): Fixed Arps Coefficient. If None it is fitted. Defaults to None.
+        filter (Union[str,callable], optional): Anomaly detection filter. Defaults to None.
+        kw_filter (dict, optional): Filter keyword arguments. Defaults to {}.
+        beta (float, optional): Exponential weighted average smoothing factor. If 1 there is no effect. Defaults to 1.
+        b_bounds (list, optional): Bounds for b parameter. Defaults to [0.,1.].
+        p0 (list, optional): Initial guess of qi, di in days and b, e.g. a previous fit. Defaults to None.
+
+    Returns:
+        dict: popt and pcov from curve_fit with the Declination Rate in days, ti, the smoothed rates, 
+        the filter array and the fit diagnostics: number of points used, function and jacobian evaluations, 
+        rmse and r2
+    """
+    x = np.asarray(time)
+    #Expotential weighted average. If beta is 1 there's no effect
+    y = pd.Series(rate).ewm(alpha=beta).mean().values
+
+    #Keep production greater than 0
+    zeros_filter_array = np.zeros(y.shape)
+    zeros_filter_array[y==0] = 1
+
+    #Apply filter 
+    anomaly_filter_array = np.zeros(x.shape)
+    if filter is not None:
+        if callable(filter):
+            anomaly_array = filter(x[zeros_filter_array==0],y[zeros_filter_array==0],**kw_filter)
+        elif isinstance(filter,str):
+            anomaly_array = eval(f'{filter}(x[zeros_filter_array==0],y[zeros_filter_array==0],**kw_filter)')
+
+        #Rebuild the full anomaly array with the original input shape
+        anomaly_filter_array[zeros_filter_array==0] = anomaly_array
+    
+    total_filter = zeros_filter_array + anomaly_filter_array
+
+    is_date = isinstance(x[0],(np.datetime64,date))
+    _x = to_ordinal(x) if is_date else x.astype(float)
+
+    #Apply the Filters
+    x_filter = _x[total_filter==0]-_x[total_filter==0][0]
+    y_filter = y[total_filter==0]
+
+    #Optimization process
+    evals = {'nfev':0, 'njev':0}
+    n_params = 3 if b is None else 2
+    def cost_function(_x,*p):
+        evals['nfev'] += 1
+        _b = p[2] if b is None else b
+        return arps_exp_rate(_x,p[0],p[1]) if _b == 0 else arps_hyp_rate(_x,p[0],p[1],_b)
+    def jac(_x,*p):
+        evals['njev'] += 1
+        return arps_jacobian(_x,p[0],p[1],p[2] if b is None else b)[:,:n_params]
+
+    lower, upper = np.array([0.,0.,b_bounds[0]]), np.array([np.inf,np.inf,b_bounds[1]])
+    if p0 is None:
+        p0 = arps_initial_guess(x_filter, y_filter, b_bounds=b_bounds)
+    p0 = np.clip(np.asarray(p0, dtype=float)[:n_params], lower[:n_params], upper[:n_params])
+    popt, pcov = curve_fit(cost_function, x_filter, y_filter, p0=p0, jac=jac, bounds=(lower[:n_params],upper[:n_params]))
+    nfev, njev = evals['nfev'], evals['njev']
+
+    residuals = y_filter - cost_function(x_filter, *popt)
+    ss_tot = np.sum(np.square(y_filter - y_filter.mean()))
+    ti = x[total_filter==0][0]
+
+    return {
+        'popt': popt,
+        'pcov': pcov,
+        'ti': pd.Timestamp(ti) if is_date else ti,
+        'rate_average': y,
+        'filter': total_filter,
+        'points': y_filter.shape[0],
+        'nfev': nfev,
+        'njev': njev,
+        'rmse': np.sqrt(np.mean(np.square(residuals))),
+        'r2': 1 - np.sum(np.square(residuals)) / ss_tot if ss_tot > 0 else np.nan
+    }
+
 class Arps(BaseModel,DCA):
     """Arps class represents an instance to store declination parameters to make forecast models in a shcedule model
     or a simple model. It supports time format as integers or dates
@@ -292,7 +554,7 @@ class Arps(BaseModel,DCA):
         if seed is None:
             seed = self.seed
         if isinstance(self.qi,ProbVar):
-            return self.qi.get_sample(size=size, ppf=ppf, seed=seed)
+            return self.qi.get_sample(size=size, ppf=ppf, seed=substream(seed,'qi'))
         else:
             return np.atleast_1d(self.qi)
 
@@ -310,7 +572,7 @@ class Arps(BaseModel,DCA):
         if seed is None:
             seed = self.seed
         if isinstance(self.di,ProbVar):
-            return self.di.get_sample(size=size, ppf=ppf, seed=seed)
+            return self.di.get_sample(size=size, ppf=ppf, seed=substream(seed,'di'))
         else:
             return np.atleast_1d(self.di)
             
@@ -328,7 +590,7 @@ class Arps(BaseModel,DCA):
         if seed is None:
             seed = self.seed
         if isinstance(self.b,ProbVar):
-            return self.b.get_sample(size=size, ppf=ppf, seed=None)
+            return self.b.get_sample(size=size, ppf=ppf, seed=substream(seed,'b'))
         else:
             return np.atleast_1d(self.b)
         
@@ -385,25 +647,11 @@ class Arps(BaseModel,DCA):
 
         return arps_rate_time(qi,di,b,rate, ti=ti)
     
-    def forecast(self,time_list:Union[pd.Series,np.ndarray]=None,start:Union[date,float]=None, end:Union[date,float]=None, rate_limit:float=None,
-                 cum_limit:float=None, freq_input:str='D', freq_output:str='M', iter:int=1,ppf=None,seed=None, **kwargs)->pd.DataFrame:
-        """forecast [summary]
-
-        Args:
-            time_list (Union[pd.Series,np.ndarray], optional): [description]. Defaults to None.
-            start (Union[date,float], optional): [description]. Defaults to None.
-            end (Union[date,float], optional): [description]. Defaults to None.
-            rate_limit (float, optional): [description]. Defaults to None.
-            cum_limit (float, optional): [description]. Defaults to None.
-            freq_input (str, optional): [description]. Defaults to 'D'.
-            freq_output (str, optional): [description]. Defaults to 'M'.
-            iter (int, optional): [description]. Defaults to 1.
-            ppf ([type], optional): [description]. Defaults to None.
-
-        Returns:
-            pd.DataFrame: [description]
+    def _time_arrays(self, time_list:Union[pd.Series,np.ndarray]=None, start:Union[date,float]=None, 
+        end:Union[date,float]=None, freq_input:str='D', freq_output:str='M'):
+        """_time_arrays Time range of a forecast, the time array relative to the earliest ti, 
+        the delay of every ti and the factor that converts di to the time array units.
         """
-        
         #If the Instance format is date perform operations to convert
         # the dates to ordinal and estimate the production rates
         if self.format() == 'date':
@@ -418,10 +666,9 @@ class Arps(BaseModel,DCA):
                 assert all(isinstance(i,date) for i in [start,end])
                 time_list = pd.period_range(start=start, end=end, freq=freq_output)
 
-            ti_array = np.array([i.toordinal() for i in np.atleast_1d(self.ti)], dtype=int)
+            ti_array = to_ordinal(np.atleast_1d(self.ti))
             time_range = pd.Series(time_list)
-            time_array = time_range.apply(lambda x: x.to_timestamp().toordinal()) - ti_array.min()
-            time_array = time_array.values
+            time_array = to_ordinal(time_range) - ti_array.min()
             
             ti_delta = ti_array - ti_array.min()
             di_factor = converter_factor(self.freq_di,'D')
@@ -443,10 +690,42 @@ class Arps(BaseModel,DCA):
             time_range = time_list
             di_factor = converter_factor(self.freq_di,freq_input)
 
+        return time_range, time_array, ti_delta, di_factor
+
+    def forecast(self,time_list:Union[pd.Series,np.ndarray]=None,start:Union[date,float]=None, end:Union[date,float]=None, rate_limit:float=None,
+                 cum_limit:float=None, freq_input:str='D', freq_output:str='M', iter:int=1,ppf=None,seed=None, sampling:SamplingEnum=None, 
+                 out:tuple=None, **kwargs)->pd.DataFrame:
+        """forecast [summary]
+
+        Args:
+            time_list (Union[pd.Series,np.ndarray], optional): [description]. Defaults to None.
+            start (Union[date,float], optional): [description]. Defaults to None.
+            end (Union[date,float], optional): [description]. Defaults to None.
+            rate_limit (float, optional): [description]. Defaults to None.
+            cum_limit (float, optional): [description]. Defaults to None.
+            freq_input (str, optional): [description]. Defaults to 'D'.
+            freq_output (str, optional): [description]. Defaults to 'M'.
+            iter (int, optional): [description]. Defaults to 1.
+            ppf ([type], optional): [description]. Defaults to None.
+            sampling (SamplingEnum, optional): Sampling strategy of the probabilistic params. Either 'random', 
+                'lhs', 'sobol' or 'halton'. Defaults to None, random.
+            out (tuple, optional): Arrays for the rate, the cumulative and the volume with at least as many rows as 
+                iterations and columns as time steps. Their leading blocks are used as the outputs of 
+                arps_rate_cumulative, so they can be reused between calls. Defaults to None.
+
+        Returns:
+            pd.DataFrame: [description]
+        """
         
-        qi = self.get_qi(size=iter, ppf=ppf, seed=seed)
-        di = self.get_di(size=iter, ppf=ppf, seed=seed)*di_factor
-        b = self.get_b(size=iter, ppf=ppf,seed=seed).round(decimals=2)
+        time_range, time_array, ti_delta, di_factor = self._time_arrays(
+            time_list=time_list, start=start, end=end, freq_input=freq_input, freq_output=freq_output
+        )
+
+        seed = self.seed if seed is None else seed
+        ppf_qi, ppf_di, ppf_b = design_ppfs([self.qi,self.di,self.b], iter, sampling=sampling, seed=seed, ppf=ppf)
+        qi = self.get_qi(size=iter, ppf=ppf_qi, seed=seed)
+        di = self.get_di(size=iter, ppf=ppf_di, seed=seed)*di_factor
+        b = self.get_b(size=iter, ppf=ppf_b,seed=seed).round(decimals=2)
         
         iter = np.array([i.shape[0] for i in [qi,di,b,ti_delta]]).max()
 
@@ -461,20 +740,31 @@ class Arps(BaseModel,DCA):
                 time_array = np.tile(time_array,(iter,1)).astype('float')
                 time_array[~time_index] = np.nan
         cum_factor = converter_factor('D',freq_input) if self.format() == 'number' else 1
-        _forecast = arps_forecast(time_array,qi,di,b,ti=ti_delta).flatten('F')
-        _cumulative = arps_cumulative(time_array,qi*cum_factor,di,b,ti=ti_delta).flatten('F')
-        _iterations = np.repeat(np.arange(0,iter),_forecast.shape[0]/iter) #if n is not None else np.zeros(_forecast.shape)
+        if out is not None:
+            out = tuple(i[:iter,:np.shape(time_array)[-1]] for i in out)
+        _forecast, _cumulative, _volume = arps_rate_cumulative(time_array,qi,di,b,ti=ti_delta,cum_factor=cum_factor,volume=True,out=out)
+        _iterations = np.repeat(np.arange(0,iter),_forecast.size/iter) #if n is not None else np.zeros(_forecast.shape)
+        #The DataFrame copies the columns, so the outputs can be reused
         _forecast_df = pd.DataFrame(
             {
-                'oil_rate':np.squeeze(_forecast),
-                'oil_cum':np.squeeze(_cumulative),
-                'iteration':_iterations
+                'oil_rate':_forecast.ravel(),
+                'oil_cum':_cumulative.ravel(),
+                'iteration':_iterations,
+                'oil_volume':_volume.ravel()
             },
-                index=np.tile(time_range,iter) #if n is not None else time_range)
+                index=pd.Index(time_range)[np.tile(np.arange(len(time_range)),iter)] #if n is not None else time_range)
         )
         _forecast_df.index.name='date'
-        for i in _forecast_df['iteration'].unique():
-            _forecast_df.loc[_forecast_df['iteration']==i,'oil_volume'] = np.gradient(_forecast_df.loc[_forecast_df['iteration']==i,'oil_cum'].fillna(0).values)
+
+        #Time steps between consecutive rows. Every iteration shares the same time range
+        #so they are estimated only once and broadcasted to all iterations
+        if any([i is not None for i in [self.fluid_rate,self.bsw,self.wor,self.gor,self.glr]]):
+            if self.format() == 'date':
+                delta_time = np.diff(to_ordinal(time_range))
+                delta_time = np.append(0,delta_time)
+            else:
+                delta_time = np.diff(time_range,prepend=0)
+            delta_time = delta_time * cum_factor
                 
         #Water Rate
         if any([i is not None for i in [self.fluid_rate,self.bsw,self.wor]]):
@@ -495,18 +785,10 @@ class Arps(BaseModel,DCA):
                 _forecast_df['water_rate'] = (_forecast_df['bsw']*_forecast_df['oil_rate'])/(1-_forecast_df['bsw'])
                 _forecast_df['fluid_rate'] = _forecast_df['oil_rate'] + _forecast_df['water_rate']
             
-            for i in _forecast_df['iteration'].unique():
-                _f_index = _forecast_df.loc[_forecast_df['iteration']==i].index
-                if self.format() == 'date':
-                    delta_time = np.diff(pd.Series(_f_index.to_timestamp()).apply(lambda x: x.toordinal()))
-                    delta_time = np.append(0,delta_time)
-                else:
-                    delta_time = np.diff(_f_index,prepend=0)
-                    
-                _forecast_df.loc[_forecast_df['iteration']==i,'water_cum'] = _forecast_df.loc[_forecast_df['iteration']==i,'water_rate'].multiply(cum_factor).multiply(delta_time).cumsum()
-                _forecast_df.loc[_forecast_df['iteration']==i,'fluid_cum'] = _forecast_df.loc[_forecast_df['iteration']==i,'fluid_rate'].multiply(cum_factor).multiply(delta_time).cumsum()                
-                _forecast_df.loc[_forecast_df['iteration']==i,'water_volume'] = np.gradient(_forecast_df.loc[_forecast_df['iteration']==i,'water_cum'].values)
-                _forecast_df.loc[_forecast_df['iteration']==i,'fluid_volume'] = np.gradient(_forecast_df.loc[_forecast_df['iteration']==i,'fluid_cum'].values) 
+            _forecast_df['water_cum'] = iteration_cumsum(_forecast_df['water_rate'].values,iter,delta_time)
+            _forecast_df['fluid_cum'] = iteration_cumsum(_forecast_df['fluid_rate'].values,iter,delta_time)
+            _forecast_df['water_volume'] = iteration_gradient(_forecast_df['water_cum'].values,iter)
+            _forecast_df['fluid_volume'] = iteration_gradient(_forecast_df['fluid_cum'].values,iter)
         #Gas Rate
         if any([i is not None for i in [self.gor,self.glr]]):
                               
@@ -518,21 +800,113 @@ class Arps(BaseModel,DCA):
                 _forecast_df['gas_rate'] = _forecast_df['fluid_rate'] * _forecast_df['glr']
                 _forecast_df['gor'] = _forecast_df['gas_rate'] / _forecast_df['oil_rate']
             
-            for i in _forecast_df['iteration'].unique():
-                _f_index = _forecast_df.loc[_forecast_df['iteration']==i].index
-                if self.format() == 'date':
-                    delta_time = np.diff(pd.Series(_f_index.to_timestamp()).apply(lambda x: x.toordinal()))
-                    delta_time = np.append(0,delta_time)
-                else:
-                    delta_time = np.diff(_f_index,prepend=0)
-                    
-                _forecast_df.loc[_forecast_df['iteration']==i,'gas_cum'] = _forecast_df.loc[_forecast_df['iteration']==i,'gas_rate'].multiply(cum_factor).multiply(delta_time).cumsum()
-                _forecast_df.loc[_forecast_df['iteration']==i,'gas_volume'] = np.gradient(_forecast_df.loc[_forecast_df['iteration']==i,'gas_cum'].values)
+            _forecast_df['gas_cum'] = iteration_cumsum(_forecast_df['gas_rate'].values,iter,delta_time)
+            _forecast_df['gas_volume'] = iteration_gradient(_forecast_df['gas_cum'].values,iter)
 
         return _forecast_df.dropna(axis=0,subset=['oil_rate'])
 
+    def forecast_chunks(self,time_list:Union[pd.Series,np.ndarray]=None,start:Union[date,float]=None, end:Union[date,float]=None, 
+        rate_limit:float=None, cum_limit:float=None, freq_input:str='D', freq_output:str='M', iter:int=1, chunksize:int=10000,
+        ppf=None,seed=None, out:tuple=None, **kwargs)->Iterator[pd.DataFrame]:
+        """forecast_chunks Generate the forecast of iter iterations in chunks of at most chunksize iterations, 
+        so only one chunk is in memory at a time. Each chunk is the forecast DataFrame of its iterations,
+        numbered from the first iteration of the chunk. The chunks are sampled with independent seeds
+        spawned from seed. If no parameter is probabilistic the whole forecast is a single chunk. The rate, 
+        cumulative and volume of every chunk are written into the same buffers.
+
+        Args:
+            time_list (Union[pd.Series,np.ndarray], optional): Forecast time list. Defaults to None.
+            start (Union[date,float], optional): Forecast start. Defaults to None.
+            end (Union[date,float], optional): Forecast end. Defaults to None.
+            rate_limit (float, optional): Economic rate limit. Defaults to None.
+            cum_limit (float, optional): Cumulative limit. Defaults to None.
+            freq_input (str, optional): Input frequency. Defaults to 'D'.
+            freq_output (str, optional): Output frequency. Defaults to 'M'.
+            iter (int, optional): Number of iterations. Defaults to 1.
+            chunksize (int, optional): Maximum iterations per chunk. Defaults to 10000.
+            ppf (float, optional): Percentil. Defaults to None.
+            seed (int, optional): Seed. Defaults to None.
+            out (tuple, optional): Buffers for the rate, the cumulative and the volume with at least chunksize rows 
+                and as many columns as time steps. Defaults to None, allocated once for all the chunks.
+
+        Yields:
+            Iterator[pd.DataFrame]: Forecast of every chunk
+        """
+        kw = dict(time_list=time_list, start=start, end=end, rate_limit=rate_limit, cum_limit=cum_limit, 
+            freq_input=freq_input, freq_output=freq_output, ppf=ppf, **kwargs)
+
+        if ppf is not None or not any(isinstance(i,ProbVar) for i in [self.qi,self.di,self.b]):
+            yield self.forecast(iter=iter, seed=seed, **kw)
+            return
+
+        sizes = chunk_sizes(iter, chunksize)
+        seeds = chunk_seeds(self.seed if seed is None else seed, len(sizes))
+        if out is None:
+            _, time_array, _, _ = self._time_arrays(time_list=time_list, start=start, end=end, freq_input=freq_input, freq_output=freq_output)
+            out = tuple(np.empty((sizes[0], np.shape(time_array)[-1])) for _ in range(3))
+        first = 0
+        for size, chunk_seed in zip(sizes, seeds):
+            _forecast_df = self.forecast(iter=size, seed=chunk_seed, out=out, **kw)
+            _forecast_df['iteration'] += first
+            first += size
+            yield _forecast_df
+
+    def forecast_summary(self,time_list:Union[pd.Series,np.ndarray]=None,start:Union[date,float]=None, end:Union[date,float]=None, 
+        rate_limit:float=None, cum_limit:float=None, freq_input:str='D', freq_output:str='M', iter:int=1, chunksize:int=10000,
+        columns:List[str]=['oil_rate','oil_cum'], quantiles:List[float]=[0.1,0.5,0.9], compression:int=200, keep:bool=False,
+        ppf=None,seed=None, **kwargs)->Summary:
+        """forecast_summary Reduce the forecast chunks on the fly into running means and percentiles per date 
+        and the EUR distribution, so the memory is bounded by the chunk size no matter how many iterations 
+        are requested. The EUR of each iteration is its maximum oil cumulative,
+        which is the last one reported before the limits, as the cumulative does not decrease.
+
+        Args:
+            time_list (Union[pd.Series,np.ndarray], optional): Forecast time list. Defaults to None.
+            start (Union[date,float], optional): Forecast start. Defaults to None.
+            end (Union[date,float], optional): Forecast end. Defaults to None.
+            rate_limit (float, optional): Economic rate limit. Defaults to None.
+            cum_limit (float, optional): Cumulative limit. Defaults to None.
+            freq_input (str, optional): Input frequency. Defaults to 'D'.
+            freq_output (str, optional): Output frequency. Defaults to 'M'.
+            iter (int, optional): Number of iterations. Defaults to 1.
+            chunksize (int, optional): Maximum iterations per chunk. Defaults to 10000.
+            columns (List[str], optional): Forecast columns to summarize. Defaults to ['oil_rate','oil_cum'].
+            quantiles (List[float], optional): Reported quantiles. Defaults to [0.1,0.5,0.9].
+            compression (int, optional): Compression of the quantile sketches. Defaults to 200.
+            keep (bool, optional): Keep the values of every iteration. Defaults to False.
+            ppf (float, optional): Percentil. Defaults to None.
+            seed (int, optional): Seed. Defaults to None.
+
+        Returns:
+            Summary: Summary of the columns by date and of the 'eur' 
+        """
+        time_range = self._time_arrays(time_list=time_list, start=start, end=end, freq_input=freq_input, freq_output=freq_output)[0]
+        dates = pd.Index(time_range).unique()
+
+        summary = Summary(quantiles=quantiles, compression=compression, keep=keep)
+        for _forecast_df in self.forecast_chunks(time_list=time_list, start=start, end=end, rate_limit=rate_limit, 
+            cum_limit=cum_limit, freq_input=freq_input, freq_output=freq_output, iter=iter, chunksize=chunksize, 
+            ppf=ppf, seed=seed, **kwargs):
+
+            #Scatter the long chunk into (iterations, dates) matrices
+            iterations = _forecast_df['iteration'].values
+            rows = iterations - iterations.min()
+            cols = dates.get_indexer(_forecast_df.index)
+            n = rows.max() + 1
+            for c in set(columns) | {'oil_cum'}:
+                matrix = np.full((n, dates.shape[0]), np.nan)
+                matrix[rows, cols] = _forecast_df[c].values
+                if c in columns:
+                    summary.update(c, matrix, index=dates)
+                if c == 'oil_cum':
+                    eur = np.fmax.reduce(matrix, axis=1)
+            summary.update('eur', eur)
+
+        return summary
+
     def fit(self,df:pd.DataFrame=None,time:Union[str,np.ndarray,pd.Series]=None,
-            rate:Union[str,np.ndarray,pd.Series]=None,b:float=None, filter=None,kw_filter={},prob=False, beta=1,b_bounds=[0.,1.]):
+            rate:Union[str,np.ndarray,pd.Series]=None,b:float=None, filter=None,kw_filter={},prob=False, beta=1,b_bounds=[0.,1.],
+            warm_start:bool=False):
         """fit fit a production time series to a parameterized Arps Ecuation. Optionally,
         a anomaly detection filter can be passed. It returns an Arps Instance with the fitted
         attributes.
@@ -547,6 +921,7 @@ class Arps(BaseModel,DCA):
             prob (bool, optional): [description]. Defaults to False.
             beta (int, optional): [description]. Defaults to 0.
             b_bounds (list): bounds for b parameter
+            warm_start (bool): Start the solver from the current qi, di and b of the instance. Defaults to False.
         Returns:
             [type]: [description]
         """
@@ -557,68 +932,24 @@ class Arps(BaseModel,DCA):
         x = df[time].values if isinstance(time,str) else time 
         yb = df[rate].values if isinstance(rate,str) else rate
         di_factor = converter_factor('D', self.freq_di)
-        #Expotential weighted average. If beta is 1 there's no effect
-        y = pd.Series(yb).ewm(alpha=beta).mean().values
-
-        #Keep production greater than 0
-        zeros_filter_array = np.zeros(y.shape)
-        zeros_filter_array[y==0] = 1
-
-        #Apply filter 
-        anomaly_filter_array = np.zeros(x.shape)
-        if filter is not None:
-            if callable(filter):
-                anomaly_array = filter(x[zeros_filter_array==0],y[zeros_filter_array==0],**kw_filter)
-            elif isinstance(filter,str):
-                anomaly_array = eval(f'{filter}(x[zeros_filter_array==0],y[zeros_filter_array==0],**kw_filter)')
-
-            #Rebuild the full anomaly array with the original input shape
-            anomaly_filter_array[zeros_filter_array==0] = anomaly_array
-        
-        total_filter = zeros_filter_array + anomaly_filter_array
-        
+
+        p0 = None
+        if warm_start and all(isinstance(i,(int,float)) for i in [self.qi,self.di,self.b]):
+            p0 = [self.qi, self.di/di_factor, self.b]
+
+        result = arps_fit(x, yb, b=b, filter=filter, kw_filter=kw_filter, beta=beta, b_bounds=b_bounds, p0=p0)
+        popt, pcov = result['popt'], result['pcov']
+
+        #Assign the results to the Class
+        self.qi = {'dist':'norm','kw':{'loc':popt[0],'scale':np.sqrt(np.diag(pcov)[0])}} if prob else popt[0] 
+        self.di = {'dist':'norm','kw':{'loc':popt[1]*di_factor,'scale':np.sqrt(np.diag(pcov)[1])*di_factor}} if prob else popt[1]*di_factor
         if b is None:
-            def cost_function(_x,_qi,_di,_b):
-                return arps_forecast(_x,_qi,_di,_b)
-            if isinstance(x[0],(np.datetime64,date)):
-                _x = np.array([pd.Timestamp(i).toordinal() for i in x])
-            else:
-                _x = x.astype(float)
-
-
-            #Apply the Filters
-            x_filter = _x[total_filter==0]-_x[total_filter==0][0]
-            y_filter = y[total_filter==0]
-                       
-            #Optimization process
-            popt, pcov = curve_fit(cost_function, x_filter, y_filter, bounds=([0.,0.,b_bounds[0]], [np.inf, np.inf, b_bounds[1]]))
-            #Assign the results to the Class
-            self.qi = {'dist':'norm','kw':{'loc':popt[0],'scale':np.sqrt(np.diag(pcov)[0])}} if prob else popt[0] 
-            self.di = {'dist':'norm','kw':{'loc':popt[1]*di_factor,'scale':np.sqrt(np.diag(pcov)[1])*di_factor}} if prob else popt[1]*di_factor
             self.b = {'dist':'norm','kw':{'loc':popt[2],'scale':np.sqrt(np.diag(pcov)[2])}} if prob else popt[2]
-            self.ti = pd.Timestamp(x[total_filter==0][0]) if isinstance(x[total_filter==0][0],(np.datetime64,date)) else x[total_filter==0][0]
-        else:
-            def cost_function(x,qi,di):
-                return arps_forecast(x,qi,di,b)
-            if isinstance(x[0],(np.datetime64,date)):
-                _x = np.array([pd.Timestamp(i).toordinal() for i in x])
-            else:
-                _x = x.astype(float)
-
-             
-            #Apply the Filters   
-            x_filter = _x[total_filter==0]-_x[total_filter==0][0]
-            y_filter = y[total_filter==0]
-            
-            #Optimization process
-            popt, pcov = curve_fit(cost_function, x_filter, y_filter, bounds=(0.0, [np.inf, np.inf]))
-            #Assign the results to the Class
-            self.qi = {'dist':'norm','kw':{'loc':popt[0],'scale':np.sqrt(np.diag(pcov)[0])}} if prob else popt[0] 
-            self.di = {'dist':'norm','kw':{'loc':popt[1]*di_factor,'scale':np.sqrt(np.diag(pcov)[1])*di_factor}} if prob else popt[1]*di_factor
-            self.ti = pd.Timestamp(x[total_filter==0][0]) if isinstance(x[total_filter==0][0],(np.datetime64,date)) else x[total_filter==0][0]
+        self.ti = result['ti']
+        if b is not None:
             self.b = b
             
-        return pd.DataFrame({'time':x,'oil_rate_average':y,'oil_rate':yb,'filter':total_filter})[1:]
+        return pd.DataFrame({'time':x,'oil_rate_average':result['rate_average'],'oil_rate':yb,'filter':result['filter']})[1:]
         
     def plot(self, start:Union[float,date]=None, end:Union[float,date]=None,
              freq_input:str='D',freq_output:str='M',rate_limit:float=None,
@@ -687,3 +1018,93 @@ class Arps(BaseModel,DCA):
         if cum:
             cumax=dax.twinx()
             cumax.plot(f['time_axis'],f['oil_cum'],**cum_kw)  
+
+
+def _fit_well(name, time:np.ndarray, rate:np.ndarray, freq_di:str, prob:bool, kw:dict, p0:list=None):
+    try:
+        result = arps_fit(time, rate, p0=p0, **kw)
+    except (RuntimeError, ValueError, TypeError, IndexError) as e:
+        return name, {'success':False, 'message':str(e)}, None
+
+    popt, pcov = result['popt'], result['pcov']
+    di_factor = converter_factor('D', freq_di)
+    b = kw.get('b')
+
+    #Scale the declination rate and its covariance to the declination frequency
+    scale = np.array([1., di_factor, 1.])[:pcov.shape[0]]
+    pcov = pcov * np.outer(scale,scale)
+    popt = popt * scale
+    params = ['qi','di','b'][:pcov.shape[0]]
+
+    row = {'qi':popt[0], 'di':popt[1], 'b':popt[2] if b is None else b, 'ti':result['ti']}
+    for i,pi in enumerate(params):
+        for j,pj in enumerate(params[i:],i):
+            row[f'cov_{pi}_{pj}'] = pcov[i,j]
+    row.update({k:result[k] for k in ['points','nfev','njev','rmse','r2']})
+    row.update({'success':True, 'message':None})
+
+    arps = Arps(
+        qi = {'dist':'norm','kw':{'loc':popt[0],'scale':np.sqrt(pcov[0,0])}} if prob else popt[0],
+        di = {'dist':'norm','kw':{'loc':popt[1],'scale':np.sqrt(pcov[1,1])}} if prob else popt[1],
+        b = ({'dist':'norm','kw':{'loc':popt[2],'scale':np.sqrt(pcov[2,2])}} if prob else popt[2]) if b is None else b,
+        ti = result['ti'],
+        freq_di = freq_di
+    )
+    return name, row, arps
+
+def fit_arps_batch(df:pd.DataFrame, well:str='well', time:str='time', rate:str='rate', b:float=None, filter=None, 
+    kw_filter:dict={}, prob:bool=False, beta:float=1, b_bounds:list=[0.,1.], freq_di:str='M', 
+    executor:ExecutorEnum=ExecutorEnum.process, workers:int=None, models:bool=False, previous:pd.DataFrame=None):
+    """fit_arps_batch Fit the production of many wells given in long format. Each well is fitted as Arps.fit does, 
+    with the same smoothing and filters, and the fits are distributed over a pool of processes or threads.
+
+    Args:
+        df (pd.DataFrame): Production in long format
+        well (str, optional): Well column name. Defaults to 'well'.
+        time (str, optional): Time column name. Defaults to 'time'.
+        rate (str, optional): Rate column name. Defaults to 'rate'.
+        b (float, optional): Fixed Arps Coefficient. If None it is fitted. Defaults to None.
+        filter (Union[str,callable], optional): Anomaly detection filter. Defaults to None.
+        kw_filter (dict, optional): Filter keyword arguments. Defaults to {}.
+        prob (bool, optional): Return the Arps parameters as normal distributions. Defaults to False.
+        beta (float, optional): Exponential weighted average smoothing factor. Defaults to 1.
+        b_bounds (list, optional): Bounds for b parameter. Defaults to [0.,1.].
+        freq_di (str, optional): Nominal Declination Rate Frecuency. Defaults to 'M'.
+        executor (ExecutorEnum, optional): Either 'process' or 'thread'. If None the wells are fitted serially. 
+            Defaults to 'process'.
+        workers (int, optional): Maximum number of workers. Defaults to None.
+        models (bool, optional): Return a dictionary of Arps instances instead of a table. Defaults to False.
+        previous (pd.DataFrame, optional): Table of a previous batch fit. The wells found there are warm started
+            from their previous qi, di and b. Defaults to None.
+
+    Returns:
+        Union[pd.DataFrame,Dict[str,Arps]]: Table indexed by well with the fitted parameters, their covariance 
+        and the fit diagnostics. Wells whose fit failed have success False and the error message.
+    """
+    kw = {'b':b, 'filter':filter, 'kw_filter':kw_filter, 'beta':beta, 'b_bounds':b_bounds}
+    groups = df.groupby(well, sort=False)
+    names = list(groups.groups.keys())
+    times = [g[time].values for _, g in groups]
+    rates = [g[rate].values for _, g in groups]
+    n = len(names)
+
+    p0 = [None]*n
+    if previous is not None:
+        di_factor = converter_factor('D', freq_di)
+        prev = previous[previous['success']] if 'success' in previous.columns else previous
+        p0 = [
+            [prev.at[i,'qi'], prev.at[i,'di']/di_factor, prev.at[i,'b']] if i in prev.index else None for i in names
+        ]
+
+    if executor is None or n <= 1:
+        results = list(map(_fit_well, names, times, rates, [freq_di]*n, [prob]*n, [kw]*n, p0))
+    else:
+        pool = ProcessPoolExecutor if ExecutorEnum(executor) == ExecutorEnum.process else ThreadPoolExecutor
+        #The workers use the same seeds and backend as the caller
+        with pool(max_workers=workers, initializer=init_worker, initargs=worker_settings()) as ex:
+            results = list(ex.map(_fit_well, names, times, rates, [freq_di]*n, [prob]*n, [kw]*n, p0, chunksize=max(1, n // 64)))
+
+    if models:
+        return {name:arps for name, _, arps in results if arps is not None}
+
+    return pd.DataFrame([row for _, row, _ in results], index=pd.Index(names, name=well))
@@ -1,11 +1,198 @@
 from abc import ABC, abstractmethod 
-from pydantic import BaseModel, Field, validator, Extra
+from functools import lru_cache
+import zlib
+from pydantic import BaseModel, Field, validator, Extra, PrivateAttr
 import pandas as pd
 from typing import List, Optional, Union, Dict
 from datetime import date
 from scipy import stats
+from scipy.stats import qmc
+import warnings
+import numpy as np
 
+from enum import Enum
 from .timeconverter import FreqEnum
+from ..backend import get_backend, set_backend
+
+class ExecutorEnum(str, Enum):
+    process = 'process'
+    thread = 'thread'
+
+def chunk_sizes(iter:int, chunksize:int)->List[int]:
+    """chunk_sizes Split a number of iterations in chunks of at most chunksize iterations
+
+    Args:
+        iter (int): Number of iterations
+        chunksize (int): Maximum iterations per chunk
+
+    Returns:
+        List[int]: Iterations of every chunk
+    """
+    assert chunksize > 0, 'chunksize must be greater than 0'
+    return [chunksize] * (iter // chunksize) + ([iter % chunksize] if iter % chunksize else [])
+
+def is_stream(seed)->bool:
+    return isinstance(seed,(np.random.SeedSequence,np.random.Generator))
+
+def _stream_key(key)->int:
+    return key if isinstance(key,(int,np.integer)) and key >= 0 else zlib.crc32(str(key).encode())
+
+_seed_settings = {'legacy': False}
+
+def set_legacy_seeds(legacy:bool):
+    """set_legacy_seeds Pass integer seeds unchanged through substream, as the previous versions did. 
+    Every variable, period and well seeded with the same integer then shares one random stream, so the 
+    samples are correlated. Only meant to reproduce results of those versions.
+
+    Args:
+        legacy (bool): Use the legacy seeds
+    """
+    _seed_settings['legacy'] = bool(legacy)
+
+def get_legacy_seeds()->bool:
+    """get_legacy_seeds Whether integer seeds are passed unchanged through substream
+
+    Returns:
+        bool: Legacy seeds in use
+    """
+    return _seed_settings['legacy']
+
+def worker_settings()->tuple:
+    """worker_settings Settings of the caller that the workers of a process pool must use. Spawned
+    processes import the package again, so the seeds and the backend are passed to init_worker.
+
+    Returns:
+        tuple: Legacy seeds and backend in use
+    """
+    return (get_legacy_seeds(), get_backend())
+
+def init_worker(legacy:bool, backend:str):
+    """init_worker Initializer of the workers of a pool. Set the legacy seeds and the backend 
+    returned by worker_settings
+
+    Args:
+        legacy (bool): Use the legacy seeds
+        backend (str): Either 'numpy' or 'numba'
+    """
+    set_legacy_seeds(legacy)
+    set_backend(backend)
+
+def substream(seed, *keys):
+    """substream Independent random stream of a seed for the given keys, for instance the name of a 
+    variable, a well or a worker. The same seed and keys always give the same stream. Integer seeds 
+    are the entropy of the streams. None is returned unchanged, and so are integer seeds if legacy 
+    seeds are set with set_legacy_seeds.
+
+    Args:
+        seed (Union[int,np.random.SeedSequence,np.random.Generator]): Seed
+        keys: Names or numbers that identify the substream
+
+    Returns:
+        Union[int,np.random.SeedSequence]: Child SeedSequence of the seed, otherwise the seed
+    """
+    if seed is None or (_seed_settings['legacy'] and not is_stream(seed)):
+        return seed
+    if isinstance(seed,np.random.Generator):
+        seed = seed.bit_generator.seed_seq
+    elif not isinstance(seed,np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.SeedSequence(
+        seed.entropy, spawn_key=tuple(seed.spawn_key) + tuple(_stream_key(k) for k in keys), pool_size=seed.pool_size
+    )
+
+def random_state(seed):
+    """random_state Random state accepted by scipy.stats for a seed. SeedSequences are converted to 
+    a np.random.Generator
+
+    Args:
+        seed (Union[int,np.random.SeedSequence,np.random.Generator]): Seed
+
+    Returns:
+        Union[int,np.random.Generator]: Random state
+    """
+    if isinstance(seed,np.random.SeedSequence):
+        return np.random.default_rng(seed)
+    return seed
+
+def chunk_seeds(seed, n:int)->list:
+    """chunk_seeds Seeds for n chunks of iterations. For integer seeds the first chunk uses the 
+    given seed, so a single chunk reproduces a run with that seed, and the others are spawned from
+    it with np.random.SeedSequence. For SeedSequence or Generator seeds every chunk gets its own
+    substream.
+
+    Args:
+        seed (Union[int,np.random.SeedSequence,np.random.Generator]): Seed. If None every chunk gets None
+        n (int): Number of chunks
+
+    Returns:
+        list: Seeds
+    """
+    if seed is None:
+        return [None] * n
+    if is_stream(seed):
+        return [substream(seed, 'chunk', i) for i in range(n)]
+    spawned = np.random.SeedSequence(seed).spawn(max(n - 1, 0))
+    return [seed] + [int(i.generate_state(1)[0]) for i in spawned]
+
+class SamplingEnum(str, Enum):
+    random = 'random'
+    lhs = 'lhs'
+    sobol = 'sobol'
+    halton = 'halton'
+
+def uniform_design(n:int, d:int, sampling:SamplingEnum=SamplingEnum.lhs, seed=None)->np.ndarray:
+    """uniform_design Uniform samples in the unit hypercube drawn with a sampling strategy. Latin Hypercube
+    stratifies every dimension and Sobol and Halton are scrambled low discrepancy sequences.
+
+    Args:
+        n (int): Number of samples
+        d (int): Number of dimensions
+        sampling (SamplingEnum, optional): Either 'random', 'lhs', 'sobol' or 'halton'. Defaults to 'lhs'.
+        seed (Union[int,np.random.SeedSequence,np.random.Generator], optional): Seed. Defaults to None.
+
+    Returns:
+        np.ndarray: Array of shape (n, d)
+    """
+    sampling = SamplingEnum(sampling)
+    rng = np.random.default_rng(substream(seed,'design'))
+    if sampling == SamplingEnum.random:
+        return rng.random((n,d))
+    if sampling == SamplingEnum.lhs:
+        engine = qmc.LatinHypercube(d, seed=rng)
+    elif sampling == SamplingEnum.sobol:
+        engine = qmc.Sobol(d, scramble=True, seed=rng)
+    else:
+        engine = qmc.Halton(d, scramble=True, seed=rng)
+    
+    #Sobol warns when n is not a power of 2 
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        return engine.random(n)
+
+def design_ppfs(params:list, n:int, sampling:SamplingEnum=None, seed=None, ppf:float=None)->list:
+    """design_ppfs Percentiles of the probabilistic params for n iterations. The ProbVar params share a 
+    joint design of the sampling strategy, so each of them gets a column of percentiles to be mapped 
+    through its ppf. With the random sampling, or a fixed ppf, every param gets ppf.
+
+    Args:
+        params (list): Params of a model. Only the ProbVar params are sampled
+        n (int): Number of iterations
+        sampling (SamplingEnum, optional): Sampling strategy. Defaults to None, random.
+        seed (Union[int,np.random.SeedSequence,np.random.Generator], optional): Seed. Defaults to None.
+        ppf (float, optional): Percentil. Defaults to None.
+
+    Returns:
+        list: Percentiles of every param
+    """
+    prob = [i for i, p in enumerate(params) if isinstance(p, ProbVar)]
+    if sampling is None or SamplingEnum(sampling) == SamplingEnum.random or ppf is not None or len(prob) == 0:
+        return [ppf] * len(params)
+    design = uniform_design(n, len(prob), sampling=sampling, seed=seed)
+    ppfs = [None] * len(params)
+    for j, i in enumerate(prob):
+        ppfs[i] = design[:,j]
+    return ppfs
+
 class DCA(ABC):
     """ 
     Declare the DCA abstract Class that can be subclassed by the all Diferent 
@@ -37,6 +224,10 @@ class Forecast(BaseModel):
 
     This class was built with two main objectives. 1) Validate the input data 2) Easily serialize to json
 
+    A Forecast can also be backed by the DataFrame generated by the DCA classes through the `from_df` 
+    method. In that case the columns are not validated element by element, they are only converted to 
+    lists when they are accessed or the instance is serialized, and `df` returns the DataFrame without copying it.
+
     Attributes:
         date (List[Union[date,int]])) : Datetime column
         oil_rate  (Optional[List[float]]) : Oil rate column
@@ -81,8 +272,69 @@ class Forecast(BaseModel):
     scenario : Optional[List[str]] 
     well : Optional[List[str]] 
     freq : FreqEnum = Field(FreqEnum.M)
-    
+    _frame : pd.DataFrame = PrivateAttr(None)
+
+    @classmethod
+    def from_df(cls, df:pd.DataFrame, freq:str=FreqEnum.M):
+        """from_df Create a Forecast backed by a DataFrame indexed by date. The columns are neither 
+        validated nor copied.
+
+        Args:
+            df (pd.DataFrame): Forecast DataFrame with either a PeriodIndex or an integer index
+            freq (str, optional): Frequency. Defaults to 'M'.
+
+        Returns:
+            Forecast: Forecast instance
+        """
+        columns = [i for i in cls.__fields__ if i not in ['date','freq']]
+        fields_set = {'date','freq'}.union([i for i in columns if i in df.columns])
+        forecast = cls.construct(_fields_set=fields_set, freq=FreqEnum(freq))
+
+        #Remove the columns from the instance. They are converted to lists only when accessed
+        for i in ['date'] + columns:
+            forecast.__dict__.pop(i, None)
+        forecast._frame = df if df.index.name == 'date' else df.rename_axis('date')
+        return forecast
+
+    def _column(self, name:str):
+        if name == 'date':
+            index = self._frame.index
+            return index.to_timestamp().date.tolist() if isinstance(index,pd.PeriodIndex) else index.tolist()
+        if name in self._frame.columns:
+            return self._frame[name].tolist()
+        return None
+
+    def _materialize(self):
+        if self._frame is not None:
+            values = {i:self.__dict__[i] if i in self.__dict__ else self._column(i) for i in self.__fields__}
+            self.__dict__.clear()
+            self.__dict__.update(values)
+
+    def __getattr__(self, name):
+        if name in self.__fields__ and self._frame is not None:
+            self.__dict__[name] = self._column(name)
+            return self.__dict__[name]
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        #Once a column is changed the DataFrame is no longer valid
+        if name in self.__fields__ and self._frame is not None:
+            self._materialize()
+            self._frame = None
+        super().__setattr__(name, value)
+
+    def dict(self, **kwargs):
+        self._materialize()
+        return super().dict(**kwargs)
+
+    def json(self, **kwargs):
+        self._materialize()
+        return super().json(**kwargs)
+
     def df(self):
+        if self._frame is not None:
+            return self._frame
+
         _forecast_dict = self.dict()
         freq = _forecast_dict.pop('freq')
         _fr = pd.DataFrame(_forecast_dict)
@@ -104,11 +356,41 @@ allowed_prob_dist.extend(dist_continu)
 allowed_prob_dist.extend(dist_continu)
 
 
+def _dist_key(dist:str, kw:dict):
+    try:
+        key = (dist, tuple(sorted(kw.items())))
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+@lru_cache(maxsize=256)
+def _frozen_dist(key):
+    dist, kw = key
+    return getattr(stats,dist)(**dict(kw))
+
+def frozen_dist(dist:str, kw:dict):
+    """frozen_dist Frozen scipy distribution. The distributions are cached by name and 
+    keyword arguments, so the same distribution is built only once.
+
+    Args:
+        dist (str): Name of the scipy.stats distribution
+        kw (dict): Keyword arguments of the distribution
+
+    Returns:
+        rv_frozen: Frozen distribution
+    """
+    key = _dist_key(dist, kw)
+    if key is None:
+        return getattr(stats,dist)(**kw)
+    return _frozen_dist(key)
+
 class ProbVar(BaseModel):
     dist: str = Field('norm')
     kw : dict = Field({'loc':0,'scale':1})
     factor: float = Field(1.)
     seed : int = Field(None)
+    _samples : tuple = PrivateAttr(None)
 
     class Config:
         validate_assignment = True
@@ -116,21 +398,57 @@ class ProbVar(BaseModel):
 
     @validator('kw')
     def check_dist_build(cls,v,values):
-        if isinstance(getattr(stats,values['dist'])(**v),stats._distn_infrastructure.rv_frozen):
+        if isinstance(frozen_dist(values['dist'],v),stats._distn_infrastructure.rv_frozen):
             return v 
         else:
             raise ValueError(f"{v} are not allowed")
 
     def get_instance(self):
-        return getattr(stats,self.dist)(**self.kw)
+        return frozen_dist(self.dist,self.kw)
 
     def get_sample(self, size:Union[int,tuple]=None, ppf:float=None, seed=None):
         if seed is None:
             seed = self.seed
 
         if ppf is not None:
-            return getattr(stats,self.dist)(**self.kw).ppf(ppf)*self.factor
+            return self.get_instance().ppf(ppf)*self.factor
         elif size:
-            return getattr(stats,self.dist)(**self.kw).rvs(size=size,random_state=seed)*self.factor
+            return self.get_instance().rvs(size=size,random_state=random_state(seed))*self.factor
         else:
-            return getattr(stats,self.dist)(**self.kw).mean()*self.factor
+            return self.get_instance().mean()*self.factor
+
+    def draw(self, n:int, seed=None)->np.ndarray:
+        """draw Draw the samples of n iterations at once. They are kept to be handed out by take
+        until the distribution changes or other samples are drawn.
+
+        Args:
+            n (int): Number of iterations
+            seed (int, optional): Seed. Defaults to None.
+
+        Returns:
+            np.ndarray: Samples
+        """
+        samples = np.atleast_1d(self.get_sample(size=n, seed=seed))
+        self._samples = ((self.dist, _dist_key(self.dist,self.kw), self.factor), samples)
+        return samples
+
+    def take(self, i:Union[int,slice], seed=None):
+        """take Samples of the iterations i from the samples drawn at once by draw. If they were not
+        drawn or the distribution has changed, new samples are drawn for as many iterations as needed
+        and they are not kept. If they do not cover i the missing iterations are drawn and appended.
+
+        Args:
+            i (Union[int,slice]): Iteration or slice of iterations
+            seed (int, optional): Seed used if the samples are drawn. Defaults to None.
+
+        Returns:
+            Union[float,np.ndarray]: Samples
+        """
+        stop = (i.stop if isinstance(i,slice) else i + 1) or 0
+        key = (self.dist, _dist_key(self.dist,self.kw), self.factor)
+        if self._samples is None or key[1] is None or self._samples[0] != key:
+            return np.atleast_1d(self.get_sample(size=stop, seed=seed))[i]
+        if self._samples[1].shape[0] < stop:
+            extra = np.atleast_1d(self.get_sample(size=stop - self._samples[1].shape[0], seed=seed))
+            self._samples = (key, np.concatenate([self._samples[1], extra]))
+        return self._samples[1][i]
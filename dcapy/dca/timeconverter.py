@@ -2,6 +2,7 @@ import pandas as pd
 from scipy import stats
 import numpy as np
 from enum import Enum
+from datetime import date
 
 list_freq = ['A','M','D']
 
@@ -18,6 +19,11 @@ di = {
 }
 time_converter_matrix = pd.DataFrame(di).pivot(index='from',columns='to',values='value')
 
+#Lookup tables to avoid indexing the DataFrame on every conversion
+_freq_index = {FreqEnum(f):i for i,f in enumerate(list_freq)}
+time_converter_array = time_converter_matrix.loc[list_freq,list_freq].values
+_converter_table = {(f,t):time_converter_array[i,j] for f,i in _freq_index.items() for t,j in _freq_index.items()}
+
 def converter_factor(From:str,To:str)->float:
     """converter_factor return a conversion time factor for given time periods
 
@@ -33,7 +39,61 @@ def converter_factor(From:str,To:str)->float:
     float
         conversion factor
     """
-    return time_converter_matrix.loc[From,To]
+    return _converter_table[From,To]
+
+def converter_factors(From,To)->np.ndarray:
+    """converter_factors return the conversion time factors for arrays of time periods
+
+    Parameters
+    ----------
+    From : array-like
+        Time periods to convert from
+    To : array-like
+        Time periods to convert to. It is broadcasted with From
+
+    Returns
+    -------
+    np.ndarray
+        conversion factors
+    """
+    From, To = np.broadcast_arrays(np.asarray(From,dtype=object), np.asarray(To,dtype=object))
+    return time_converter_array[_freq_codes(From),_freq_codes(To)]
+
+def _freq_codes(freqs:np.ndarray)->np.ndarray:
+    return np.array([_freq_index[f] for f in freqs.ravel()], dtype=int).reshape(freqs.shape)
+
+#Ordinal of the unix epoch, 1970-01-01
+_epoch_ordinal = date(1970,1,1).toordinal()
+
+def to_ordinal(values)->np.ndarray:
+    """to_ordinal return the proleptic Gregorian ordinal of dates as datetime.toordinal does, 
+    using integer arithmetic on the days since the unix epoch
+
+    Parameters
+    ----------
+    values : array-like
+        Dates. PeriodIndex, DatetimeIndex, Series or arrays of datetime64, periods or date objects.
+        Periods are converted at their start time
+
+    Returns
+    -------
+    np.ndarray
+        ordinals
+    """
+    if isinstance(values, pd.Series):
+        values = pd.Index(values)
+    if isinstance(values, (date, np.datetime64, pd.Period)):
+        values = [values]
+    if not isinstance(values, (pd.PeriodIndex, pd.DatetimeIndex)):
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.datetime64):
+            values = pd.Index(values)
+            values = values if isinstance(values, pd.PeriodIndex) else pd.DatetimeIndex(values)
+    shape = np.shape(values)
+    if isinstance(values, pd.PeriodIndex):
+        values = values.to_timestamp()
+    days = np.asarray(values, dtype='datetime64[D]').astype(np.int64)
+    return (days + _epoch_ordinal).reshape(shape)
 
 
 def check_value_or_prob(value):
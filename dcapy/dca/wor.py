@@ -11,8 +11,10 @@ from rich.layout import Layout
 from rich.text import Text
 import yaml
 #Local Imports
-from .dca import DCA, ProbVar
-from .timeconverter import list_freq, converter_factor, time_converter_matrix, check_value_or_prob, FreqEnum
+from .dca import DCA, ProbVar, substream, SamplingEnum, design_ppfs
+from .timeconverter import list_freq, converter_factor, time_converter_matrix, check_value_or_prob, FreqEnum, to_ordinal
+from ..backend import jit, use_numba
+from ..filters import zscore
 
 
 def bsw_to_wor(bsw):
@@ -29,81 +31,173 @@ def wor_to_bsw(wor):
     bsw = wor/(wor+1)
     return bsw   
 
-def wor_forecast(time_array:np.ndarray,fluid_rate:Union[float,np.ndarray], slope:float, 
-	wor_i:float, rate_limit:float = None,cum_limit:float=None, wor_limit:float=None):
-
-
-    time_array = np.atleast_1d(time_array)
-    fluid_rate = np.atleast_1d(fluid_rate)
-
-    #delta_time = np.diff(time_array,append=0)
-    delta_time = np.gradient(time_array)
-
-    wor_i1 = wor_i + 1
-
-    # Create arrays
-    wor = np.zeros(time_array.shape[0])
-    wor[0] = wor_i
-
-
-    wor_1 = np.zeros(time_array.shape[0])
-    wor_1[0] = wor_i + 1
-
-    bsw = np.zeros(time_array.shape[0])
-    bsw[0] = wor_to_bsw(wor[0])
-
-    oil_rate = np.zeros(time_array.shape[0])
-    oil_rate[0] = fluid_rate[0]*(1-bsw[0])
-    water_rate = np.zeros(time_array.shape[0])
-    water_rate[0]=fluid_rate[0]*bsw[0]
-
-    oil_cum = np.zeros(time_array.shape[0])
-    oil_cum[0] = oil_rate[0]*delta_time[0]
+wor_forecast_columns = ['oil_rate','water_rate','oil_cum','water_cum','bsw','wor','wor_1','delta_time','fluid_rate','fluid_cum']
+
+def masked_gradient(values:np.ndarray, length:np.ndarray=None)->np.ndarray:
+    """masked_gradient Estimate the gradient along the rows of a left aligned 2D array where 
+    each row has its own number of valid elements. It gives the same result than applying 
+    np.gradient to the valid part of every row.
+
+    Args:
+        values (np.ndarray): 2D array with shape (iterations, time)
+        length (np.ndarray, optional): Number of valid elements per row. Defaults to None.
+
+    Returns:
+        np.ndarray: 2D array with the gradient. Elements out of the valid part are null
+    """
+    values = np.atleast_2d(values).astype(float)
+    rows, cols = values.shape
+    length = np.full(rows,cols) if length is None else np.atleast_1d(length).astype(int)
+    assert np.all(length>=2), 'At least two elements per row are required to estimate the gradient'
+
+    grad = np.full(values.shape,np.nan)
+    grad[:,1:-1] = (values[:,2:] - values[:,:-2]) / 2.0
+    grad[:,0] = values[:,1] - values[:,0]
+    idx = np.arange(rows)
+    grad[idx,length-1] = values[idx,length-1] - values[idx,length-2]
+    grad[np.arange(cols)>=length.reshape(-1,1)] = np.nan
+    return grad
+
+@jit
+def _wor_forecast_kernel(block, slope, wor_i, length, steps, rate_limit, cum_limit, wor_limit):
+    #Loop version of the wor_forecast_batch time loop for the numba backend. Each iteration
+    #is advanced until it reaches a limit. Null limits are not applied
+    rows, cols = block.shape[0], block.shape[1]
+    for r in range(rows):
+        if length[r] <= 1:
+            continue
+        for i in range(1,cols):
+            wor = np.exp(slope[r]*block[r,i-1,2])*wor_i[r]
+            bsw = wor/(wor+1)
+            block[r,i,5] = wor
+            block[r,i,6] = wor + 1
+            block[r,i,4] = bsw
+            block[r,i,0] = block[r,i,8]*(1-bsw)
+            block[r,i,1] = block[r,i,8]*bsw
+            block[r,i,2] = block[r,i-1,2] + block[r,i,0]*block[r,i,7]
+            block[r,i,3] = block[r,i-1,3] + block[r,i,1]*block[r,i,7]
+            block[r,i,9] = block[r,i,3] + block[r,i,2]
+
+            stop = length[r] == i+1
+            if not np.isnan(rate_limit) and block[r,i,0] <= rate_limit:
+                stop = True
+            if not np.isnan(cum_limit) and block[r,i,2] >= cum_limit:
+                stop = True
+            if not np.isnan(wor_limit) and wor >= wor_limit:
+                stop = True
+            if stop:
+                steps[r] = i+1
+                break
 
-    water_cum = np.zeros(time_array.shape[0])
-    water_cum[0] = water_rate[0]*delta_time[0]
+def wor_forecast_batch(time_array:np.ndarray,fluid_rate:Union[float,np.ndarray], slope:Union[float,np.ndarray], 
+    wor_i:Union[float,np.ndarray], rate_limit:float = None,cum_limit:float=None, wor_limit:float=None, length:np.ndarray=None):
+    """wor_forecast_batch Estimate the Wor forecast for many iterations at once. All iterations
+    are advanced together at every time step and the limits are handled with a mask per iteration.
+
+    Args:
+        time_array (np.ndarray): 2D array of times with shape (iterations, time). Rows are left aligned
+        fluid_rate (Union[float,np.ndarray]): Fluid rate. Broadcastable to (iterations, time)
+        slope (Union[float,np.ndarray]): Slope of the log(wor) vs oil cumulative. Shape (iterations,)
+        wor_i (Union[float,np.ndarray]): Initial Wor. Shape (iterations,)
+        rate_limit (float, optional): Oil rate at which the iteration stops. Defaults to None.
+        cum_limit (float, optional): Oil cumulative at which the iteration stops. Defaults to None.
+        wor_limit (float, optional): Wor at which the iteration stops. Defaults to None.
+        length (np.ndarray, optional): Number of valid time steps per row. Defaults to None.
+
+    Returns:
+        Tuple[np.ndarray,np.ndarray]: Array block with shape (iterations, time, columns) following the 
+            order of wor_forecast_columns and the number of time steps forecasted per iteration. 
+            The steps after an iteration stops are left in zero except the delta_time and fluid_rate.
+    """
+    time_array = np.atleast_2d(time_array).astype(float)
+    rows, cols = time_array.shape
+    length = np.full(rows,cols) if length is None else np.atleast_1d(length).astype(int)
+
+    fluid_rate = np.broadcast_to(np.atleast_1d(fluid_rate).astype(float),(rows,cols))
+    slope = np.broadcast_to(np.atleast_1d(slope).astype(float).flatten(),(rows,))
+    wor_i = np.broadcast_to(np.atleast_1d(wor_i).astype(float).flatten(),(rows,))
+
+    delta_time = masked_gradient(time_array,length)
+
+    # Create array block. [iterations, time, columns]
+    block = np.zeros((rows,cols,len(wor_forecast_columns)))
+    oil_rate, water_rate, oil_cum, water_cum, bsw, wor, wor_1, _delta_time, _fluid_rate, fluid_cum = [block[:,:,c] for c in range(len(wor_forecast_columns))]
+    _delta_time[:] = delta_time
+    _fluid_rate[:] = fluid_rate
+
+    wor[:,0] = wor_i
+    wor_1[:,0] = wor_i + 1
+    bsw[:,0] = wor_i/(wor_i+1)
+    oil_rate[:,0] = fluid_rate[:,0]*(1-bsw[:,0])
+    water_rate[:,0] = fluid_rate[:,0]*bsw[:,0]
+    oil_cum[:,0] = oil_rate[:,0]*delta_time[:,0]
+    water_cum[:,0] = water_rate[:,0]*delta_time[:,0]
+    fluid_cum[:,0] = fluid_rate[:,0]*delta_time[:,0]
+
+    #Number of time steps forecasted per iteration and mask of iterations still running
+    steps = length.copy()
+    active = length > 1
+
+    if use_numba():
+        _wor_forecast_kernel(
+            block, np.ascontiguousarray(slope), np.ascontiguousarray(wor_i), length, steps,
+            *[float(i) if i else np.nan for i in [rate_limit,cum_limit,wor_limit]]
+        )
+        return block, steps
+
+    for i in range(1,cols):
+        if not active.any():
+            break
+        a = active
+        wor[a,i] = np.exp(slope[a]*oil_cum[a,i-1])*wor_i[a]
+        wor_1[a,i] = wor[a,i] + 1
+        bsw[a,i] = wor[a,i]/(wor[a,i]+1)
+        oil_rate[a,i] = fluid_rate[a,i]*(1-bsw[a,i])
+        water_rate[a,i] = fluid_rate[a,i]*bsw[a,i]
+        oil_cum[a,i] = oil_cum[a,i-1] + oil_rate[a,i]*delta_time[a,i]
+        water_cum[a,i] = water_cum[a,i-1] + water_rate[a,i]*delta_time[a,i]
+        fluid_cum[a,i] = water_cum[a,i] + oil_cum[a,i]
+
+        stop = np.zeros(rows,dtype=bool)
+        if rate_limit:
+            stop[a] |= oil_rate[a,i] <= rate_limit
+        if cum_limit:
+            stop[a] |= oil_cum[a,i] >= cum_limit
+        if wor_limit:
+            stop[a] |= wor[a,i] >= wor_limit
 
-    fluid_cum = np.zeros(time_array.shape[0])
-    fluid_cum[0] = fluid_rate[0]*delta_time[0]
+        stop |= active & (length == i+1)
+        steps[stop] = i+1
+        active = active & ~stop
 
-    for i in range(1,delta_time.shape[0]):
-        wor[i] = np.exp(slope*oil_cum[i-1])*wor_i
-        wor_1[i] = wor[i] + 1
-        bsw[i] = wor_to_bsw(wor[i])
-        oil_rate[i] = fluid_rate[i]*(1-bsw[i])
-        water_rate[i] = fluid_rate[i]*bsw[i]
-        oil_cum[i] = oil_cum[i-1] + oil_rate[i]*delta_time[i]
-        water_cum[i] = water_cum[i-1] + water_rate[i]*delta_time[i]
-        fluid_cum[i] = water_cum[i] + oil_cum[i]
-        if rate_limit:
-            if oil_rate[i] <= rate_limit:
-                break
+    return block, steps
 
-        if cum_limit:
-            if oil_cum[i] >= cum_limit:
-                break     
+def wor_forecast(time_array:np.ndarray,fluid_rate:Union[float,np.ndarray], slope:float, 
+	wor_i:float, rate_limit:float = None,cum_limit:float=None, wor_limit:float=None):
 
-        if wor_limit:
-            if wor[i] >= wor_limit:
-                break          
+    time_array = np.atleast_1d(time_array)
+    fluid_rate = np.broadcast_to(np.atleast_1d(fluid_rate),time_array.shape)
+
+    block, steps = wor_forecast_batch(
+        time_array.reshape(1,-1),
+        fluid_rate.reshape(1,-1),
+        slope,
+        wor_i,
+        rate_limit=rate_limit,
+        cum_limit=cum_limit,
+        wor_limit=wor_limit
+    )
 
     _forecast = pd.DataFrame(
-    	{
-            'oil_rate':oil_rate,
-            'water_rate':water_rate,
-            'oil_cum':oil_cum,
-            'water_cum':water_cum,
-            'bsw':bsw,
-            'wor':wor,
-            'wor_1':wor_1,
-            'delta_time':delta_time,
-            'fluid_rate':fluid_rate,
-            'fluid_cum' : fluid_cum
-            },
-            index = time_array
+        block[0],
+        columns = wor_forecast_columns,
+        index = time_array
     )
+    #Keep the fluid rate as it was given
+    _forecast['fluid_rate'] = fluid_rate
     
     _forecast.index.name = 'date'
+    i = steps[0] - 1
 
     return _forecast[:i+1]
 
@@ -144,7 +238,7 @@ class Wor(BaseModel,DCA):
             np.array: Array if bsw
         """
         if isinstance(self.bsw,ProbVar):
-            return self.bsw.get_sample(size=size, ppf=ppf, seed=seed)
+            return self.bsw.get_sample(size=size, ppf=ppf, seed=substream(seed,'bsw'))
         else:
             return np.atleast_1d(self.bsw)
 
@@ -159,7 +253,7 @@ class Wor(BaseModel,DCA):
             np.array: Array if slope
         """
         if isinstance(self.slope,ProbVar):
-            return self.slope.get_sample(size=size, ppf=ppf, seed=seed)
+            return self.slope.get_sample(size=size, ppf=ppf, seed=substream(seed,'slope'))
         else:
             return np.atleast_1d(self.slope)
 
@@ -247,7 +341,7 @@ class Wor(BaseModel,DCA):
        
     def forecast(self,time_list:Union[pd.Series,np.ndarray]=None,start:Union[date,float]=None, 
     	end:Union[date,float]=None, fluid_rate:Union[np.ndarray,float,list]=None,rate_limit:float=None,cum_limit:float=None, wor_limit:float=None,
-    	freq_input:str='D', freq_output:str='D', iter:int=1,ppf=None,cum_i=0, seed=None,**kwargs)->pd.DataFrame:
+    	freq_input:str='D', freq_output:str='D', iter:int=1,ppf=None,cum_i=0, seed=None, sampling:SamplingEnum=None,**kwargs)->pd.DataFrame:
         if self.format() == 'date':
             freq_input = 'D'
             #Check if the time range was given. If True, use this to estimate the time array for
@@ -260,9 +354,9 @@ class Wor(BaseModel,DCA):
                 assert all(isinstance(i,date) for i in [start,end])
                 time_list = pd.period_range(start=start, end=end, freq=freq_input)
 
-            ti_array = np.array([i.toordinal() for i in np.atleast_1d(self.ti)], dtype=int)
+            ti_array = to_ordinal(np.atleast_1d(self.ti))
             time_range = pd.Series(time_list)
-            time_array = time_range.apply(lambda x: x.to_timestamp().toordinal()).values - ti_array.reshape(-1,1)
+            time_array = to_ordinal(time_range) - ti_array.reshape(-1,1)
         else:
             if time_list is not None:
                 time_list = np.atleast_1d(time_list)
@@ -283,8 +377,9 @@ class Wor(BaseModel,DCA):
        	#Broadcast variables to set the total iterations
 
         #Get bsw and slope
-        bsw = self.get_bsw(size=iter, ppf=ppf, seed=seed)
-        slope = self.get_slope(size=iter, ppf=ppf, seed=seed)
+        ppf_bsw, ppf_slope = design_ppfs([self.bsw,self.slope], iter, sampling=sampling, seed=self.seed if seed is None else seed, ppf=ppf)
+        bsw = self.get_bsw(size=iter, ppf=ppf_bsw, seed=seed)
+        slope = self.get_slope(size=iter, ppf=ppf_slope, seed=seed)
 
         #Get the fluid Rate. 
         # If the result is a 2D numpy array the size must match the Time array 
@@ -307,59 +402,64 @@ class Wor(BaseModel,DCA):
         # make the fluid array to be consistent with the time array
         _fluid = fluid_rate * np.ones((br[0],time_array.shape[1]))
 
-        
-
-        # Make the loop for the forecast
-        list_forecast = []
-
-        for i in range(br[0]):
-            _wor = bsw_to_wor(_bsw[i])
-            
-            #Get only the time array values greater or equal to zero
-            filter_time = time_array[i]>=0
-
-            #The fluid rate is multiplied by a factor to estimate the cumulative production.            
-            _f = wor_forecast(
-                time_array[i][filter_time],
-                _fluid[i][filter_time], 
-                _slope[i], 
-                _wor, 
-                rate_limit=rate_limit,
-                cum_limit=cum_limit, 
-                wor_limit=wor_limit)
-            
-            _f['iteration'] = i
-            #_f.index = time_range[1:_f.shape[0]+1]
-            _f.index = time_range[filter_time][0:_f.shape[0]]
-            #_f.index = time_range[0:_f.shape[0]]
-            oil_vol = np.gradient(_f['oil_cum'].values)
-            oil_vol[oil_vol<0] = 0
-            water_vol = np.gradient(_f['water_cum'].values)
-            water_vol[water_vol<0] = 0
-            _f['oil_volume'] = oil_vol
-            _f['water_volume'] = water_vol
-            _f['oil_cum'] += cum_i
-
-            #Gas Rate
-            if any([i is not None for i in [self.gor,self.glr]]):
-
-                if self.gor:
-                    _f['gas_cum'] = _f['oil_cum'].multiply(self.gor) 
-                    _f['gas_volume'] = np.diff(_f['gas_cum'], prepend=0) #/ _f['delta_time']
-                    _f['gas_rate'] = _f['gas_volume'] / _f['delta_time']
-                elif self.glr:
-                    _f['gas_cum'] = _f['oil_cum'].add(_f['water_cum']).multiply(self.glr) 
-                    _f['gas_volume'] = np.diff(_f['gas_cum'], prepend=0) / _f['delta_time']
-                    _f['gas_rate'] = _f['gas_volume'] / _f['delta_time']
-            else:
-                _f['gas_cum'] = 0
-                _f['gas_volume'] = 0
-                _f['gas_rate'] = 0
-
-            
-            list_forecast.append(_f)
-
-        _forecast = pd.concat(list_forecast, axis=0)
+        _wor = bsw_to_wor(_bsw)
+
+        #Get only the time array values greater or equal to zero. The valid values of 
+        # every iteration are moved to the left of the array to be forecasted in a single batch
+        filter_time = time_array>=0
+        length = filter_time.sum(axis=1)
+        order = np.argsort(~filter_time, axis=1, kind='stable')
+
+        time_left = np.take_along_axis(time_array,order,axis=1)
+        block, steps = wor_forecast_batch(
+            time_left,
+            np.take_along_axis(_fluid,order,axis=1),
+            _slope,
+            _wor,
+            rate_limit=rate_limit,
+            cum_limit=cum_limit,
+            wor_limit=wor_limit,
+            length=length
+        )
+        #Keep the rows up to the time label steps, as the label based slice of wor_forecast does
+        steps_mask = (np.arange(block.shape[1]) < length.reshape(-1,1)) & (time_left <= steps.reshape(-1,1))
+        steps = steps_mask.sum(axis=1)
+
+        oil_vol = masked_gradient(block[:,:,wor_forecast_columns.index('oil_cum')],steps)
+        oil_vol[oil_vol<0] = 0
+        water_vol = masked_gradient(block[:,:,wor_forecast_columns.index('water_cum')],steps)
+        water_vol[water_vol<0] = 0
+        oil_cum = block[:,:,wor_forecast_columns.index('oil_cum')] + cum_i
+
+        columns = {c:block[:,:,n] for n,c in enumerate(wor_forecast_columns)}
+        columns.update({
+            'iteration':np.repeat(np.arange(br[0]).reshape(-1,1),block.shape[1],axis=1),
+            'oil_volume':oil_vol,
+            'water_volume':water_vol,
+            'oil_cum':oil_cum
+        })
+
+        #Gas Rate
+        if any([i is not None for i in [self.gor,self.glr]]):
+
+            if self.gor:
+                gas_cum = oil_cum * self.gor
+                gas_volume = np.diff(gas_cum, axis=1, prepend=0)
+                gas_rate = gas_volume / columns['delta_time']
+            elif self.glr:
+                gas_cum = (oil_cum + columns['water_cum']) * self.glr
+                gas_volume = np.diff(gas_cum, axis=1, prepend=0) / columns['delta_time']
+                gas_rate = gas_volume / columns['delta_time']
+            columns.update({'gas_cum':gas_cum,'gas_volume':gas_volume,'gas_rate':gas_rate})
+
+        _forecast = pd.DataFrame({c:v[steps_mask] for c,v in columns.items()})
+        if not any([i is not None for i in [self.gor,self.glr]]):
+            _forecast['gas_cum'] = 0
+            _forecast['gas_volume'] = 0
+            _forecast['gas_rate'] = 0
+
+        #Index of every forecasted step
+        _forecast.index = pd.Index(pd.Series(time_range).values.take(order[steps_mask]))
         _forecast.index.name = 'date'
         
         if self.format() == 'date' and freq_output!='D':
@@ -1 +1 @@
-from .filters import zscore, exp_wgh_avg, beta_from_days
\ No newline at end of file
+from .filters import zscore, zscore_groups, exp_wgh_avg, beta_from_days
\ No newline at end of file
@@ -1,9 +1,64 @@
 import pandas as pd 
 import numpy as np 
-from scipy import stats 
+from scipy import stats, signal
 from datetime import datetime, date
+from ..dca.timeconverter import to_ordinal
+from ..backend import jit, use_numba
 
-def zscore(x:np.ndarray,y:np.ndarray,thld:float=2)->np.ndarray:
+def _time_to_float(x:np.ndarray)->np.ndarray:
+    if np.issubdtype(x.dtype, np.datetime64) or isinstance(x.ravel()[0], date):
+        return to_ordinal(x).astype(float)
+    return x.astype(float)
+
+def _segment_zscore(codes:np.ndarray,x:np.ndarray,y:np.ndarray,thld:float=2,window:int=None)->np.ndarray:
+    """_segment_zscore Z-score filter over contiguous segments of the same code. The derivative
+    of the log rate uses the same central differences of np.gradient without crossing the segment 
+    boundaries, and the mean and standard deviation are reduced per segment with np.bincount.
+    If window is given the statistics are taken over the trailing window of each point instead.
+    Derivatives that are not finite are not flagged and are left out of the statistics.
+    """
+    n = codes.shape[0]
+    idx = np.arange(n)
+    counts = np.bincount(codes)
+    end = np.cumsum(counts)
+    start = end - counts
+
+    prv = np.maximum(idx - 1, start[codes])
+    nxt = np.minimum(idx + 1, end[codes] - 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logy = np.log(y)
+        dev = (logy[nxt] - logy[prv]) / (x[nxt] - x[prv])
+
+        #Derivatives that are not finite, from null rates or repeated times, are left out of the statistics.
+        #They are centered on the mean of their segment so the sums of squares do not lose precision
+        finite = np.isfinite(dev)
+        npoints = np.bincount(codes, weights=finite, minlength=counts.shape[0])
+        mean = np.bincount(codes, weights=np.where(finite, dev, 0.), minlength=counts.shape[0]) / npoints
+        centered = np.where(finite, dev - mean[codes], 0.)
+
+        if window is None:
+            std = np.sqrt(np.bincount(codes, weights=np.square(centered), minlength=counts.shape[0]) / npoints)
+            abs_zscore = np.abs(centered / std[codes])
+        else:
+            first = np.maximum(idx + 1 - window, start[codes])
+            def window_sum(v):
+                #Cumulative sum restarted at the start of every segment
+                s = np.cumsum(v)
+                s -= np.repeat(np.concatenate([[0.], s[end[:-1] - 1]]), counts)
+                s = np.concatenate([[0.], s])
+                return s[idx+1] - np.where(first > start[codes], s[first], 0.)
+            npoints = window_sum(finite.astype(float))
+            mean = window_sum(centered) / npoints
+            var = np.maximum(window_sum(np.square(centered)) / npoints - np.square(mean), 0)
+            abs_zscore = np.abs((centered - mean) / np.sqrt(var))
+        abs_zscore[~finite] = np.nan
+
+    index = np.zeros(n)
+    index[abs_zscore>thld] = 1
+    return index
+
+def zscore(x:np.ndarray,y:np.ndarray,thld:float=2,window:int=None)->np.ndarray:
     """zscore. Filter for time series production. Estimate the first order derivative of
     the natural logaritmic of rate with respect to time. Return a numpy array of zeros with
     the points greater than the threshold with one.
@@ -11,58 +66,95 @@ def zscore(x:np.ndarray,y:np.ndarray,thld:float=2)->np.ndarray:
     Parameters
     ----------
     x : np.ndarray
-        [description]
+        Time. Either numbers or dates
     y : np.ndarray
-        [description]
+        Rate
     thld : float, optional
-        [description], by default 2
+        Absolute z-score threshold, by default 2
+    window : int, optional
+        Number of trailing points used to estimate the mean and standard deviation 
+        of each point. If None the whole series is used, by default None
 
     Returns
     -------
     np.ndarray
-        [description]
+        Array with ones on the anomalies
     """
     
     ## Assert x and y have the same shape
     assert x.shape == y.shape
-    
-    #Create the array for filter
-    index = np.zeros(x.shape)
-    
-    try:
-        vtoordinal = np.vectorize(datetime.toordinal)
-        x = vtoordinal(x)
-    except Exception as e:
-        x = x.astype(float)
 
-    
-    # Logaritmic of rates
-    logy = np.log(y)
-    
-    #Derivative
-    dev = np.gradient(logy) / np.gradient(x)
-    #dev = np.append(dev[0],dev)
-    #Estimate z Score
-    abs_zscore=np.abs(stats.zscore(dev))
-    
-    index[abs_zscore>thld] = 1
-    
+    return _segment_zscore(np.zeros(x.shape[0],dtype=int), _time_to_float(x), np.asarray(y,dtype=float), thld=thld, window=window)
+
+def zscore_groups(df:pd.DataFrame,well:str='well',time:str='time',rate:str='rate',thld:float=2,window:int=None)->np.ndarray:
+    """zscore_groups Z-score filter of many wells given in long format in one call. Each well 
+    gets the same result of zscore over its own rows, which must be sorted by time within the well.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Production in long format
+    well : str, optional
+        Well column name, by default 'well'
+    time : str, optional
+        Time column name, by default 'time'
+    rate : str, optional
+        Rate column name, by default 'rate'
+    thld : float, optional
+        Absolute z-score threshold, by default 2
+    window : int, optional
+        Number of trailing points used to estimate the mean and standard deviation 
+        of each point. If None the whole well is used, by default None
+
+    Returns
+    -------
+    np.ndarray
+        Array with ones on the anomalies aligned with the rows of df
+    """
+    codes, _ = pd.factorize(df[well])
+    order = np.argsort(codes, kind='stable')
+
+    index = np.zeros(df.shape[0])
+    index[order] = _segment_zscore(
+        codes[order], _time_to_float(df[time].values[order]), df[rate].values[order].astype(float), 
+        thld=thld, window=window
+    )
     return index
 
 
-def exp_wgh_avg(y,beta):
+@jit
+def _exp_wgh_avg_kernel(y, beta, yw):
+    for i in range(1,y.shape[0]):
+        for j in range(y.shape[1]):
+            yw[i,j] = (beta*yw[i-1,j] + (1-beta)*y[i,j])
 
-    yw = np.zeros(y.shape[0])
-    
-    for i,r in enumerate(y):
-        if i>0:
-            yw[i] = (beta*yw[i-1] + (1-beta)*y[i])
-            
-    bias_correction = 1 - np.power(beta,np.arange(len(yw)))
-    
-    y = np.nan_to_num(yw / bias_correction)
-    
-    return y
+def exp_wgh_avg(y:np.ndarray,beta:float)->np.ndarray:
+    """exp_wgh_avg Exponentially weighted average with bias correction. The recursion
+    yw[i] = beta*yw[i-1] + (1-beta)*y[i] is solved with scipy.signal.lfilter along the
+    first axis, so a 2D array is smoothed column by column (one well per column) in one call.
+
+    Args:
+        y (np.ndarray): Series of shape (n,) or (n, wells)
+        beta (float): Weight of the previous average. See beta_from_days
+
+    Returns:
+        np.ndarray: Smoothed series with the same shape of y
+    """
+    y = np.asarray(y,dtype=float)
+    y2d = y.reshape(y.shape[0],-1)
+
+    yw = np.zeros(y2d.shape)
+    if use_numba():
+        _exp_wgh_avg_kernel(y2d, float(beta), yw)
+    elif y2d.shape[0] > 1:
+        yw[1:] = signal.lfilter([1-beta],[1,-beta],y2d[1:],axis=0)
+
+    bias_correction = 1 - np.power(beta,np.arange(y2d.shape[0]))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yw = np.nan_to_num(yw / bias_correction[:,None])
+
+    return yw.reshape(y.shape)
 
 def beta_from_days(days):
     return 1 - (1/days)
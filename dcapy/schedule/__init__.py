@@ -1 +1,2 @@
-from .schedule import Period, Scenario, Well, WellsGroup, model_from_dict
\ No newline at end of file
+from .schedule import Period, Scenario, Well, WellsGroup, model_from_dict, ExecutorEnum
+from .portfolio import SolverEnum, select_options
\ No newline at end of file
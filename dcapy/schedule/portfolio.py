@@ -0,0 +1,115 @@
+import numpy as np
+from enum import Enum
+from scipy.optimize import linprog
+
+try:
+    from scipy.optimize import milp, LinearConstraint, Bounds
+except ImportError:
+    milp = None
+
+milp_available = milp is not None
+
+class SolverEnum(str, Enum):
+    milp = 'milp'
+    greedy = 'greedy'
+
+def _relaxation_order(value:np.ndarray, one_hot:np.ndarray, A_ub:np.ndarray, b_ub:np.ndarray, required:bool)->np.ndarray:
+    #Options sorted by their fraction in the solution of the linear relaxation of the problem. 
+    #None if the relaxation can not be solved
+    kw = {'A_eq':one_hot, 'b_eq':np.ones(one_hot.shape[0])} if required else {}
+    A = A_ub if required else np.vstack([A_ub, one_hot])
+    b = b_ub if required else np.concatenate([b_ub, np.ones(one_hot.shape[0])])
+    res = linprog(-value, A_ub=A if A.shape[0] > 0 else None, b_ub=b if A.shape[0] > 0 else None, bounds=(0,1), **kw)
+    if res.status != 0:
+        return None
+    return np.lexsort((-value, -res.x))
+
+def _greedy(value:np.ndarray, groups:np.ndarray, one_hot:np.ndarray, A_ub:np.ndarray, b_ub:np.ndarray, required:bool)->np.ndarray:
+    #The options are added in the order of the linear relaxation while the constraints with non negative 
+    #coefficients hold. Then, at every step, a group moves to the option with the largest gain of value per 
+    #share of the resources it adds. The shares are relative to the upper bounds
+    n_groups = one_hot.shape[0]
+    packing = (A_ub >= 0).all(axis=1)
+    with np.errstate(divide='ignore'):
+        scale = np.where(b_ub[packing] > 0, 1 / b_ub[packing], 1e12)
+    fits = lambda use: np.all(use[packing] <= b_ub[packing] + 1e-9)
+    share = (A_ub[packing] * scale[:,None]).sum(axis=0)
+
+    order = _relaxation_order(value, one_hot, A_ub, b_ub, required)
+    if order is None:
+        order = np.lexsort((-value, share))
+    chosen = np.full(n_groups, -1)
+    used = np.zeros(b_ub.shape[0])
+    for j in order:
+        if chosen[groups[j]] < 0 and (value[j] > 0 or required) and fits(used + A_ub[:,j]):
+            chosen[groups[j]] = j
+            used = used + A_ub[:,j]
+
+    while True:
+        current = chosen[groups]
+        gain = value - np.where(current >= 0, value[current], 0)
+        delta = A_ub - np.where(current >= 0, A_ub[:,current], 0)
+        candidates = np.flatnonzero(np.all(used[packing,None] + delta[packing] <= b_ub[packing,None] + 1e-9, axis=0) & (gain > 1e-12))
+        if candidates.shape[0] == 0:
+            break
+        added = (np.clip(delta[packing][:,candidates], 0, None) * scale[:,None]).sum(axis=0)
+        with np.errstate(divide='ignore'):
+            ratio = np.where(added > 0, gain[candidates] / added, np.inf)
+        j = candidates[np.lexsort((gain[candidates], ratio))[-1]]
+        chosen[groups[j]] = j
+        used = used + delta[:,j]
+
+    if (required and (chosen < 0).any()) or not np.all(used <= b_ub + 1e-9):
+        raise ValueError('The greedy solver could not find a selection that satisfies the constraints')
+    x = np.zeros(value.shape[0], dtype=bool)
+    x[chosen[chosen >= 0]] = True
+    return x
+
+def select_options(value:np.ndarray, groups:np.ndarray, A_ub:np.ndarray=None, b_ub:np.ndarray=None,
+    required:bool=False, solver:SolverEnum=None)->np.ndarray:
+    """select_options Choose at most one option of every group to maximize the total value subject to
+    linear constraints on the selected options, A_ub @ x <= b_ub. Lower bounds are written as upper
+    bounds with the sign changed. The milp solver finds the optimal selection with the mixed integer
+    linear programming of scipy, available from scipy 1.9. The greedy solver rounds the solution of the
+    linear relaxation, adding the options by their fraction while the constraints with non negative
+    coefficients hold, and then moves groups to the options with the largest gain of value per share of
+    the resources. It is fast and usually close to the optimum but lower bounds may make it fail.
+
+    Args:
+        value (np.ndarray): Value of every option with shape (options,)
+        groups (np.ndarray): Group of every option. Integers from 0
+        A_ub (np.ndarray, optional): Coefficients of the constraints with shape (constraints, options). Defaults to None.
+        b_ub (np.ndarray, optional): Upper bounds of the constraints with shape (constraints,). Defaults to None.
+        required (bool, optional): Choose exactly one option of every group. Defaults to False.
+        solver (SolverEnum, optional): Either 'milp' or 'greedy'. Defaults to None, milp if scipy provides it.
+
+    Raises:
+        ValueError: The constraints can not be satisfied
+
+    Returns:
+        np.ndarray: Boolean array with the selected options
+    """
+    value = np.asarray(value, dtype=float)
+    groups = np.asarray(groups, dtype=int)
+    if A_ub is None:
+        A_ub, b_ub = np.zeros((0, value.shape[0])), np.zeros(0)
+    A_ub = np.atleast_2d(np.asarray(A_ub, dtype=float))
+    b_ub = np.atleast_1d(np.asarray(b_ub, dtype=float))
+    assert A_ub.shape == (b_ub.shape[0], value.shape[0])
+
+    one_hot = np.zeros((groups.max() + 1, value.shape[0]))
+    one_hot[groups, np.arange(value.shape[0])] = 1
+
+    solver = SolverEnum(solver) if solver is not None else (SolverEnum.milp if milp_available else SolverEnum.greedy)
+    if solver == SolverEnum.greedy:
+        return _greedy(value, groups, one_hot, A_ub, b_ub, required)
+    if not milp_available:
+        raise ValueError('scipy.optimize.milp is not available. Use the greedy solver')
+
+    constraints = [LinearConstraint(one_hot, 1 if required else 0, 1)]
+    if A_ub.shape[0] > 0:
+        constraints.append(LinearConstraint(A_ub, -np.inf, b_ub))
+    res = milp(-value, constraints=constraints, integrality=np.ones(value.shape[0]), bounds=Bounds(0, 1))
+    if not res.success:
+        raise ValueError(f'The selection could not be optimized. {res.message}')
+    return res.x > 0.5
@@ -1,6 +1,6 @@
 #External Imports
 from typing import Union, Optional, List, Dict
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, PrivateAttr
 from datetime import date, timedelta
 import pandas as pd
 import numpy as np
@@ -13,10 +13,15 @@ from rich.layout import Layout
 from rich.columns import Columns
 import requests
 from enum import Enum
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 #Local Imports
-from ..dca import Arps, Wor, FreqEnum, Forecast, converter_factor
-from ..cashflow import CashFlowModel, CashFlow, CashFlowParams, ChgPts, npv_cashflows, irr_cashflows
+from ..dca import Arps, Wor, ProbVar, FreqEnum, Forecast, converter_factor, ExecutorEnum, chunk_sizes, chunk_seeds, substream, worker_settings, init_worker, SamplingEnum
+from ..cashflow import CashFlowModel, CashFlow, CashFlowParams, ChgPts, CashFlowBlock, cashflow_block, npv_cashflows, irr_cashflows, npv_matrix, irr_matrix, fcf_grid
 from ..console import console
+from ..summary import Summary
+from .portfolio import SolverEnum, select_options
+from ..cache import stable_hash, get_cache
+from ..wiener import Brownian, MeanReversion, GeometricBrownian
 from ..auth import Credential
 import traceback
 # Put together all classes of DCA in a Union type. Pydantic uses this type to validate
@@ -38,6 +43,73 @@ class SchemasEnum(str, Enum):
     wellsgroup = 'wellsgroup'
 
 
+def _generate_forecast(model, kwargs:dict):
+	_f = model.generate_forecast(**kwargs)
+	return model, _f
+
+def map_forecasts(models:list, kwargs:list, executor:ExecutorEnum=None, workers:int=None)->list:
+	"""map_forecasts Call generate_forecast on every model with its keyword arguments. Optionally the
+	models are distributed over a pool of processes or threads. The results keep the order of the models 
+	and every model receives the same arguments it would receive serially, so the forecasts do not depend 
+	on the number of workers.
+
+	Args:
+		models (list): Schedule models. Period, Scenario, Well
+		kwargs (list): Keyword arguments of generate_forecast for every model
+		executor (ExecutorEnum, optional): Either 'process' or 'thread'. Defaults to None, run serially.
+		workers (int, optional): Maximum number of workers. Defaults to None.
+
+	Returns:
+		list: List of tuples with the model and its forecast DataFrame. When running on processes the 
+		models are copies of the original ones
+	"""
+	if executor is None or len(models) <= 1:
+		return [_generate_forecast(m,k) for m,k in zip(models,kwargs)]
+
+	#The workers use the same kind of seeds and backend as the caller
+	pool = ProcessPoolExecutor if ExecutorEnum(executor) == ExecutorEnum.process else ThreadPoolExecutor
+	with pool(max_workers=workers, initializer=init_worker, initargs=worker_settings()) as ex:
+		return list(ex.map(_generate_forecast, models, kwargs))
+
+def _iteration_value(values, i:int):
+	#Value of the iteration i out of the values returned by get_values. The Wiener processes are 
+	#returned as change points
+	if isinstance(values, pd.DataFrame):
+		idx = [d.to_timestamp().strftime('%Y-%m-%d') if isinstance(d,pd.Period) else d for d in values.index]
+		return ChgPts(date=idx, value=values.iloc[:,i].values.tolist())
+	return values[i]
+
+def forecast_matrices(forecast:pd.DataFrame, columns:List[str])->Dict[str,pd.DataFrame]:
+	"""forecast_matrices Tables of the forecast columns with one row per outcome and one column per date. 
+	The rows are summed over periods and wells at every date. Within a single well every iteration of 
+	every scenario is a different outcome, as in Well.generate_cashflow. Cumulative columns keep the last 
+	value of the periods that already ended.
+
+	Args:
+		forecast (pd.DataFrame): Forecast of a Period, Scenario, Well or WellsGroup
+		columns (List[str]): Forecast columns
+
+	Returns:
+		Dict[str,pd.DataFrame]: Table of every column
+	"""
+	df = forecast.reset_index()
+	single_well = 'well' not in df.columns or df['well'].nunique() <= 1
+	keys = ['scenario','iteration'] if 'scenario' in df.columns and single_well else ['iteration']
+	components = [i for i in ['well','period'] if i in df.columns]
+	tables = {}
+	for c in columns:
+		table = df.pivot_table(index=keys+components, columns='date', values=c, aggfunc='sum')
+		if c.endswith('_cum'):
+			table = table.ffill(axis=1)
+		tables[c] = table.groupby(level=keys).sum(min_count=1)
+	return tables
+
+def _grid_matrix(grid_start:int, values:np.ndarray, start:int, size:int)->np.ndarray:
+	#Place the columns of values, that begin at the ordinal grid_start, in a grid of size dates that begins at start
+	matrix = np.zeros((values.shape[0], size))
+	matrix[:,grid_start-start:grid_start-start+values.shape[1]] = values
+	return matrix
+
 class Depends(BaseModel):
     period : str = Field(...)
     delay : Union[timedelta,int] = Field(None)
@@ -51,6 +123,7 @@ class ScheduleBase(BaseModel):
 	seed: Optional[int] = Field(None)
 	iter : int = Field(1, ge=1)
 	ppf : Optional[float] = Field(None, ge=0, le=1)
+	sampling : Optional[SamplingEnum] = Field(None)
 	description: str = Field(None)
 	id: str = Field(None)
  
@@ -69,6 +142,118 @@ class ScheduleBase(BaseModel):
 	def irr(self, freq_output:str=None):
 		return irr_cashflows(self.cashflow, freq_output)
 
+	def _general_cashflow_model(self, general_cashflow_params:List[CashFlowParams], start, end, freq_output=None, seed=None, ppf=None, i:int=0)->CashFlowModel:
+		#Cashflow model of the general params of a scenario, a well or a group. They are not attached to 
+		#periods and span the dates of the forecast from start to end. i is the iteration of their values
+		is_date_mode = False if isinstance(start,(int,np.integer)) else True
+		cashflow_model_dict = {'name':self.name + '_genral'}
+		for gparam in general_cashflow_params:
+			if gparam.target not in cashflow_model_dict.keys():
+				cashflow_model_dict[gparam.target] = []
+			cashflow_dict = {}
+			cashflow_dict.update({
+				'name':gparam.name,
+				'start':start.strftime('%Y-%m-%d') if is_date_mode else start*converter_factor(freq_output,self.freq_input),
+				'end':end.strftime('%Y-%m-%d') if is_date_mode else end*converter_factor(freq_output,self.freq_input),
+				'freq_output':freq_output, 'freq_input':freq_output
+			})
+			#p_range = pd.period_range(start=cashflow_dict['start'], end=cashflow_dict['end'], freq=freq_output)
+			#steps = len(p_range)
+			#The values of the iterations are drawn at once. Without seed every call draws new samples
+			param_value = _iteration_value(gparam.get_values(i+1,freq_output=freq_output, ppf=ppf, seed=substream(seed,gparam.name)), i)
+			param_wi = _iteration_value(gparam.get_wis(i+1,freq_output=freq_output, ppf=ppf, seed=substream(seed,gparam.name)), i)
+
+			if gparam.freq_value:
+				freq_conv = converter_factor(gparam.freq_value,freq_output)
+			else:
+				freq_conv = 1
+
+			if isinstance(param_wi,ChgPts):
+				idx_wi = pd.to_datetime(param_wi.date).to_period(freq_output) if is_date_mode  else gparam.array_values.date
+				values_series_wi = pd.Series(param_wi.value, index=idx_wi)
+			else:
+				values_series_wi = param_wi
+
+			if isinstance(param_value,ChgPts):
+				idx = pd.to_datetime(param_value.date).to_period(freq_output) if is_date_mode  else param_value.date
+				values_series = pd.Series(param_value.value, index=idx)
+
+				_array_values = values_series.multiply(values_series_wi).dropna()
+				cashflow_dict.update({
+					'chgpts': ChgPts(date = _array_values.index.strftime('%Y-%m-%d').tolist(), value = _array_values.tolist())
+				})
+			else:
+				cashflow_dict.update({
+					'const_value':param_value * freq_conv *  values_series_wi,
+					'periods':gparam.periods
+				})
+
+			cashflow_model_dict[gparam.target].append(cashflow_dict)
+    
+		for key in cashflow_model_dict:
+			if len(cashflow_model_dict[key]) == 0:
+				del cashflow_model_dict[key]
+		
+		return CashFlowModel(**cashflow_model_dict)
+
+	def summarize(self, iter:int=None, chunksize:int=1000, seed:int=None, ppf:float=None, freq_output:str=None,
+		columns:List[str]=['oil_rate','oil_cum'], cashflow:bool=False, rates:list=None, freq_rate:str='A', freq_cashflow:str='M',
+		quantiles:List[float]=[0.1,0.5,0.9], compression:int=200, keep:bool=False, forecast_kw:dict={}, cashflow_kw:dict={})->Summary:
+		"""summarize Run the forecast, and optionally the cashflow, in chunks of iterations and reduce every chunk 
+		into a Summary before the next one is generated. The Summary keeps the running moments and quantile 
+		sketches of the forecast columns and the free cashflow by date and of the NPV by rate, so the memory 
+		is bounded by the chunk size. The values of every iteration are kept only if keep is True.
+
+		Args:
+			iter (int, optional): Number of iterations. Defaults to None, the iter attribute.
+			chunksize (int, optional): Maximum iterations per chunk. Defaults to 1000.
+			seed (int, optional): Seed. The chunks get independent seeds spawned from it. Defaults to None, the seed attribute.
+			ppf (float, optional): Percentil. Defaults to None.
+			freq_output (str, optional): Output frequency. Defaults to None.
+			columns (List[str], optional): Forecast columns. Defaults to ['oil_rate','oil_cum'].
+			cashflow (bool, optional): Summarize the free cashflow 'fcf'. Defaults to False.
+			rates (list, optional): Discount rates of the 'npv'. If given the cashflow is generated. Defaults to None.
+			freq_rate (str, optional): Frequency of the rates. Defaults to 'A'.
+			freq_cashflow (str, optional): Frequency of the cashflow. Defaults to 'M'.
+			quantiles (List[float], optional): Reported quantiles. Defaults to [0.1,0.5,0.9].
+			compression (int, optional): Compression of the quantile sketches. Defaults to 200.
+			keep (bool, optional): Keep the values of every iteration. Defaults to False.
+			forecast_kw (dict, optional): Additional keyword arguments of generate_forecast. Defaults to {}.
+			cashflow_kw (dict, optional): Additional keyword arguments of generate_cashflow. Defaults to {}.
+
+		Returns:
+			Summary: Summary of the forecast columns, 'fcf' and 'npv'
+		"""
+		if iter is None:
+			iter = self.iter
+
+		if seed is None:
+			seed = self.seed
+
+		if ppf is None:
+			ppf = self.ppf
+
+		summary = Summary(quantiles=quantiles, compression=compression, keep=keep)
+		sizes = chunk_sizes(iter, chunksize)
+		for size, chunk_seed in zip(sizes, chunk_seeds(seed, len(sizes))):
+			_forecast = self.generate_forecast(freq_output=freq_output, iter=size, seed=chunk_seed, ppf=ppf, **forecast_kw)
+			for c, table in forecast_matrices(_forecast, columns).items():
+				summary.update(c, table.values, index=table.columns)
+
+			if cashflow or rates is not None:
+				_cashflow = self.generate_cashflow(freq_output=freq_output, seed=chunk_seed, ppf=ppf, **cashflow_kw)
+				fcf = pd.concat([i.fcf(freq_output=freq_cashflow)['fcf'] for i in _cashflow], axis=1).T
+				summary.update('fcf', fcf.values, index=fcf.columns)
+				if rates is not None:
+					npv = self.npv(rates, freq_rate=freq_rate, freq_cashflow=freq_cashflow)
+					summary.update('npv', npv['npv'].values.reshape(-1, np.size(rates)), index=np.atleast_1d(rates))
+
+			#Deterministic models produce the same iterations in every chunk
+			if _forecast['iteration'].max() + 1 < size:
+				break
+
+		return summary
+
 	def to_file(self, file:str, format='yaml'):
 		with open(f'{file}.{format}','w') as f:
 			if format=='yaml':
@@ -172,6 +357,9 @@ class Period(ScheduleBase):
 	cum_limit: Optional[float] = Field(None, ge=0)
 	depends: Optional[Depends] = Field(None)
 	type: SchemasEnum = Field(SchemasEnum.period, const=True)
+	_cashflow_block: CashFlowBlock = PrivateAttr(None)
+	_forecast_key: tuple = PrivateAttr(None)
+	_end_dates: tuple = PrivateAttr(None)
 
 	# @validator('end')
 	# def start_end_match_type(cls,v,values):
@@ -189,50 +377,126 @@ class Period(ScheduleBase):
 		if isinstance(self.start,int):
 			return False
 
-	def generate_forecast(self, freq_output=None, iter=None, seed=None, ppf=None):
-		#If freq_output is not defined in the method. 
-  		# Use the freq_out defined in the class
-		if freq_output is None:
-			freq_output = self.freq_output
-
-		#If freq_output is not defined in the method. 
-  		# Use the freq_out defined in the class
-		if iter is None:
-			iter = self.iter
+	def _forecast_args(self, freq_output=None, iter=None, seed=None, ppf=None, sampling:SamplingEnum=None)->dict:
+		#If the arguments are not defined in the method. 
+  		# Use the ones defined in the class
+		return {
+			'freq_output': self.freq_output if freq_output is None else freq_output,
+			'iter': self.iter if iter is None else iter,
+			'seed': self.seed if seed is None else seed,
+			'ppf': self.ppf if ppf is None else ppf,
+			'sampling': self.sampling if sampling is None else sampling
+		}
 
-		if seed is None:
-			seed = self.seed
+	def forecast_key(self, freq_output=None, iter=None, seed=None, ppf=None, sampling:SamplingEnum=None)->Optional[str]:
+		"""forecast_key Hash of the inputs of the forecast, the dca model, the dates and limits of the period 
+		and the arguments of generate_forecast. As the dca ti of a dependent period is set from the end dates 
+		of the period it depends on, the key also changes when the upstream forecast changes.
+
+		Args:
+			freq_output (str, optional): Output frequency. Defaults to None.
+			iter (int, optional): Number of iterations. Defaults to None.
+			seed (int, optional): Seed. Defaults to None.
+			ppf (float, optional): Percentil. Defaults to None.
+			sampling (SamplingEnum, optional): Sampling strategy. Defaults to None.
+
+		Returns:
+			Optional[str]: Key. None when the forecast is not reproducible, that is, a probabilistic 
+			dca without seed nor ppf
+		"""
+		args = self._forecast_args(freq_output=freq_output, iter=iter, seed=seed, ppf=ppf, sampling=sampling)
+		probabilistic = any(isinstance(getattr(self.dca,i),ProbVar) for i in self.dca.__fields__)
+		if probabilistic and args['seed'] is None and args['ppf'] is None:
+			return None
+		inputs = self.json(include={'name','dca','start','end','time_list','freq_input','rate_limit','cum_limit'})
+		return stable_hash('forecast', inputs, args)
+
+	def cached_forecast(self, **kwargs)->Optional[pd.DataFrame]:
+		"""cached_forecast Present forecast if its inputs have not changed since it was generated with 
+		incremental or with a cache.
+
+		Args:
+			kwargs: Arguments of generate_forecast
+
+		Returns:
+			Optional[pd.DataFrame]: Copy of the forecast. None if it must be recomputed
+		"""
+		if self._forecast_key is None or self.forecast is None or self._forecast_key[0] is not self.forecast:
+			return None
+		key = self.forecast_key(**kwargs)
+		if key is None or key != self._forecast_key[1]:
+			return None
+		return self.forecast.df().copy()
+
+	def generate_forecast(self, freq_output=None, iter=None, seed=None, ppf=None, sampling:SamplingEnum=None, incremental:bool=False):
+		"""generate_forecast Forecast the dca model over the period.
+
+		Args:
+			freq_output (str, optional): Output frequency. Defaults to None.
+			iter (int, optional): Number of iterations. Defaults to None.
+			seed (int, optional): Seed. Defaults to None.
+			ppf (float, optional): Percentil. Defaults to None.
+			sampling (SamplingEnum, optional): Sampling strategy. Defaults to None.
+			incremental (bool, optional): Reuse the present forecast if the inputs have not changed since 
+				it was generated. Defaults to False.
+
+		Returns:
+			pd.DataFrame: Forecast
+		"""
+		args = self._forecast_args(freq_output=freq_output, iter=iter, seed=seed, ppf=ppf, sampling=sampling)
+		if incremental:
+			_forecast = self.cached_forecast(**args)
+			if _forecast is not None:
+				return _forecast
+
+		cache = get_cache()
+		key = self.forecast_key(**args) if incremental or cache is not None else None
+		_forecast = cache.get(key) if cache is not None and key is not None else None
    
-		if ppf is None:
-			ppf = self.ppf
-   
-		_forecast = self.dca.forecast(
-			time_list = self.time_list,start=self.start, end=self.end, freq_input=self.freq_input, 
-			freq_output=freq_output, rate_limit=self.rate_limit, 
-   			cum_limit=self.cum_limit, iter=iter, ppf=ppf, seed=seed
-		)
-		_forecast['period'] = self.name
+		if _forecast is None:
+			_forecast = self.dca.forecast(
+				time_list = self.time_list,start=self.start, end=self.end, freq_input=self.freq_input, 
+				rate_limit=self.rate_limit, cum_limit=self.cum_limit, **args
+			)
+			_forecast['period'] = self.name
+			if cache is not None and key is not None:
+				cache.put(key, _forecast)
 		
-		if self.dca.format()=='number':
-
-			self.forecast = Forecast(freq=freq_output,**_forecast.reset_index().to_dict(orient='list'))
-		else:
-
-			self.forecast = Forecast(freq=freq_output,**_forecast.to_timestamp().reset_index().to_dict(orient='list'))
+		self.forecast = Forecast.from_df(_forecast, freq=args['freq_output'])
+		self._forecast_key = (self.forecast, key) if key is not None else None
    
 		return _forecast
 
 	def get_end_dates(self):
 		if self.forecast:
-			_df = self.forecast.df().reset_index()
-			dates_sr = _df.groupby('iteration')['date'].max()
-			if self.dca.format()=='date':
-				return [i.to_timestamp().date() for i in dates_sr]
-			else:	
-				return [i for i in dates_sr]
+			#The end dates are kept while the forecast is the same object
+			if self._end_dates is None or self._end_dates[0] is not self.forecast:
+				_df = self.forecast.df().reset_index()
+				dates_sr = _df.groupby('iteration')['date'].max()
+				if self.dca.format()=='date':
+					dates = [i.to_timestamp().date() for i in dates_sr]
+				else:	
+					dates = [i for i in dates_sr]
+				self._end_dates = (self.forecast, dates)
+			return list(self._end_dates[1])
 		raise ValueError('There is no any Forecast')
 
-	def generate_cashflow(self, freq_output=None, add_name=None, seed=None, ppf=None,add_cash_params:list=None):
+	def generate_cashflow(self, freq_output=None, add_name=None, seed=None, ppf=None,add_cash_params:list=None, materialize:bool=True):
+		"""generate_cashflow Evaluate the cashflow params over the forecast. All the iterations are
+		evaluated at once as a CashFlowBlock, stored in the cashflow_block attribute. 
+
+		Args:
+			freq_output (str, optional): Output frequency. Defaults to None.
+			add_name (str, optional): Prefix to add to the cashflows names. Defaults to None.
+			seed (int, optional): Seed. Defaults to None.
+			ppf (float, optional): Percentil. Defaults to None.
+			add_cash_params (list, optional): Additional cashflow params. Defaults to None.
+			materialize (bool, optional): Return a list of CashFlowModels, one per iteration, and set them 
+				on the cashflow attribute. Otherwise return the CashFlowBlock. Defaults to True.
+
+		Returns:
+			Union[List[CashFlowModel],CashFlowBlock]: cashflows
+		"""
 		if freq_output is None:
 			freq_output = self.freq_output
    
@@ -244,29 +508,6 @@ class Period(ScheduleBase):
 
 		if self.forecast is not None and any([self.cashflow_params is not None,add_cash_params is not None]):
 
-			_forecast = self.forecast.df()
-
-			is_date_mode = self.date_mode()
-			#Format date
-
-			list_cashflow_model = []
-   
-			#Broadcast the number of iterations between the forecast and the cashflows to be consistent.
-			#Example: If the Forecast have 10 iterations the cashflow params must have either 10 or 1 iterations.
-   
-			shapes_to_broadcast = []
-   
-			#forecast iterations
-			forecast_iterations = _forecast['iteration'].unique()
-			shapes_to_broadcast.append(len(forecast_iterations))
-
-			#Forecast iterations shape.
-			#Example. If there's only one iteration in Forecast 
-			# the variable forecast_iterations would be = np.array([0]). 
-			# At the same time if the broadcasted shape is (10,) due to 10 iterations in cashflows params
-			# the iterate_new_shape would be np.array([0,0,0,0,0,0,0,0,0,0]). 
-			# This is done to make the 10 different cashflow models.
-			
 			#Iterate over list of cases
 			if self.cashflow_params is None:
 				cashflow_params = []
@@ -275,115 +516,60 @@ class Period(ScheduleBase):
 			if add_cash_params:
 				cashflow_params.extend(add_cash_params)
 
-			#Cashflows Iterations
-			for p in cashflow_params:
-				shapes_to_broadcast.append(p.iter)
-    
-			#shapes broadcast
-			shapes = np.broadcast_shapes(*shapes_to_broadcast)
-			iterate_new_shape = forecast_iterations * np.ones(shapes)
-    
-			if len(cashflow_params)==0:
-				raise ValueError('No Cashflow Params are set')
-			for i in range(shapes[0]):
-
-				_forecast_i = _forecast[_forecast['iteration']==iterate_new_shape[i]]
-
-				cashflow_model_dict = {'name':self.name + '_' + str(i)}
-				for param in cashflow_params:
-					#initialize the individual cashflow dict
-
-					if param.target not in cashflow_model_dict.keys():
-						cashflow_model_dict[param.target] = []
-
-					cashflow_dict = {}
-					
-					if add_name is None:
-						csh_name = self.name
-					else:
-						csh_name = add_name + '-' + self.name
-					#set the name
-					cashflow_dict.update({
-						'name':f'{param.name}_{csh_name}',
-						'start':_forecast_i.index.min().strftime('%Y-%m-%d') if is_date_mode else _forecast_i.index.min()*converter_factor(freq_output,self.freq_input),
-						'end':_forecast_i.index.max().strftime('%Y-%m-%d') if is_date_mode else _forecast_i.index.max()*converter_factor(freq_output,self.freq_input),
-						'freq_output':freq_output,'freq_input':freq_output
-					})
-					#p_range = pd.period_range(start=cashflow_dict['start'], end=cashflow_dict['end'], freq=freq_output)
-					#steps = len(p_range)
-					param_value = param.get_value(i,freq_output=freq_output, seed=seed, ppf=ppf)
-					param_wi = param.get_wi(i,freq_output=freq_output, seed=seed, ppf=ppf)
-     
-					if param.freq_value:
-						freq_conv = converter_factor(param.freq_value,freq_output)
-					else:
-						freq_conv = 1
-      
-					if isinstance(param_wi,ChgPts):
-						idx_wi = pd.to_datetime(param_wi.date).to_period(freq_output) if is_date_mode  else param.array_values.date
-						values_series_wi = pd.Series(param_wi.value, index=idx_wi)
-					else:
-						values_series_wi = param_wi
-					if param.multiply:
-						#Forecast Column name to multiply the param
-						#Check if the column exist in the forecast pandas dataframe
-						if param.multiply in _forecast_i.columns:
-							multiply_col = param.multiply
-						else:
-							print(f'{param.multiply} is not in forecast columns. {_forecast_i.columns}')
-							continue
-
-						if isinstance(param_value,ChgPts):
-							#If the array values date is a datetime.date convert to output frecuency
-							#to be consistent with the freq of the forecast when multiply
-							idx = pd.to_datetime(param_value.date).to_period(freq_output) if is_date_mode  else param_value.date
-							values_series = pd.Series(param_value.value, index=idx).groupby(level=0).agg(param.agg)
-							_array_values = _forecast_i[multiply_col].multiply(values_series).multiply(values_series_wi).dropna()
-
-							if _array_values.empty:
-								print(f'param {param.name} array values not multiplied with forecast. There is no index match')
-							else:
-								cashflow_dict.update({
-									'chgpts':{
-										'date':_array_values.index.strftime('%Y-%m-%d').tolist() if is_date_mode else _array_values.index.values.tolist(),
-										'value':_array_values.tolist()
-									}
-								})
-						else:         
-							_const_value = _forecast_i[multiply_col].multiply(param_value*freq_conv).multiply(values_series_wi)
-							cashflow_dict.update({'const_value':_const_value.tolist()})
-
-					else:
-						if isinstance(param_value,ChgPts):
-							idx = pd.to_datetime(param_value.date).to_period(freq_output) if is_date_mode  else param_value.date
-							values_series = pd.Series(param_value.value, index=idx).groupby(level=0).agg(param.agg)
-
-							_array_values = values_series.multiply(values_series_wi).dropna()
-							cashflow_dict.update({
-								'chgpts': ChgPts(date = _array_values.index.strftime('%Y-%m-%d').tolist(), value = _array_values.tolist())
-							})
-						else:
-							cashflow_dict.update({
-								'const_value':param_value * freq_conv * values_series_wi,
-								'periods':param.periods
-							})
-
-					cashflow_model_dict[param.target].append(cashflow_dict)
-
-				#Check all keys are not empty. Otherwise delete them
-
-				for key in cashflow_model_dict:
-					if len(cashflow_model_dict[key]) == 0:
-						del cashflow_model_dict[key]
-				cashflow_model = CashFlowModel(**cashflow_model_dict)
-				list_cashflow_model.append(cashflow_model)
+			if add_name is None:
+				csh_name = self.name
+			else:
+				csh_name = add_name + '-' + self.name
 
+			cache = get_cache()
+			key = self.cashflow_key(cashflow_params, csh_name=csh_name, freq_output=freq_output, seed=seed, ppf=ppf) if cache is not None else None
+			block = cache.get(key) if key is not None else None
+			if block is None:
+				block = cashflow_block(
+					self.forecast.df(), cashflow_params, self.name, csh_name=csh_name,
+					freq_output=freq_output, freq_input=self.freq_input, seed=seed, ppf=ppf
+				)
+				if key is not None:
+					cache.put(key, block)
+			self._cashflow_block = block
+
+			if not materialize:
+				return self._cashflow_block
+
+			list_cashflow_model = self._cashflow_block.to_models()
 			self.cashflow = list_cashflow_model
 
 			return list_cashflow_model
 		else:
 			raise ValueError('Either Forecast or Cashflow Params not defined')
 
+	def cashflow_key(self, cashflow_params:List[CashFlowParams], csh_name:str=None, freq_output:str=None, seed=None, ppf:float=None)->Optional[str]:
+		"""cashflow_key Hash of the inputs of the cashflow block, the key of the present forecast, the cashflow 
+		params and the arguments of generate_cashflow.
+
+		Args:
+			cashflow_params (List[CashFlowParams]): Cashflow params
+			csh_name (str, optional): Name of the cashflows. Defaults to None.
+			freq_output (str, optional): Output frequency. Defaults to None.
+			seed (int, optional): Seed. Defaults to None.
+			ppf (float, optional): Percentil. Defaults to None.
+
+		Returns:
+			Optional[str]: Key. None when the key of the forecast is unknown or the cashflow is not reproducible
+		"""
+		if self._forecast_key is None or self._forecast_key[0] is not self.forecast:
+			return None
+		probabilistic = any(
+			isinstance(getattr(c,i),(ProbVar,Brownian,MeanReversion,GeometricBrownian)) for c in cashflow_params for i in ['value','wi']
+		)
+		if probabilistic and seed is None and ppf is None:
+			return None
+		return stable_hash('cashflow', self._forecast_key[1], cashflow_params, self.name, csh_name, freq_output, self.freq_input, seed, ppf)
+
+	@property
+	def cashflow_block(self):
+		return self._cashflow_block
+
 	def tree(self, style='bold', guide_style='bold',show_emoji=True):
 		emoji = ':chart_with_downwards_trend:'
 		tree_text = emoji+self.name if show_emoji else self.name
@@ -425,7 +611,35 @@ class Scenario(ScheduleBase):
 
 	# TODO: Make validation for all periods are in the same time basis (Integers or date)
 
-	def generate_forecast(self, periods:list = None, freq_output=None, iter=None, seed=None, ppf=None):
+	def period_waves(self, periods:list = None)->List[List[str]]:
+		"""period_waves Order the periods by the Depends links between them. Every wave contains the periods 
+		whose period they depend on is in a previous wave or is not included in the periods to forecast.
+
+		Args:
+			periods (list, optional): Periods to include. Defaults to None, all of them.
+
+		Raises:
+			ValueError: Circular dependency between periods
+
+		Returns:
+			List[List[str]]: Waves of periods names
+		"""
+		if periods:
+			pending = [i for i in self.periods if i in periods]
+		else:
+			pending = list(self.periods.keys())
+
+		waves = []
+		while len(pending)>0:
+			ready = [p for p in pending if not self.periods[p].depends or self.periods[p].depends.period not in pending]
+			if len(ready)==0:
+				raise ValueError(f'Circular dependency between periods {pending}')
+			waves.append(ready)
+			pending = [p for p in pending if p not in ready]
+		return waves
+
+	def generate_forecast(self, periods:list = None, freq_output=None, iter=None, seed=None, ppf=None, sampling:SamplingEnum=None, 
+		executor:ExecutorEnum=None, workers:int=None, incremental:bool=False):
 		#if freq_output is None:
 		#	freq_output = self.freq_output
 		
@@ -444,29 +658,45 @@ class Scenario(ScheduleBase):
 		if ppf is None:
 			ppf = self.ppf
 
-		list_forecast = []
-		list_periods_errors = []
+		if sampling is None:
+			sampling = self.sampling
 
-		for p in _periods:
-			if self.periods[p].depends:
-				#Get the last dates of the forecast present period depends on
-				depend_period = self.periods[p].depends.period
-				new_ti = self.periods[depend_period].get_end_dates()
-    
-				# If delay is set. add the time delta
-				if self.periods[p].depends.delay:
-					new_ti = [i + self.periods[p].depends.delay for i in new_ti]
+		forecasts = {}
 
-				self.periods[p].dca.ti = new_ti
-			_f = self.periods[p].generate_forecast(freq_output=freq_output, iter=iter, seed=seed, ppf=ppf)
+		#Periods are forecasted by waves. A period is ready when the period it depends on 
+		#has been already forecasted or it is not included in the periods to forecast
+		for ready in self.period_waves(_periods):
+			for p in ready:
+				if self.periods[p].depends:
+					#Get the last dates of the forecast present period depends on
+					depend_period = self.periods[p].depends.period
+					new_ti = self.periods[depend_period].get_end_dates()
+		
+					# If delay is set. add the time delta
+					if self.periods[p].depends.delay:
+						new_ti = [i + self.periods[p].depends.delay for i in new_ti]
+
+					if self.periods[p].dca.ti != new_ti:
+						self.periods[p].dca.ti = new_ti
+
+			list_kw = {p:{'freq_output':freq_output, 'iter':iter, 'seed':substream(seed,p), 'ppf':ppf, 'sampling':sampling} for p in ready}
 			
-			#try:
-			#	_f = self.periods[p].generate_forecast()
-			#except Exception as e:
-			#	print(e)
-			#	listself.periods_errors.append(self.periods[p].name)
-			#else:
-			list_forecast.append(_f)
+			#With incremental, only the periods whose inputs or upstream end dates changed are forecasted
+			if incremental:
+				for p in ready:
+					_f = self.periods[p].cached_forecast(**list_kw[p])
+					if _f is not None:
+						forecasts[p] = _f
+				for p in list_kw:
+					list_kw[p]['incremental'] = True
+			stale = [p for p in ready if p not in forecasts]
+
+			results = map_forecasts([self.periods[p] for p in stale], [list_kw[p] for p in stale], executor=executor, workers=workers)
+			for p, (period, _f) in zip(stale, results):
+				self.periods[p] = period
+				forecasts[p] = _f
+
+		list_forecast = [forecasts[p] for p in _periods]
 
 
 		scenario_forecast = pd.concat(list_forecast, axis=0)
@@ -475,10 +705,7 @@ class Scenario(ScheduleBase):
 		fr_freq = freq_output
 		#fr_freq = scenario_forecast.index.freqstr[0]
 
-		if isinstance(scenario_forecast.index[0],pd.Period):
-			self.forecast = Forecast(freq=fr_freq,**scenario_forecast.to_timestamp().reset_index().to_dict(orient='list'))
-		else:
-			self.forecast = Forecast(freq=fr_freq,**scenario_forecast.reset_index().to_dict(orient='list'))
+		self.forecast = Forecast.from_df(scenario_forecast, freq=fr_freq)
 
 		return scenario_forecast
 
@@ -491,7 +718,7 @@ class Scenario(ScheduleBase):
 
 		n = []
 		for i in _periods:
-			n.append(np.array(self.periods[i].forecast.iteration).max()+1)
+			n.append(self.periods[i].forecast.df()['iteration'].max()+1)
 			if self.periods[i].cashflow_params is not None:
 				for j in self.periods[i].cashflow_params:
 					n.append(j.iter)
@@ -543,7 +770,7 @@ class Scenario(ScheduleBase):
 					csh_name = self.name
 				else:
 					csh_name = add_name + '-' + self.name
-				_cf = self.periods[p].generate_cashflow(freq_output=freq_output, add_name=csh_name, seed=seed, ppf=ppf, add_cash_params=pass_cashflow_params)
+				_cf = self.periods[p].generate_cashflow(freq_output=freq_output, add_name=csh_name, seed=substream(seed,p), ppf=ppf, add_cash_params=pass_cashflow_params)
 			except Exception as e:
 				print(p,e)
 				traceback.print_exc()
@@ -558,55 +785,9 @@ class Scenario(ScheduleBase):
 		#add scenario cashflow that is not attached to periods
 		if len(general_cashflow_params)>0:
 			_forecast = self.forecast.df()
-			is_date_mode = False if isinstance(_forecast.index[0],int) else True
-			cashflow_model_dict = {'name':self.name + '_genral'}
-			for gparam in general_cashflow_params:
-				if gparam.target not in cashflow_model_dict.keys():
-					cashflow_model_dict[gparam.target] = []
-				cashflow_dict = {}
-				cashflow_dict.update({
-					'name':gparam.name,
-					'start':_forecast.index.min().strftime('%Y-%m-%d') if is_date_mode else _forecast.index.min()*converter_factor(freq_output,self.freq_input),
-					'end':_forecast.index.max().strftime('%Y-%m-%d') if is_date_mode else _forecast.index.max()*converter_factor(freq_output,self.freq_input),
-					'freq_output':freq_output, 'freq_input':freq_output
-				})
-				#p_range = pd.period_range(start=cashflow_dict['start'], end=cashflow_dict['end'], freq=freq_output)
-				#steps = len(p_range)
-				param_value = gparam.get_value(i,freq_output=freq_output, ppf=ppf, seed=seed)
-				param_wi = gparam.get_wi(i,freq_output=freq_output, ppf=ppf, seed=seed)
-
-				if gparam.freq_value:
-					freq_conv = converter_factor(gparam.freq_value,freq_output)
-				else:
-					freq_conv = 1
-      
-				if isinstance(param_wi,ChgPts):
-					idx_wi = pd.to_datetime(param_wi.date).to_period(freq_output) if is_date_mode  else gparam.array_values.date
-					values_series_wi = pd.Series(param_wi.value, index=idx_wi)
-				else:
-					values_series_wi = param_wi
-
-				if isinstance(param_value,ChgPts):
-					idx = pd.to_datetime(param_value.date).to_period(freq_output) if is_date_mode  else param_value.date
-					values_series = pd.Series(param_value.value, index=idx)
-
-					_array_values = values_series.multiply(values_series_wi).dropna()
-					cashflow_dict.update({
-						'chgpts': ChgPts(date = _array_values.index.strftime('%Y-%m-%d').tolist(), value = _array_values.tolist())
-					})
-				else:
-					cashflow_dict.update({
-						'const_value':param_value * freq_conv * values_series_wi,
-						'periods':gparam.periods
-					})
-
-				cashflow_model_dict[gparam.target].append(cashflow_dict)
-    
-			for key in cashflow_model_dict:
-				if len(cashflow_model_dict[key]) == 0:
-					del cashflow_model_dict[key]
-			
-			cashflow_model_gen = CashFlowModel(**cashflow_model_dict)
+			cashflow_model_gen = self._general_cashflow_model(
+				general_cashflow_params, _forecast.index.min(), _forecast.index.max(), freq_output=freq_output, seed=seed, ppf=ppf, i=len(cashflow_models)-1
+			)
 
 			for c in cashflow_models:
 				c.append(cashflow_model_gen)
@@ -662,7 +843,8 @@ class Well(ScheduleBase):
 			return v 
 		raise ValueError(f'The format of the periods are different {format_list}')
 
-	def generate_forecast(self, scenarios:Union[list,dict] = None, freq_output=None, iter=None, seed=None, ppf=None):
+	def generate_forecast(self, scenarios:Union[list,dict] = None, freq_output=None, iter=None, seed=None, ppf=None, sampling:SamplingEnum=None, 
+		executor:ExecutorEnum=None, workers:int=None, incremental:bool=False):
 		#Make filter
 		if scenarios:
 			scenarios_list = scenarios if isinstance(scenarios,list) else list(scenarios.keys())
@@ -680,21 +862,25 @@ class Well(ScheduleBase):
    
 		if ppf is None:
 			ppf = self.ppf
+
+		if sampling is None:
+			sampling = self.sampling
   
+		list_kw = []
 		for s in _scenarios:
 			periods = scenarios[s] if isinstance(scenarios,dict) else None
-			_f = self.scenarios[s].generate_forecast(periods = periods, freq_output=freq_output, iter=iter, seed=seed, ppf=ppf)
+			list_kw.append({'periods':periods, 'freq_output':freq_output, 'iter':iter, 'seed':substream(seed,s), 'ppf':ppf, 'sampling':sampling, 'incremental':incremental})
 
+		results = map_forecasts([self.scenarios[s] for s in _scenarios], list_kw, executor=executor, workers=workers)
+		for s, (scenario, _f) in zip(_scenarios, results):
+			self.scenarios[s] = scenario
 			list_forecast.append(_f)
    
 		well_forecast = pd.concat(list_forecast, axis=0)
 		well_forecast['well'] = self.name
 		fr_freq = freq_output
 		#fr_freq = well_forecast.index.freqstr[0]
-		if isinstance(well_forecast.index[0],pd.Period):
-			self.forecast = Forecast(freq=fr_freq,**well_forecast.to_timestamp().reset_index().to_dict(orient='list'))
-		else:
-			self.forecast = Forecast(freq=fr_freq,**well_forecast.reset_index().to_dict(orient='list'))
+		self.forecast = Forecast.from_df(well_forecast, freq=fr_freq)
 
 		return well_forecast
 
@@ -735,62 +921,16 @@ class Well(ScheduleBase):
 			else:
 				csh_name = add_name + '-' + self.name
 			periods = scenarios[s] if isinstance(scenarios,dict) else None
-			cash_s = self.scenarios[s].generate_cashflow(periods=periods, freq_output=freq_output, add_name=csh_name, seed=seed, ppf=ppf, add_cash_params=pass_cashflow_params)
+			cash_s = self.scenarios[s].generate_cashflow(periods=periods, freq_output=freq_output, add_name=csh_name, seed=substream(seed,s), ppf=ppf, add_cash_params=pass_cashflow_params)
 
 			list_cashflows.extend(cash_s)
 
 		#add scenario cashflow that is not attached to periods
 		if len(general_cashflow_params)>0:
 			_forecast = self.forecast.df()
-			is_date_mode = False if isinstance(_forecast.index[0],int) else True
-			cashflow_model_dict = {'name':self.name + '_genral'}
-			for gparam in general_cashflow_params:
-				if gparam.target not in cashflow_model_dict.keys():
-					cashflow_model_dict[gparam.target] = []
-				cashflow_dict = {}
-				cashflow_dict.update({
-					'name':gparam.name,
-					'start':_forecast.index.min().strftime('%Y-%m-%d') if is_date_mode else _forecast.index.min()*converter_factor(freq_output,self.freq_input),
-					'end':_forecast.index.max().strftime('%Y-%m-%d') if is_date_mode else _forecast.index.max()*converter_factor(freq_output,self.freq_input),
-					'freq_output':freq_output, 'freq_input':freq_output
-				})
-				#p_range = pd.period_range(start=cashflow_dict['start'], end=cashflow_dict['end'], freq=freq_output)
-				#steps = len(p_range)
-				param_value = gparam.get_value(i,freq_output=freq_output, ppf=ppf, seed=seed)
-				param_wi = gparam.get_wi(i,freq_output=freq_output, ppf=ppf, seed=seed)
-    
-				if gparam.freq_value:
-					freq_conv = converter_factor(gparam.freq_value,freq_output)
-				else:
-					freq_conv = 1
-     
-				if isinstance(param_wi,ChgPts):
-					idx_wi = pd.to_datetime(param_wi.date).to_period(freq_output) if is_date_mode  else gparam.array_values.date
-					values_series_wi = pd.Series(param_wi.value, index=idx_wi)
-				else:
-					values_series_wi = param_wi
-
-				if isinstance(param_value,ChgPts):
-					idx = pd.to_datetime(param_value.date).to_period(freq_output) if is_date_mode  else param_value.date
-					values_series = pd.Series(param_value.value, index=idx)
-
-					_array_values = values_series.multiply(values_series_wi).dropna()
-					cashflow_dict.update({
-						'chgpts': ChgPts(date = _array_values.index.strftime('%Y-%m-%d').tolist(), value = _array_values.tolist())
-					})
-				else:
-					cashflow_dict.update({
-						'const_value':param_value * freq_conv * values_series_wi,
-						'periods':gparam.periods
-					})
-
-				cashflow_model_dict[gparam.target].append(cashflow_dict)
-    
-			for key in cashflow_model_dict:
-				if len(cashflow_model_dict[key]) == 0:
-					del cashflow_model_dict[key]
-			
-			cashflow_model_gen = CashFlowModel(**cashflow_model_dict)
+			cashflow_model_gen = self._general_cashflow_model(
+				general_cashflow_params, _forecast.index.min(), _forecast.index.max(), freq_output=freq_output, seed=seed, ppf=ppf, i=len(list_cashflows)-1
+			)
 
 			for c in list_cashflows:
 				c.append(cashflow_model_gen)
@@ -849,7 +989,8 @@ class WellsGroup(ScheduleBase):
 		raise ValueError(f'The format of the periods are different {format_list}')
 
 
-	def generate_forecast(self, wells:Union[list,dict] = None, freq_output=None, iter=None, seed=None, ppf=None):
+	def generate_forecast(self, wells:Union[list,dict] = None, freq_output=None, iter=None, seed=None, ppf=None, sampling:SamplingEnum=None, 
+		executor:ExecutorEnum=None, workers:int=None, incremental:bool=False):
 		#Make filter
 		if wells:
 			wells_list = wells if isinstance(wells,list) else list(wells.keys())
@@ -867,20 +1008,25 @@ class WellsGroup(ScheduleBase):
    
 		if ppf is None:
 			ppf = self.ppf
+
+		if sampling is None:
+			sampling = self.sampling
   
+		_wells = list(_wells)
+		list_kw = []
 		for w in _wells:
 			scenarios = wells[w] if isinstance(wells,dict) else None
-			_f = self.wells[w].generate_forecast(scenarios = scenarios, freq_output=freq_output, iter=iter, seed=seed, ppf=ppf)
+			list_kw.append({'scenarios':scenarios, 'freq_output':freq_output, 'iter':iter, 'seed':substream(seed,w), 'ppf':ppf, 'sampling':sampling, 'incremental':incremental})
 
+		results = map_forecasts([self.wells[w] for w in _wells], list_kw, executor=executor, workers=workers)
+		for w, (well, _f) in zip(_wells, results):
+			self.wells[w] = well
 			list_forecast.append(_f)
    
 		wells_forecast = pd.concat(list_forecast, axis=0)
 
 		fr_freq = freq_output
-		if isinstance(wells_forecast.index[0],pd.Period):
-			self.forecast = Forecast(freq=fr_freq,**wells_forecast.to_timestamp().reset_index().to_dict(orient='list'))
-		else:
-			self.forecast = Forecast(freq=fr_freq,**wells_forecast.reset_index().to_dict(orient='list'))
+		self.forecast = Forecast.from_df(wells_forecast, freq=fr_freq)
 
 		return wells_forecast
 
@@ -924,7 +1070,7 @@ class WellsGroup(ScheduleBase):
 			else:
 				csh_name = add_name + '-' + self.name
 			scenarios = wells[w] if isinstance(wells,dict) else None
-			cash_s = self.wells[w].generate_cashflow(scenarios=scenarios, freq_output=freq_output, add_name=csh_name, seed=seed, ppf=ppf, add_cash_params=pass_cashflow_params)
+			cash_s = self.wells[w].generate_cashflow(scenarios=scenarios, freq_output=freq_output, add_name=csh_name, seed=substream(seed,w), ppf=ppf, add_cash_params=pass_cashflow_params)
 
 			len_cashflows.append(len(cash_s))
    
@@ -943,55 +1089,9 @@ class WellsGroup(ScheduleBase):
 		#add scenario cashflow that is not attached to periods
 		if len(general_cashflow_params)>0:
 			_forecast = self.forecast.df()
-			is_date_mode = False if isinstance(_forecast.index[0],int) else True
-			cashflow_model_dict = {'name':self.name + '_genral'}
-			for gparam in general_cashflow_params:
-				if gparam.target not in cashflow_model_dict.keys():
-					cashflow_model_dict[gparam.target] = []
-				cashflow_dict = {}
-				cashflow_dict.update({
-					'name':gparam.name,
-					'start':_forecast.index.min().strftime('%Y-%m-%d') if is_date_mode else _forecast.index.min()*converter_factor(freq_output,self.freq_input),
-					'end':_forecast.index.max().strftime('%Y-%m-%d') if is_date_mode else _forecast.index.max()*converter_factor(freq_output,self.freq_input),
-					'freq_output':freq_output, 'freq_input':freq_output
-				})
-				#p_range = pd.period_range(start=cashflow_dict['start'], end=cashflow_dict['end'], freq=freq_output)
-				#steps = len(p_range)
-				param_value = gparam.get_value(i,freq_output=freq_output, ppf=ppf, seed=seed)
-				param_wi = gparam.get_wi(i,freq_output=freq_output, ppf=ppf, seed=seed)
-
-				if gparam.freq_value:
-					freq_conv = converter_factor(gparam.freq_value,freq_output)
-				else:
-					freq_conv = 1
-
-				if isinstance(param_wi,ChgPts):
-					idx_wi = pd.to_datetime(param_wi.date).to_period(freq_output) if is_date_mode  else gparam.array_values.date
-					values_series_wi = pd.Series(param_wi.value, index=idx_wi)
-				else:
-					values_series_wi = param_wi
-
-				if isinstance(param_value,ChgPts):
-					idx = pd.to_datetime(param_value.date).to_period(freq_output) if is_date_mode  else param_value.date
-					values_series = pd.Series(param_value.value, index=idx)
-
-					_array_values = values_series.multiply(values_series_wi).dropna()
-					cashflow_dict.update({
-						'chgpts': ChgPts(date = _array_values.index.strftime('%Y-%m-%d').tolist(), value = _array_values.tolist())
-					})
-				else:
-					cashflow_dict.update({
-						'const_value':param_value * freq_conv *  values_series_wi,
-						'periods':gparam.periods
-					})
-
-				cashflow_model_dict[gparam.target].append(cashflow_dict)
-    
-			for key in cashflow_model_dict:
-				if len(cashflow_model_dict[key]) == 0:
-					del cashflow_model_dict[key]
-			
-			cashflow_model_gen = CashFlowModel(**cashflow_model_dict)
+			cashflow_model_gen = self._general_cashflow_model(
+				general_cashflow_params, _forecast.index.min(), _forecast.index.max(), freq_output=freq_output, seed=seed, ppf=ppf, i=broadcast_shape-1
+			)
 
 			for c in list_cashflows_merged:
 				c.append(cashflow_model_gen)
@@ -1000,6 +1100,253 @@ class WellsGroup(ScheduleBase):
 
 		return list_cashflows_merged
 
+	def _scenarios_cashflows(self, pairs:list, freq_output=None, iter=None, seed=None, ppf=None)->list:
+		#Forecast and cashflow of every pair of well and scenario once, with the same seeds and cashflow 
+		#params they receive from generate_forecast and generate_cashflow of the group. The wells are 
+		#copied, so their forecast and cashflow are not modified
+		pass_cashflow_params = [i for i in (self.cashflow_params or []) if not i.general]
+		wells = {w: self.wells[w].copy(deep=True) for w in dict.fromkeys(w for w, _ in pairs)}
+		results = []
+		for w, s in pairs:
+			well = wells[w]
+			well.generate_forecast(scenarios=[s], freq_output=freq_output, iter=iter, seed=substream(seed,w), ppf=ppf)
+			index = well.forecast.df().index
+			models = well.generate_cashflow(
+				scenarios=[s], freq_output=freq_output, add_name=self.name, seed=substream(seed,w), ppf=ppf, 
+				add_cash_params=pass_cashflow_params if len(pass_cashflow_params)>0 else None
+			)
+			results.append({'span':(index.min(), index.max()), 'models':models, 'forecast':well.forecast.df()})
+		return results
+
+	def evaluate_combinations(self, combinations:list=None, rates=[0.1], freq_output:str='A', freq_rate:str='A', iter:int=None, 
+		seed=None, ppf:float=None, irr:bool=False, chunksize:int=100)->pd.DataFrame:
+		"""evaluate_combinations Net present value, and optionally internal rate of return, of combinations of 
+		well scenarios. Instead of running the forecast and cashflow of the group once per combination, the 
+		free cashflow of every well scenario is computed once on a common grid of dates and the combinations 
+		are scored by adding them. The general cashflow params of the group are evaluated once per distinct 
+		span of dates. The results match the npv of the group filtered by every combination when the 
+		cashflows are discounted in freq_output. The grid is continuous, so the dates without cashflows 
+		between periods are also discounted. The wells are evaluated on copies, so their forecast and cashflow 
+		do not change.
+
+		Args:
+			combinations (list, optional): Dictionaries of wells and scenarios as returned by scenarios_maker. 
+				Defaults to None, all the combinations of scenarios_maker.
+			rates (list, optional): Discount rates. Defaults to [0.1].
+			freq_output (str, optional): Frequency of the forecasts and cashflows. Defaults to 'A'.
+			freq_rate (str, optional): Frequency of the discount rates. Defaults to 'A'.
+			iter (int, optional): Number of iterations. Defaults to None.
+			seed (int, optional): Seed. Defaults to None.
+			ppf (float, optional): Percentil. Defaults to None.
+			irr (bool, optional): Add the internal rate of return. Defaults to False.
+			chunksize (int, optional): Number of combinations whose cashflows are added at once for the irr. 
+				Defaults to 100.
+
+		Returns:
+			pd.DataFrame: npv indexed by the rates with the combination and iteration columns, and the irr column
+		"""
+		if combinations is None:
+			combinations = self.scenarios_maker()
+   
+		if iter is None:
+			iter = self.iter
+
+		if seed is None:
+			seed = self.seed
+
+		if ppf is None:
+			ppf = self.ppf
+
+		general_cashflow_params = [i for i in (self.cashflow_params or []) if i.general]
+
+		#Every pair of well and scenario is evaluated once
+		members = [[(w,s) for w in comb for s in (comb[w] if isinstance(comb[w],list) else [comb[w]])] for comb in combinations]
+		pairs = {p:i for i, p in enumerate(dict.fromkeys(p for m in members for p in m))}
+		results = self._scenarios_cashflows(pairs, freq_output=freq_output, iter=iter, seed=seed, ppf=ppf)
+		grids = [fcf_grid(r['models'], freq_output) for r in results]
+		n_pairs = [g[1].shape[0] for g in grids]
+		n = np.broadcast_shapes(*[(i,) for i in n_pairs])[0]
+
+		#Combinations as rows of positions in the list of pairs. The last position is an empty pair 
+		#and the general cashflows of the group follow it
+		width = max(len(m) for m in members)
+		positions = np.full((len(members), width), len(pairs))
+		for i, m in enumerate(members):
+			positions[i,:len(m)] = [pairs[p] for p in m]
+		grids.append((0, np.zeros((1,0)), np.zeros(1, dtype=int)))
+		general = np.full(len(members), len(pairs))
+		if len(general_cashflow_params)>0:
+			spans = {}
+			for i, m in enumerate(members):
+				idx = [pairs[p] for p in m]
+				key = (
+					min(results[j]['span'][0] for j in idx), max(results[j]['span'][1] for j in idx), 
+					np.broadcast_shapes(*[(n_pairs[j],) for j in idx])[0]
+				)
+				if key not in spans:
+					model = self._general_cashflow_model(general_cashflow_params, key[0], key[1], freq_output=freq_output, seed=seed, ppf=ppf, i=key[2]-1)
+					spans[key] = len(grids)
+					grids.append(fcf_grid([model], freq_output))
+				general[i] = spans[key]
+
+		#Net present value of every pair discounted from the start of the common grid. The npv of a 
+		#combination is the sum of its pairs discounted back to the first date of the combination
+		rates = np.atleast_1d(rates)
+		rates_output = np.power(1 + rates, converter_factor(freq_rate, freq_output)) - 1
+		start = min([g[0] for g in grids if g[1].shape[1]>0] + [0])
+		size = max([g[0] + g[1].shape[1] - start for g in grids if g[1].shape[1]>0] + [0])
+		npv0 = np.zeros((len(grids), n, rates.shape[0]))
+		first = np.full((len(grids), n), size)
+		for k, (g_start, fcf, g_first) in enumerate(grids):
+			if fcf.shape[1] == 0:
+				continue
+			npv0[k] = npv_matrix(fcf, rates_output) * np.power(1 + rates_output, -(g_start - start))
+			first[k] = np.where(g_first < fcf.shape[1], g_first + g_start - start, size)
+
+		comb_npv = npv0[positions].sum(axis=1) + npv0[general]
+		comb_first = np.minimum(first[positions].min(axis=1), first[general])
+		npv = comb_npv * np.power(1 + rates_output, np.where(comb_first < size, comb_first, 0)[...,None])
+
+		result = pd.DataFrame({
+			'npv': npv.ravel(), 
+			'combination': np.repeat(np.arange(len(members)), n * rates.shape[0]),
+			'iteration': np.tile(np.repeat(np.arange(n), rates.shape[0]), len(members))
+		}, index=np.tile(rates, len(members) * n))
+
+		if irr:
+			matrix = np.stack([np.broadcast_to(_grid_matrix(g_start, fcf, start, size), (n, size)) for g_start, fcf, _ in grids])
+			comb_irr = np.concatenate([
+				irr_matrix((matrix[positions[i:i+chunksize]].sum(axis=1) + matrix[general[i:i+chunksize]]).reshape(-1, size))
+				for i in range(0, len(members), chunksize)
+			])
+			result['irr'] = np.repeat(comb_irr, rates.shape[0])
+		return result
+
+	def scenarios_economics(self, wells:Union[list,dict]=None, rate:float=0.1, freq_output:str='A', freq_rate:str='A', iter:int=None, 
+		seed=None, ppf:float=None, production:str='oil_volume')->Dict[str,pd.DataFrame]:
+		"""scenarios_economics Economics of every scenario of the wells. Each scenario is forecasted and evaluated 
+		once with the seeds and cashflow params it receives from the group. The values are means over the 
+		iterations and the dates are the periods of freq_output. The general cashflows of the group do not 
+		depend on the scenarios and are left out. The wells are evaluated on copies, so their forecast and cashflow 
+		do not change.
+
+		Args:
+			wells (Union[list,dict], optional): Wells, or dictionary of wells and scenarios, to include. Defaults to None.
+			rate (float, optional): Discount rate. Defaults to 0.1.
+			freq_output (str, optional): Frequency of the forecasts and cashflows. Defaults to 'A'.
+			freq_rate (str, optional): Frequency of the discount rate. Defaults to 'A'.
+			iter (int, optional): Number of iterations. Defaults to None.
+			seed (int, optional): Seed. Defaults to None.
+			ppf (float, optional): Percentil. Defaults to None.
+			production (str, optional): Forecast column of the production. Defaults to 'oil_volume'.
+
+		Returns:
+			Dict[str,pd.DataFrame]: Tables indexed by well and scenario. npv is discounted to the first date of all 
+			the scenarios. capex has the capital spent at every date as positive values, production the production 
+			at every date and starts is one at the first date of the forecast
+		"""
+		if iter is None:
+			iter = self.iter
+
+		if seed is None:
+			seed = self.seed
+
+		if ppf is None:
+			ppf = self.ppf
+
+		if wells:
+			wells_list = wells if isinstance(wells,list) else list(wells.keys())
+			_wells = [i for i in self.wells if i in wells_list]
+		else:
+			_wells = list(self.wells.keys())
+		pairs = [(w,s) for w in _wells for s in self.wells[w].scenarios if not isinstance(wells,dict) or s in wells[w]]
+		index = pd.MultiIndex.from_tuples(pairs, names=['well','scenario'])
+		if len(pairs) == 0:
+			empty = pd.DataFrame(index=index, columns=pd.PeriodIndex([], freq=freq_output, name='date'), dtype=float)
+			return {'npv': pd.DataFrame({'npv':[]}, index=index, dtype=float), 'capex': empty, 'production': empty.copy(), 'starts': empty.copy()}
+		results = self._scenarios_cashflows(pairs, freq_output=freq_output, iter=iter, seed=seed, ppf=ppf)
+		is_date_mode = isinstance(results[0]['forecast'].index, pd.PeriodIndex)
+
+		fcf = [fcf_grid(r['models'], freq_output) for r in results]
+		capex = [fcf_grid(r['models'], freq_output, targets=['capex']) for r in results]
+		prod, starts = [], []
+		for r in results:
+			_df = r['forecast']
+			table = _df.groupby(level=0)[production].sum() / _df['iteration'].nunique()
+			ordinals = table.index.asi8 if is_date_mode else np.asarray(table.index, dtype=int)
+			prod.append((ordinals, table.values))
+			starts.append(r['span'][0].ordinal if is_date_mode else int(r['span'][0]))
+
+		grids = [g for g in fcf + capex if g[1].shape[1]>0]
+		start = min([g[0] for g in grids] + [o.min() for o, _ in prod] + starts)
+		size = max([g[0] + g[1].shape[1] - start for g in grids] + [o.max() - start + 1 for o, _ in prod])
+
+		rate_output = np.power(1 + rate, converter_factor(freq_rate, freq_output)) - 1
+		npv = [np.mean(npv_matrix(f, rate_output)) * np.power(1 + rate_output, -(g_start - start)) for g_start, f, _ in fcf]
+		capex_matrix = np.stack([-_grid_matrix(g_start, c, start, size).mean(axis=0) for g_start, c, _ in capex])
+		prod_matrix = np.zeros((len(pairs), size))
+		starts_matrix = np.zeros((len(pairs), size))
+		for i, (o, v) in enumerate(prod):
+			prod_matrix[i, o - start] = v
+			starts_matrix[i, starts[i] - start] = 1
+
+		dates = pd.PeriodIndex(pd.arrays.PeriodArray(start + np.arange(size), dtype=pd.PeriodDtype(freq_output)), name='date') if is_date_mode else pd.Index(start + np.arange(size), name='date')
+		return {
+			'npv': pd.DataFrame({'npv':npv}, index=index),
+			'capex': pd.DataFrame(capex_matrix, index=index, columns=dates),
+			'production': pd.DataFrame(prod_matrix, index=index, columns=dates),
+			'starts': pd.DataFrame(starts_matrix, index=index, columns=dates)
+		}
+
+	def optimize_scenarios(self, wells:Union[list,dict]=None, capex_budget:Union[float,dict]=None, max_starts:Union[int,dict]=None, 
+		max_production:Union[float,dict]=None, min_production:Union[float,dict]=None, drop:bool=True, solver:SolverEnum=None, 
+		economics:Dict[str,pd.DataFrame]=None, **kwargs)->pd.DataFrame:
+		"""optimize_scenarios Choose one scenario of every well, or drop the well, to maximize the npv of the group 
+		subject to limits at every date of the capital spent, the number of wells that start, as a proxy of the rigs
+		available, and the production. The limits are either a value for all the dates or a dictionary of dates, 
+		like {'2023':5e6} with annual frequency. The economics of every scenario are computed once by 
+		scenarios_economics, so the size of the problem grows with the number of scenarios instead of the 
+		number of combinations.
+
+		Args:
+			wells (Union[list,dict], optional): Wells, or dictionary of wells and scenarios, to include. Defaults to None.
+			capex_budget (Union[float,dict], optional): Maximum capital spent. Defaults to None.
+			max_starts (Union[int,dict], optional): Maximum number of wells that start. Defaults to None.
+			max_production (Union[float,dict], optional): Maximum production. Defaults to None.
+			min_production (Union[float,dict], optional): Minimum production. Defaults to None.
+			drop (bool, optional): Allow to drop wells. Defaults to True.
+			solver (SolverEnum, optional): Either 'milp' or 'greedy'. Defaults to None, milp if scipy provides it.
+			economics (Dict[str,pd.DataFrame], optional): Tables returned by scenarios_economics. Defaults to None.
+			kwargs: Arguments of scenarios_economics
+
+		Returns:
+			pd.DataFrame: Selected scenario, null for the dropped wells, npv and capex of every well
+		"""
+		if economics is None:
+			economics = self.scenarios_economics(wells=wells, **kwargs)
+		index = economics['npv'].index
+		wells_index = index.get_level_values('well')
+		groups, wells_names = pd.factorize(wells_index)
+
+		A_ub, b_ub = [], []
+		for table, limit, sign in [(economics['capex'], capex_budget, 1), (economics['starts'], max_starts, 1), 
+			(economics['production'], max_production, 1), (economics['production'], min_production, -1)]:
+			if limit is None:
+				continue
+			limits = {str(k):v for k,v in limit.items()} if isinstance(limit,dict) else {str(c):limit for c in table.columns}
+			for c in table.columns:
+				if str(c) in limits:
+					A_ub.append(sign * table[c].values)
+					b_ub.append(sign * limits[str(c)])
+
+		selected = select_options(
+			economics['npv']['npv'].values, groups, np.reshape(A_ub, (-1, len(index))), np.array(b_ub), required=not drop, solver=solver
+		)
+		result = pd.DataFrame({'scenario':None, 'npv':0., 'capex':0.}, index=pd.Index(wells_names, name='well'))
+		for j in np.flatnonzero(selected):
+			result.loc[wells_index[j], ['scenario','npv','capex']] = [index[j][1], economics['npv']['npv'].iloc[j], economics['capex'].iloc[j].sum()]
+		return result
+
 	def scenarios_maker(self,wells:Union[list,dict]=None, reduce:int=1):
 		if wells:
 			wells_list = wells if isinstance(wells,list) else list(wells.keys())
@@ -0,0 +1 @@
+from .summary import Moments, QuantileSketch, Summary
\ No newline at end of file
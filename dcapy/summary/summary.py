@@ -0,0 +1,338 @@
+import copy
+import numpy as np
+import pandas as pd
+from typing import Union, List
+
+
+def _as_matrix(values:np.ndarray, size:int)->np.ndarray:
+    return np.asarray(values, dtype=float).reshape(-1, size)
+
+class Moments:
+    """Moments Running count, mean, variance, minimum and maximum of many columns. The chunks
+    are merged with the pairwise update of Chan et al., so the result does not depend on the chunk
+    sizes. NaN values are not counted.
+
+    Args:
+        size (int): Number of columns
+    """
+    def __init__(self, size:int):
+        self.size = size
+        self.count = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.nan)
+        self.max = np.full(size, np.nan)
+
+    def update(self, values:np.ndarray):
+        """update Add a chunk of observations
+
+        Args:
+            values (np.ndarray): Array of shape (k, size)
+        """
+        values = _as_matrix(values, self.size)
+        nb = np.sum(~np.isnan(values), axis=0).astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mb = np.nan_to_num(np.nansum(values, axis=0) / nb)
+            m2b = np.nansum(np.square(values - mb), axis=0)
+            n = self.count + nb
+            delta = mb - self.mean
+            self.mean = np.where(nb > 0, self.mean + delta * np.nan_to_num(nb / n), self.mean)
+            self.m2 = self.m2 + m2b + np.nan_to_num(np.square(delta) * self.count * nb / n)
+        self.count = n
+        self.min = np.fmin(self.min, np.fmin.reduce(values, axis=0, initial=np.nan))
+        self.max = np.fmax(self.max, np.fmax.reduce(values, axis=0, initial=np.nan))
+
+    def merge(self, other:'Moments'):
+        """merge Add the observations summarized by other Moments
+
+        Args:
+            other (Moments): Moments with the same size
+        """
+        assert other.size == self.size
+        n = self.count + other.count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = other.mean - self.mean
+            self.mean = np.where(other.count > 0, self.mean + delta * np.nan_to_num(other.count / n), self.mean)
+            self.m2 = self.m2 + other.m2 + np.nan_to_num(np.square(delta) * self.count * other.count / n)
+        self.count = n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+    def expand(self, positions:np.ndarray, size:int):
+        """expand Grow to size columns. The current columns move to positions and the new ones are empty
+
+        Args:
+            positions (np.ndarray): New position of every current column
+            size (int): New number of columns
+        """
+        for attr, fill in [('count',0.),('mean',0.),('m2',0.),('min',np.nan),('max',np.nan)]:
+            values = np.full(size, fill)
+            values[positions] = getattr(self, attr)
+            setattr(self, attr, values)
+        self.size = size
+
+    def std(self, ddof:int=0)->np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.m2 / (self.count - ddof))
+
+class QuantileSketch:
+    """QuantileSketch Merging digest that estimates the quantiles of many columns at once with
+    bounded memory. Each column keeps at most compression+1 weighted centroids. The centroids are
+    smaller near the tails, as in the t-digest arcsine scale, so extreme percentiles keep their
+    accuracy. While a column has no more than compression observations the quantiles are exact,
+    with the 'hazen' interpolation of np.quantile.
+
+    Args:
+        size (int): Number of columns
+        compression (int, optional): Maximum number of centroids. Defaults to 200.
+    """
+    def __init__(self, size:int, compression:int=200):
+        self.size = size
+        self.compression = compression
+        self.means = np.zeros((0, size))
+        self.weights = np.zeros((0, size))
+        self.count = np.zeros(size)
+        self.min = np.full(size, np.nan)
+        self.max = np.full(size, np.nan)
+
+    def _sort(self, means:np.ndarray, weights:np.ndarray):
+        # Empty centroids are moved to the bottom of each column and the rows
+        # empty in every column are dropped
+        order = np.argsort(np.where(weights > 0, means, np.inf), axis=0, kind='stable')
+        means = np.take_along_axis(means, order, axis=0)
+        weights = np.take_along_axis(weights, order, axis=0)
+        rows = int(np.sum(weights > 0, axis=0).max(initial=0))
+        return means[:rows], weights[:rows]
+
+    def _compress(self, means:np.ndarray, weights:np.ndarray):
+        cw = np.cumsum(weights, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q = np.nan_to_num((cw - weights / 2) / cw[-1])
+        k = self.compression / np.pi * (np.arcsin(np.clip(2 * q - 1, -1, 1)) + np.pi / 2)
+        bins = np.clip(np.floor(k).astype(int), 0, self.compression)
+
+        idx = (bins * self.size + np.arange(self.size)).ravel()
+        length = (self.compression + 1) * self.size
+        w = np.bincount(idx, weights=weights.ravel(), minlength=length).reshape(-1, self.size)
+        s = np.bincount(idx, weights=(np.where(weights > 0, means, 0) * weights).ravel(), minlength=length).reshape(-1, self.size)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            m = s / w
+        return self._sort(m, w)
+
+    def _add(self, means:np.ndarray, weights:np.ndarray):
+        means, weights = self._sort(np.vstack([self.means, means]), np.vstack([self.weights, weights]))
+        if means.shape[0] > self.compression:
+            means, weights = self._compress(means, weights)
+        self.means, self.weights = means, weights
+
+    def update(self, values:np.ndarray):
+        """update Add a chunk of observations. NaN values are not counted.
+
+        Args:
+            values (np.ndarray): Array of shape (k, size)
+        """
+        values = _as_matrix(values, self.size)
+        self.min = np.fmin(self.min, np.fmin.reduce(values, axis=0, initial=np.nan))
+        self.max = np.fmax(self.max, np.fmax.reduce(values, axis=0, initial=np.nan))
+
+        # np.sort leaves the NaN at the bottom, so large chunks are compressed on their own
+        # before being merged with the current centroids
+        values = np.sort(values, axis=0)
+        weights = (~np.isnan(values)).astype(float)
+        self.count = self.count + weights.sum(axis=0)
+        if values.shape[0] > self.compression:
+            values, weights = self._compress(values, weights)
+        self._add(values, weights)
+
+    def merge(self, other:'QuantileSketch'):
+        """merge Add the observations summarized by other sketch
+
+        Args:
+            other (QuantileSketch): Sketch with the same size
+        """
+        assert other.size == self.size
+        self.count = self.count + other.count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._add(other.means, other.weights)
+
+    def expand(self, positions:np.ndarray, size:int):
+        """expand Grow to size columns. The current columns move to positions and the new ones are empty
+
+        Args:
+            positions (np.ndarray): New position of every current column
+            size (int): New number of columns
+        """
+        for attr, fill in [('count',0.),('min',np.nan),('max',np.nan)]:
+            values = np.full(size, fill)
+            values[positions] = getattr(self, attr)
+            setattr(self, attr, values)
+        for attr in ['means','weights']:
+            values = np.zeros((self.means.shape[0], size))
+            values[:, positions] = getattr(self, attr)
+            setattr(self, attr, values)
+        self.size = size
+
+    def quantile(self, q:Union[float,List[float]])->np.ndarray:
+        """quantile Estimate the quantiles of every column
+
+        Args:
+            q (Union[float,List[float]]): Quantiles between 0 and 1
+
+        Returns:
+            np.ndarray: Array of shape (size,) for a float q or (len(q), size) for a list
+        """
+        qs = np.atleast_1d(q).astype(float)
+        assert np.all((qs >= 0) & (qs <= 1))
+
+        cw = np.cumsum(self.weights, axis=0)
+        empty = self.weights == 0
+        # Centroid midpoints anchored by the minimum at zero and the maximum at the count
+        x = np.vstack([np.zeros(self.size), np.where(empty, self.count, cw - self.weights / 2), self.count])
+        y = np.vstack([self.min, np.where(empty, self.max, self.means), self.max])
+
+        result = np.full((qs.shape[0], self.size), np.nan)
+        for i, qi in enumerate(qs):
+            t = qi * self.count
+            j = np.clip(np.sum(x <= t, axis=0) - 1, 0, x.shape[0] - 2)[None, :]
+            x0, x1 = np.take_along_axis(x, j, axis=0)[0], np.take_along_axis(x, j + 1, axis=0)[0]
+            y0, y1 = np.take_along_axis(y, j, axis=0)[0], np.take_along_axis(y, j + 1, axis=0)[0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[i] = np.where(x1 > x0, y0 + (y1 - y0) * (t - x0) / (x1 - x0), y0)
+        result[:, self.count == 0] = np.nan
+
+        return result[0] if np.ndim(q) == 0 else result
+
+class Summary:
+    """Summary Online summary of probabilistic results produced in chunks of iterations. Every
+    variable keeps running moments and a quantile sketch per index entry, for instance the dates
+    of a forecast, so the memory does not grow with the number of iterations. The full
+    iterations are kept only if keep is True.
+
+    Args:
+        quantiles (List[float], optional): Quantiles reported by df. Defaults to [0.1,0.5,0.9].
+        compression (int, optional): Compression of the quantile sketches. Defaults to 200.
+        keep (bool, optional): Keep the values of every iteration. Defaults to False.
+    """
+    def __init__(self, quantiles:List[float]=[0.1,0.5,0.9], compression:int=200, keep:bool=False):
+        self.quantiles = list(quantiles)
+        self.compression = compression
+        self.keep = keep
+        self.index = {}
+        self.moments = {}
+        self.sketches = {}
+        self.chunks = {}
+
+    @property
+    def names(self)->List[str]:
+        return list(self.index.keys())
+
+    def _align(self, name:str, index:pd.Index)->np.ndarray:
+        # Positions of index in the variable index. New entries are added to the variable
+        # and its moments and sketch grow with empty columns
+        if name not in self.index:
+            self.index[name] = index
+            self.moments[name] = Moments(len(index))
+            self.sketches[name] = QuantileSketch(len(index), compression=self.compression)
+            self.chunks[name] = []
+        elif not index.isin(self.index[name]).all():
+            current = self.index[name]
+            try:
+                expanded = current.append(index.difference(current)).sort_values()
+            except TypeError:
+                expanded = current.append(index.difference(current, sort=False))
+            positions = expanded.get_indexer(current)
+            self.moments[name].expand(positions, len(expanded))
+            self.sketches[name].expand(positions, len(expanded))
+            self.index[name] = expanded
+        return self.index[name].get_indexer(index)
+
+    def update(self, name:str, values:np.ndarray, index:Union[list,pd.Index]=None):
+        """update Add a chunk of iterations of a variable. The index may change between chunks, for 
+        instance when the forecasts of a chunk end later. The entries of the variable not present in
+        the chunk are not counted for its iterations.
+
+        Args:
+            name (str): Variable name
+            values (np.ndarray): Array of shape (k, len(index)). A scalar variable is given as (k,)
+            index (Union[list,pd.Index], optional): Index of the variable columns. It is required
+                for variables with more than one column. Defaults to None.
+        """
+        if index is None:
+            assert np.ndim(values) == 1 or name in self.index, 'The index is required for variables with more than one column'
+            index = self.index.get(name, pd.Index([name]))
+        index = pd.Index(index)
+        positions = self._align(name, index)
+
+        values = _as_matrix(values, len(index))
+        if not np.array_equal(positions, np.arange(len(self.index[name]))):
+            matrix = np.full((values.shape[0], len(self.index[name])), np.nan)
+            matrix[:, positions] = values
+            values = matrix
+
+        self.moments[name].update(values)
+        self.sketches[name].update(values)
+        if self.keep:
+            self.chunks[name].append((values, self.index[name]))
+
+    def merge(self, other:'Summary'):
+        """merge Add the iterations summarized by other Summary, for instance one computed by
+        another worker
+
+        Args:
+            other (Summary): Summary of the same variables
+        """
+        for name in other.names:
+            positions = self._align(name, other.index[name])
+            moments, sketch = copy.deepcopy(other.moments[name]), copy.deepcopy(other.sketches[name])
+            moments.expand(positions, len(self.index[name]))
+            sketch.expand(positions, len(self.index[name]))
+            self.moments[name].merge(moments)
+            self.sketches[name].merge(sketch)
+            if self.keep:
+                self.chunks[name].extend(other.chunks[name])
+
+    def iterations(self, name:str)->int:
+        return int(self.moments[name].count.max(initial=0))
+
+    def values(self, name:str)->pd.DataFrame:
+        """values Values of every iteration of a variable. Only available if keep is True
+
+        Args:
+            name (str): Variable name
+
+        Returns:
+            pd.DataFrame: Table with one row per iteration and one column per index entry
+        """
+        assert self.keep, 'The iterations are kept only if keep is True'
+        return pd.concat(
+            [pd.DataFrame(values, columns=index) for values, index in self.chunks[name]], ignore_index=True
+        ).reindex(columns=self.index[name])
+
+    def quantile(self, name:str, q:Union[float,List[float]])->np.ndarray:
+        return self.sketches[name].quantile(q)
+
+    def df(self, name:str=None)->pd.DataFrame:
+        """df Summary table with count, mean, std, min, max and the quantiles.
+
+        Args:
+            name (str, optional): Variable name. If None all variables are concatenated with
+                the variable name as first index level. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Summary table
+        """
+        if name is None:
+            return pd.concat({i: self.df(i) for i in self.names}, names=['variable'])
+
+        moments = self.moments[name]
+        table = pd.DataFrame({
+            'count': moments.count,
+            'mean': moments.mean,
+            'std': moments.std(),
+            'min': moments.min,
+            'max': moments.max
+        }, index=self.index[name])
+        for q, values in zip(self.quantiles, self.sketches[name].quantile(self.quantiles)):
+            table[f'p{round(q*100):g}'] = values
+        return table
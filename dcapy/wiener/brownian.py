@@ -8,6 +8,7 @@ from datetime import date
 #Local Imports
 from ..dca import list_freq, converter_factor, ProbVar
 from ..dca import FreqEnum
+from ..backend import jit, use_numba
 #from ..models import ChgPts
 
 class Weiner(BaseModel):
@@ -90,20 +91,22 @@ class Brownian(Weiner):
         else:
             epsilon = self.weiner_generator(steps,processes, seed=seed)
         
-        #Create zeros arrays for Weiner Process. Rows number of process, Columns Steps
-        w = np.zeros((processes,steps))
-        w[:,0] = self.initial_condition
-
         # Time Step size
         dt = converter_factor(self.freq_input,freq_output)
 
         #Drift for the Brownian Process
         mu = self.drift * dt       
 
-        #Weiner Process
-        for n in range(processes):
-            for t in range(1,steps):
-                w[n,t] = w[n,t-1] + mu + (epsilon[n,t]*np.sqrt(dt))
+        #Increments arrays for Weiner Process. Rows number of process, Columns the drift and the shock
+        #of every step, interleaved. The first column holds the initial condition
+        w = np.empty((processes, 2*steps - 1))
+        w[:,0] = self.initial_condition
+        w[:,1::2] = mu
+        w[:,2::2] = epsilon[:,1:]*np.sqrt(dt)
+
+        #Weiner Process. Cumulative sum of the increments along the steps. The sum is sequential, so 
+        #every step is (w[t-1] + mu) + shock, as when it was stepped one value at a time
+        w = np.cumsum(w,axis=1)[:,::2]
         
         idx = self.get_index_array(steps,freq_output)
         
@@ -148,10 +151,6 @@ class GeometricBrownian(Weiner):
         else:
             epsilon = self.weiner_generator(steps,processes, seed=seed)
         
-        #Create zeros arrays for Weiner Process. Rows number of process, Columns Steps
-        w = np.zeros((processes,steps))
-        w[:,0] = self.initial_condition
-        
         # Time Step size
         dt = converter_factor(self.freq_input,freq_output)
         
@@ -162,15 +161,28 @@ class GeometricBrownian(Weiner):
                
         drift = mu - var/2
 
-        #Weiner Process
-        for n in range(processes):
-            for t in range(1,steps):
-                w[n,t] = w[n,t-1]*np.exp(drift + (epsilon[n,t]*np.sqrt(dt)))
+        #Growth factors arrays for Weiner Process. Rows number of process, Columns Steps.
+        #The first column holds the initial condition
+        w = np.exp(drift + (epsilon*np.sqrt(dt)))
+        w[:,0] = self.initial_condition
+
+        #Weiner Process. Cumulative product of the growth factors along the steps, 
+        # which is the cumulative sum of the log returns
+        w = np.cumprod(w,axis=1)
         
         idx = self.get_index_array(steps,freq_output)
         
         return pd.DataFrame(w.T, index=idx,columns=range(processes))
 
+@jit
+def _mean_reversion_kernel(w, epsilon, m, eta):
+    #Loop version of the mean reversion recurrence for the numba backend
+    a = m * (1 - np.exp(-eta))
+    c = np.exp(-eta) - 1
+    for p in range(w.shape[0]):
+        for t in range(1,w.shape[1]):
+            w[p,t] = a + c * w[p,t-1] + epsilon[p,t] + w[p,t-1]
+
 class MeanReversion(Weiner):
     m : float = Field(0)
     eta : float = Field(0)
@@ -214,10 +226,12 @@ class MeanReversion(Weiner):
         m = self.m 
         eta = self.eta
         
-        #Weiner Process
-        for n in range(processes):
+        #Weiner Process. The recurrence is evaluated for all processes at once
+        if use_numba():
+            _mean_reversion_kernel(w, np.ascontiguousarray(epsilon, dtype=float), float(m), float(eta))
+        else:
             for t in range(1,steps):
-                w[n,t] = m * (1 - np.exp(-eta)) + (np.exp(-eta) - 1) * w[n,t-1] + epsilon[n,t] + w[n,t-1]
+                w[:,t] = m * (1 - np.exp(-eta)) + (np.exp(-eta) - 1) * w[:,t-1] + epsilon[:,t] + w[:,t-1]
 
         idx = self.get_index_array(steps,freq_output)
         
@@ -1,5 +1,9 @@
 import unittest
+import warnings
 import numpy as np
+import pandas as pd
+from datetime import date
+from pandas.testing import assert_frame_equal
 
 from dcapy import dca
 
@@ -50,6 +54,160 @@ class TestArpsBasic(unittest.TestCase):
         result = dca.arps_arm_cumulative(time1,qi1,di1,b)
         np.testing.assert_allclose(result,[0.,  783.33938208, 1069.75647695, 1314.09560061,2310.49060187])
 
-        
+    def test_arps_forecast_iterations(self):
+        a = dca.Arps(qi=[500,300],di=0.3,b=0.5,ti=0,freq_di='D',bsw=0.5)
+        f = a.forecast(start=0,end=5,freq_input='D',freq_output='D')
+        for i in range(2):
+            fi = f[f['iteration']==i]
+            np.testing.assert_allclose(fi['oil_volume'],np.gradient(fi['oil_cum'].values))
+            np.testing.assert_allclose(fi['water_cum'],np.cumsum(fi['water_rate'].values*np.diff(fi.index,prepend=0)))
+
+    def test_converter_factors(self):
+        for f in dca.list_freq:
+            for t in dca.list_freq:
+                assert dca.converter_factor(f,t) == dca.time_converter_matrix.loc[f,t]
+                assert dca.converter_factor(dca.FreqEnum(f),dca.FreqEnum(t)) == dca.time_converter_matrix.loc[f,t]
+        np.testing.assert_allclose(
+            dca.converter_factors(['A','M','D'],'D'),
+            [dca.converter_factor(i,'D') for i in ['A','M','D']]
+        )
+
+    def test_to_ordinal(self):
+        periods = pd.period_range('1969-11-01','2021-06-01',freq='M')
+        np.testing.assert_array_equal(dca.to_ordinal(periods),[i.to_timestamp().toordinal() for i in periods])
+        dates = pd.date_range('1965-01-01 12:00','2021-01-01',freq='17D')
+        np.testing.assert_array_equal(dca.to_ordinal(dates.values),[i.toordinal() for i in dates])
+        np.testing.assert_array_equal(dca.to_ordinal([date(2021,1,1)]),[date(2021,1,1).toordinal()])
+
+
+    def test_fit_arps_batch(self):
+        time = pd.date_range('2021-01-01',periods=120)
+        rates = {'w1':800*np.exp(-0.004*np.arange(120)), 'w2':dca.arps_hyp_rate(np.arange(120),1200,0.01,0.5)}
+        df = pd.concat([pd.DataFrame({'well':k,'time':time,'rate':v}) for k,v in rates.items()])
+        table = dca.fit_arps_batch(df, executor='thread')
+        assert table['success'].all()
+        for k,v in rates.items():
+            a = dca.Arps()
+            a.fit(time=time.values, rate=v)
+            np.testing.assert_allclose(table.loc[k,['qi','di','b']].astype(float), [a.qi,a.di,a.b])
+        models = dca.fit_arps_batch(df, executor=None, models=True)
+        np.testing.assert_allclose(models['w2'].qi, table.loc['w2','qi'])
+
+    def test_arps_jacobian(self):
+        t = np.arange(0,300,5.)
+        for qi, di, b in [(1000,0.01,0.),(1000,0.005,0.4),(800,0.01,1.)]:
+            jac = dca.arps_jacobian(t,qi,di,b)
+            h = 1e-6
+            num = np.column_stack([
+                (dca.arps_forecast(t,qi+h*qi,di,b) - dca.arps_forecast(t,qi-h*qi,di,b))/(2*h*qi),
+                (dca.arps_forecast(t,qi,di+h*di,b) - dca.arps_forecast(t,qi,di-h*di,b))/(2*h*di),
+                (dca.arps_forecast(t,qi,di,b+h) - dca.arps_forecast(t,qi,di,b-h))/(2*h) if b > 0 else jac[:,2]
+            ])
+            np.testing.assert_allclose(jac, num, rtol=1e-5, atol=1e-8)
+        #Exponential limit of the derivative with respect to b
+        np.testing.assert_allclose(dca.arps_jacobian(t,1000,0.01,0.)[:,2], 1000*np.exp(-0.01*t)*np.square(0.01*t)/2)
+
+    def test_arps_fit_warm_start(self):
+        t = np.arange(200.)
+        rate = dca.arps_hyp_rate(t,1000,0.01,0.5)
+        result = dca.arps_fit(t, rate)
+        np.testing.assert_allclose(result['popt'],[1000,0.01,0.5], rtol=1e-4)
+        warm = dca.arps_fit(t, rate, p0=result['popt'])
+        assert warm['nfev'] < result['nfev']
+
+    def test_arps_mixed_types(self):
+        time1 = np.arange(10)
+        qi, di, b = np.array([500,400,300]), np.array([0.3,0.2,0.1]), np.array([0,1,0.5])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            rate = dca.arps_forecast(time1,qi,di,b)
+            cum = dca.arps_cumulative(time1,qi,di,b)
+        np.testing.assert_allclose(rate[:,0], dca.arps_exp_rate(time1,500,0.3))
+        np.testing.assert_allclose(rate[:,2], dca.arps_hyp_rate(time1,300,0.1,0.5))
+        np.testing.assert_allclose(cum[:,0], dca.arps_exp_cumulative(time1,500,0.3))
+        np.testing.assert_allclose(cum[:,1], dca.arps_arm_cumulative(time1,400,0.2,1))
+        np.testing.assert_allclose(cum[:,2], dca.arps_hyp_cumulative(time1,300,0.1,0.5))
+
+    def test_arps_rate_cumulative(self):
+        time1 = np.arange(20)
+        qi, di, b = np.array([500,400,300]), np.array([0.3,0.2,0.1]), np.array([0,1,0.5])
+        out = tuple(np.empty((3,20)) for _ in range(3))
+        rate, cum, vol = dca.arps_rate_cumulative(time1,qi,di,b,volume=True,out=out)
+        assert rate is out[0] and cum is out[1] and vol is out[2]
+        np.testing.assert_array_equal(rate, dca.arps_forecast(time1,qi,di,b).T)
+        np.testing.assert_array_equal(cum, dca.arps_cumulative(time1,qi,di,b).T)
+        np.testing.assert_allclose(vol, np.gradient(cum,axis=1))
+
+        #Null cumulatives before ti are kept and taken as zero for the volume
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            rate, cum, vol = dca.arps_rate_cumulative(time1,qi,di,b,ti=[0,5,2],volume=True,out=out)
+        assert np.isnan(cum[1,:5]).all() and not np.isnan(cum[1,5:]).any()
+        np.testing.assert_array_equal(cum[2], dca.arps_cumulative(time1,300,0.1,0.5,ti=2))
+        np.testing.assert_allclose(vol, np.gradient(np.nan_to_num(cum),axis=1))
+
+    def test_arps_forecast_summary(self):
+        arps = dca.Arps(
+            qi={'dist':'norm','kw':{'loc':1000,'scale':100}}, di={'dist':'uniform','kw':{'loc':0.1,'scale':0.1}},
+            b=0.5, ti=date(2021,1,1), freq_di='A'
+        )
+        kw = dict(start=date(2021,1,1), end=date(2030,1,1), freq_output='M', rate_limit=300, seed=21)
+        single = arps.forecast(iter=150, **kw)
+        chunks = list(arps.forecast_chunks(iter=150, chunksize=150, **kw))
+        assert len(chunks) == 1
+        assert_frame_equal(chunks[0], single)
+
+        chunks = list(arps.forecast_chunks(iter=150, chunksize=40, **kw))
+        assert [c['iteration'].nunique() for c in chunks] == [40,40,40,30]
+        full = pd.concat(chunks)
+        assert full['iteration'].nunique() == 150
+
+        #The chunks share the output buffers but every chunk keeps its own values
+        first = arps.forecast(iter=40, **dict(kw, seed=dca.chunk_seeds(21, 4)[0]))
+        assert_frame_equal(chunks[0], first)
+        out = tuple(np.empty((50,200)) for _ in range(3))
+        assert_frame_equal(arps.forecast(iter=40, out=out, **dict(kw, seed=dca.chunk_seeds(21, 4)[0])), first)
+
+        summary = arps.forecast_summary(iter=150, chunksize=40, **kw)
+        rate = summary.df('oil_rate')
+        grouped = full.groupby('date')['oil_rate']
+        np.testing.assert_allclose(rate['mean'], grouped.mean().reindex(rate.index))
+        np.testing.assert_allclose(rate['p50'], grouped.quantile(0.5, interpolation='midpoint').reindex(rate.index), rtol=1e-2)
+        eur = full.groupby('iteration')['oil_cum'].max()
+        np.testing.assert_allclose(summary.df('eur')[['count','mean','max']].values[0], [150, eur.mean(), eur.max()])
+
+    def test_arps_forecast_sampling(self):
+        arps = dca.Arps(
+            qi={'dist':'norm','kw':{'loc':1000,'scale':100}}, di={'dist':'uniform','kw':{'loc':0.1,'scale':0.1}},
+            b=0.5, ti=date(2021,1,1), freq_di='A'
+        )
+        kw = dict(start=date(2021,1,1), end=date(2025,1,1), freq_output='A', iter=64, seed=21)
+        lhs = arps.forecast(sampling='lhs', **kw)
+        assert_frame_equal(lhs, arps.forecast(sampling='lhs', **kw))
+        assert_frame_equal(arps.forecast(**kw), arps.forecast(sampling='random', **kw))
+
+        first = lhs.groupby('iteration').first()
+        u_qi = dca.frozen_dist('norm', {'loc':1000,'scale':100}).cdf(first['oil_rate'])
+        np.testing.assert_array_equal(np.sort(np.floor(u_qi * 64)), np.arange(64))
+
+        ppf_qi, ppf_di, ppf_b = dca.design_ppfs([arps.qi,arps.di,arps.b], 64, sampling='lhs', seed=21)
+        assert ppf_b is None
+        np.testing.assert_array_equal(np.sort(np.floor(ppf_di * 64)), np.arange(64))
+        np.testing.assert_allclose(u_qi, ppf_qi)
+
+        for sampling in ['sobol','halton']:
+            f = arps.forecast(sampling=sampling, **kw).groupby('iteration').first()
+            assert f['oil_rate'].nunique() == 64
+
+        #The instance seed makes the designs reproducible
+        seeded = dca.Arps(
+            qi={'dist':'norm','kw':{'loc':1000,'scale':100}}, di={'dist':'uniform','kw':{'loc':0.1,'scale':0.1}},
+            b=0.5, ti=date(2021,1,1), freq_di='A', seed=21
+        )
+        kw.pop('seed')
+        for sampling in ['lhs','sobol']:
+            assert_frame_equal(seeded.forecast(sampling=sampling, **kw), seeded.forecast(sampling=sampling, **kw))
+            assert_frame_equal(seeded.forecast(sampling=sampling, **kw), arps.forecast(sampling=sampling, seed=21, **kw))
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from datetime import date
+from pandas.testing import assert_frame_equal
+
+import dcapy
+from dcapy.backend import numba_available
+from dcapy.dca import Wor, wor_forecast_batch, worker_settings, init_worker, get_legacy_seeds
+from dcapy.wiener import MeanReversion
+from dcapy.filters import exp_wgh_avg
+
+def run_backends(func):
+    results = []
+    for backend in ['numpy','numba']:
+        dcapy.set_backend(backend)
+        results.append(func())
+    dcapy.set_backend('numpy')
+    return results
+
+@unittest.skipUnless(numba_available, 'numba is not installed')
+class TestBackend(unittest.TestCase):
+    def tearDown(self):
+        dcapy.set_backend('numpy')
+
+    def test_set_backend(self):
+        dcapy.set_backend('numba')
+        assert dcapy.get_backend() == 'numba'
+        dcapy.set_backend('numpy')
+        assert dcapy.get_backend() == 'numpy'
+        with self.assertRaises(ValueError):
+            dcapy.set_backend('fortran')
+
+    def test_spawned_workers(self):
+        #Spawned processes import the package again and must get the backend of the caller
+        dcapy.set_backend('numba')
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=init_worker, initargs=worker_settings()) as ex:
+            assert ex.submit(dcapy.get_backend).result() == 'numba'
+            assert ex.submit(get_legacy_seeds).result() == False
+
+    def test_wor_forecast_batch(self):
+        time_array = np.tile(np.arange(0,1000,30.),(3,1))
+        kw = dict(fluid_rate=np.array([[1000.],[1200.],[800.]]), slope=[3e-5,2e-5,4e-5], wor_i=[0.5,0.3,0.8])
+        limits = [{}, {'rate_limit':200.}, {'cum_limit':2e5, 'wor_limit':5}]
+        for lim in limits:
+            (b_np, s_np), (b_nb, s_nb) = run_backends(lambda: wor_forecast_batch(time_array, **kw, **lim))
+            np.testing.assert_array_equal(s_np, s_nb)
+            np.testing.assert_allclose(b_np, b_nb, rtol=1e-12)
+
+    def test_wor_forecast(self):
+        wor = Wor(bsw=0.5, slope=3e-5, fluid_rate=1000., ti=date(2021,1,1))
+        f_np, f_nb = run_backends(lambda: wor.forecast(start=date(2021,1,1), end=date(2023,1,1), freq_output='M', rate_limit=150))
+        assert_frame_equal(f_np, f_nb, rtol=1e-12)
+
+    def test_mean_reversion(self):
+        mr = MeanReversion(initial_condition=60, ti=0, steps=50, processes=5, m=50, eta=0.1,
+            generator={'dist':'norm','kw':{'loc':0,'scale':2}})
+        w_np, w_nb = run_backends(lambda: mr.generate(seed=21))
+        assert_frame_equal(w_np, w_nb, rtol=1e-12)
+
+    def test_exp_wgh_avg(self):
+        y = np.random.default_rng(21).uniform(100,200,100)
+        y_np, y_nb = run_backends(lambda: exp_wgh_avg(y, 0.9))
+        np.testing.assert_allclose(y_np, y_nb, rtol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
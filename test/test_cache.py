@@ -0,0 +1,79 @@
+import unittest
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import date
+from pandas.testing import assert_frame_equal
+
+from dcapy.cache import ForecastCache, stable_hash, set_cache, get_cache
+from dcapy.dca import Arps
+from dcapy.schedule import Period
+from dcapy.cashflow import CashFlowParams
+
+class TestCache(unittest.TestCase):
+    def tearDown(self):
+        set_cache(None)
+
+    def test_stable_hash(self):
+        arps = Arps(qi=500, di=0.3, b=0, ti=date(2021,1,1))
+        assert stable_hash(arps, 1) == stable_hash(Arps(qi=500, di=0.3, b=0, ti=date(2021,1,1)), 1)
+        assert stable_hash(arps, 1) != stable_hash(arps, 2)
+        seq = np.random.SeedSequence(21)
+        assert stable_hash(seq) == stable_hash(np.random.SeedSequence(21))
+        assert stable_hash(seq) != stable_hash(np.random.SeedSequence(21, spawn_key=(1,)))
+
+    def test_lru_and_disk(self):
+        df = pd.DataFrame({'oil_rate':np.arange(10.), 'iteration':np.zeros(10,dtype=int), 'period':['p']*10},
+            index=pd.period_range('2021-01', periods=10, freq='M', name='date'))
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ForecastCache(max_bytes=2*size, directory=tmp)
+            assert cache.get('a') is None
+            cache.put('a', df)
+            cache.put('b', df)
+            cache.get('a')
+            cache.put('c', df)
+            assert len(cache) == 2 and cache.evictions == 1
+
+            #b was evicted from memory but it is read from disk
+            assert_frame_equal(cache.get('b'), df)
+            assert cache.stats()['hits'] == 2 and cache.disk_hits == 1 and cache.misses == 1
+
+            #The stored value does not change when the returned one is modified
+            cache.get('c')['oil_rate'] = 0
+            assert_frame_equal(ForecastCache(directory=tmp).get('c'), df)
+
+            cache.invalidate('c')
+            assert 'c' not in cache and 'a' in cache
+            cache.invalidate()
+            assert len(cache) == 0 and 'b' not in cache
+
+    def test_period_cache(self):
+        period = Period(name='p', dca=Arps(qi={'dist':'norm','kw':{'loc':1000,'scale':100}}, di=0.3, b=0, ti=date(2021,1,1), freq_di='A'),
+            start=date(2021,1,1), end=date(2025,1,1), freq_output='M',
+            cashflow_params=[CashFlowParams(name='oil_price', value=60, target='income', multiply='oil_volume'),
+                CashFlowParams(name='capex', value={'dist':'uniform','kw':{'loc':1e5,'scale':1e5}}, target='capex', periods=1)])
+        f = period.generate_forecast(iter=10, seed=21)
+        block = period.generate_cashflow(seed=21, materialize=False)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            set_cache(ForecastCache(directory=tmp))
+            for i in range(2):
+                assert_frame_equal(period.generate_forecast(iter=10, seed=21), f)
+                cached = period.generate_cashflow(seed=21, materialize=False)
+                np.testing.assert_array_equal(cached.values, block.values)
+                assert list(cached.dates) == list(block.dates) and cached.names == block.names
+            assert get_cache().stats()['hits'] == 2 and get_cache().misses == 2
+
+            #A new session reads the disk tier
+            set_cache(ForecastCache(directory=tmp))
+            period.generate_forecast(iter=10, seed=21)
+            period.generate_cashflow(seed=21, materialize=False)
+            assert get_cache().disk_hits == 2
+
+            #Results that are not reproducible are not cached
+            period.generate_forecast(iter=10)
+            assert get_cache().stats()['entries'] == 2
+
+if __name__ == '__main__':
+    unittest.main()
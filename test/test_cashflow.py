@@ -4,7 +4,9 @@ from datetime import date
 from pandas.testing import assert_frame_equal
 import pandas as pd
 
-from dcapy.cashflow import CashFlow, CashFlowModel
+from dcapy.cashflow import CashFlow, CashFlowModel, CashFlowParams, npv_matrix, irr_matrix
+from dcapy.dca import ProbVar
+import numpy_financial as npf
 
 class TestCashFlow(unittest.TestCase):
     def test_npv(self):
@@ -51,4 +53,45 @@ class TestCashFlow(unittest.TestCase):
             capex=[oil_capex]
         )
         print(cm.irr())
-        assert 0.28095 == round(cm.irr(),5)
\ No newline at end of file
+        assert 0.28095 == round(cm.irr(),5)
+
+    def test_npv_irr_matrix(self):
+        fcf = np.array([
+            [-100, 39, 59, 55, 20],
+            [-100, 0, 0, 74, 0],
+            [-100, 100, 0, -7, 0],
+            [-5, 10.5, 1, -8, 1],
+            [0, -100, 100, 0, 7],
+            [10, 20, 30, 0, 0]
+        ])
+        rates = [0, 0.08, 0.15]
+        npv = npv_matrix(fcf, rates)
+        assert npv.shape == (6,3)
+        np.testing.assert_allclose(npv, [[npf.npv(r,i) for r in rates] for i in fcf])
+
+        irr = irr_matrix(fcf)
+        np.testing.assert_allclose(irr[:5], [npf.irr(i) for i in fcf[:5]])
+        assert np.isnan(irr[5])
+
+    def test_probvar_samples(self):
+        pv = ProbVar(dist='norm', kw={'loc':10,'scale':1})
+        assert pv.get_instance() is ProbVar(dist='norm', kw={'scale':1,'loc':10}).get_instance()
+        pv.kw = {'loc':20,'scale':1}
+        assert pv.get_instance().mean() == 20
+
+        param = CashFlowParams(name='price', value={'dist':'norm','kw':{'loc':60,'scale':5}}, target='income')
+        values = param.get_values(50)
+        np.testing.assert_array_equal(np.concatenate([param.get_value(i) for i in range(50)]), values)
+        assert param.get_value(70).shape == (1,)
+        np.testing.assert_array_equal(param.value.take(slice(0,50)), values)
+
+        param.value.kw = {'loc':80,'scale':5}
+        assert not np.isin(param.get_value(0), values).any()
+
+        #Without drawn samples every call draws new ones, and every run draws its samples again
+        param = CashFlowParams(name='price', value={'dist':'norm','kw':{'loc':60,'scale':5}}, target='income')
+        assert np.unique(np.concatenate([param.get_value(0) for i in range(3)])).shape[0] == 3
+        param.draw(10)
+        first = np.concatenate([param.get_value(i) for i in range(10)])
+        param.draw(10)
+        assert not np.isin(np.concatenate([param.get_value(i) for i in range(10)]), first).any()
@@ -0,0 +1,79 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from dcapy.filters import exp_wgh_avg, beta_from_days, zscore, zscore_groups
+
+def exp_wgh_avg_loop(y, beta):
+    yw = np.zeros(y.shape[0])
+    for i in range(1,y.shape[0]):
+        yw[i] = beta*yw[i-1] + (1-beta)*y[i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(yw / (1 - np.power(beta,np.arange(y.shape[0]))))
+
+class TestFilters(unittest.TestCase):
+    def test_exp_wgh_avg(self):
+        y = np.random.default_rng(21).uniform(100,200,(365,4))
+        beta = beta_from_days(30)
+
+        ys = exp_wgh_avg(y, beta)
+        assert ys.shape == y.shape
+        for j in range(y.shape[1]):
+            np.testing.assert_allclose(ys[:,j], exp_wgh_avg_loop(y[:,j], beta), rtol=1e-12)
+            np.testing.assert_allclose(exp_wgh_avg(y[:,j], beta), ys[:,j], rtol=1e-12)
+        assert ys[0,0] == 0
+
+    def test_zscore_groups(self):
+        rng = np.random.default_rng(21)
+        wells = []
+        for i, n in enumerate([120, 90, 200]):
+            rate = 1000*np.exp(-0.002*np.arange(n)) * rng.normal(1, 0.05, n)
+            rate[rng.choice(n, 4, replace=False)] *= 3
+            wells.append(pd.DataFrame({
+                'well': f'well-{i}',
+                'time': pd.date_range('2021-01-01', periods=n, freq='D'),
+                'rate': rate
+            }))
+        df = pd.concat(wells, ignore_index=True).sample(frac=1, random_state=21).sort_values('time', kind='stable')
+
+        for window in [None, 30]:
+            mask = zscore_groups(df, thld=2, window=window)
+            for _, g in df.groupby('well'):
+                loc = df.index.get_indexer(g.index)
+                np.testing.assert_array_equal(mask[loc], zscore(g['time'].values, g['rate'].values, thld=2, window=window))
+
+        x = wells[0]['time'].values
+        y = wells[0]['rate'].values
+        dev = np.gradient(np.log(y)) / np.gradient(x.astype('datetime64[D]').astype(float))
+        np.testing.assert_array_equal(zscore(x, y), (np.abs(stats.zscore(dev)) > 2).astype(float))
+
+        dev = pd.Series(dev)
+        roll = dev.rolling(30, min_periods=1)
+        expected = (np.abs((dev - roll.mean()) / roll.std(ddof=0)) > 2).astype(float).values
+        np.testing.assert_array_equal(zscore(x, y, window=30), expected)
+
+    def test_zscore_groups_not_finite(self):
+        rng = np.random.default_rng(21)
+        n = 100
+        rate = 1000*np.exp(-0.002*np.arange(n)) * rng.normal(1, 0.02, n)
+        rate[[30, 70]] *= 3
+        well_a = pd.DataFrame({'well':'a', 'time':np.arange(n, dtype=float), 'rate':rate})
+        well_b = well_a.assign(well='b')
+        well_a.loc[20, 'rate'] = 0
+        well_a.loc[50, 'time'] = well_a.loc[49, 'time']
+        df = pd.concat([well_a, well_b], ignore_index=True)
+
+        for window in [None, 10]:
+            mask = zscore_groups(df, thld=2, window=window)
+            expected = zscore(well_b['time'].values, well_b['rate'].values, thld=2, window=window)
+            np.testing.assert_array_equal(mask[n:], expected)
+            assert expected[[29, 31, 69, 71]].all()
+
+            #The derivatives around the null rate and the repeated time are left out and do not hide the jumps
+            mask_a = mask[:n]
+            assert not mask_a[[19, 21, 49, 50, 51]].any()
+            assert mask_a[[29, 31, 69, 71]].all()
+
+if __name__ == '__main__':
+    unittest.main()
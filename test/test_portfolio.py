@@ -0,0 +1,109 @@
+import unittest
+import itertools
+import numpy as np
+
+from dcapy.schedule import WellsGroup, Well, Scenario, Period, select_options
+from dcapy.schedule.portfolio import milp_available
+from dcapy.cashflow import CashFlowParams
+
+def brute_force(value, groups, A_ub, b_ub, required=False):
+    options = [np.flatnonzero(groups==g).tolist() + ([] if required else [None]) for g in range(groups.max()+1)]
+    best = -np.inf
+    for combo in itertools.product(*options):
+        x = np.zeros(value.shape[0], dtype=bool)
+        x[[i for i in combo if i is not None]] = True
+        if np.all(A_ub @ x <= b_ub + 1e-9) and value[x].sum() > best:
+            best = value[x].sum()
+    return best
+
+class TestPortfolio(unittest.TestCase):
+    def options(self):
+        rng = np.random.default_rng(21)
+        groups = np.repeat(np.arange(6), 3)
+        value = rng.uniform(-1, 10, 18)
+        A_ub = rng.uniform(0, 5, (3, 18))
+        b_ub = np.array([10., 12., 8.])
+        return value, groups, A_ub, b_ub
+
+    @unittest.skipUnless(milp_available, 'scipy.optimize.milp is not available')
+    def test_select_options_milp(self):
+        value, groups, A_ub, b_ub = self.options()
+        for required in [False, True]:
+            x = select_options(value, groups, A_ub, b_ub, required=required, solver='milp')
+            assert np.isclose(value[x].sum(), brute_force(value, groups, A_ub, b_ub, required=required))
+            assert np.bincount(groups[x], minlength=6).max() <= 1
+
+        with self.assertRaises(ValueError):
+            select_options(value, groups, A_ub, -np.ones(3), required=True, solver='milp')
+
+    def test_select_options_greedy(self):
+        value, groups, A_ub, b_ub = self.options()
+        for required in [False, True]:
+            x = select_options(value, groups, A_ub, b_ub, required=required, solver='greedy')
+            assert np.all(A_ub @ x <= b_ub + 1e-9)
+            assert np.bincount(groups[x], minlength=6).max() <= 1
+            assert value[x].sum() >= 0.9 * brute_force(value, groups, A_ub, b_ub, required=required)
+        assert np.bincount(groups[select_options(value, groups, A_ub, b_ub, required=True, solver='greedy')]).min() == 1
+
+        with self.assertRaises(ValueError):
+            select_options(value, groups, A_ub, -np.ones(3), required=True, solver='greedy')
+
+    def group(self):
+        def period(qi, capex):
+            return Period(name='p', dca={'ti':'2022-01-01','di':0.3,'freq_di':'A','b':0,'qi':qi},
+                start='2022-01-01', end='2030-01-01', freq_output='A',
+                cashflow_params=[CashFlowParams(name='capex', value=-capex, target='capex', periods=1)])
+        wells = {
+            f'w{i}': Well(name=f'w{i}', scenarios={
+                'low': Scenario(name='low', periods=[period(200*(i+1), 1e6*(i+1))]),
+                'high': Scenario(name='high', periods=[period(300*(i+1), 2e6*(i+1))])
+            }) for i in range(3)
+        }
+        return WellsGroup(name='g', wells=wells,
+            cashflow_params=[CashFlowParams(name='income', value=20, target='income', multiply='oil_volume')])
+
+    def test_scenarios_economics(self):
+        group = self.group()
+        economics = group.scenarios_economics(rate=0.1)
+        assert list(economics['npv'].index) == [(w,s) for w in group.wells for s in ['low','high']]
+        np.testing.assert_allclose(economics['capex']['2022'].values, [1e6,2e6,2e6,4e6,3e6,6e6])
+        assert (economics['starts'].sum(axis=1) == 1).all()
+
+        #The wells of the group are not modified
+        assert all(w.forecast is None and w.cashflow is None for w in group.wells.values())
+
+        empty = group.scenarios_economics(wells={'w0':['none']})
+        assert all(empty[k].shape[0] == 0 for k in ['npv','capex','production','starts'])
+
+    @unittest.skipUnless(milp_available, 'scipy.optimize.milp is not available')
+    def test_optimize_scenarios_milp(self):
+        group = self.group()
+        economics = group.scenarios_economics(rate=0.1)
+        free = group.optimize_scenarios(economics=economics, solver='milp')
+        assert (free['scenario'] == 'high').all()
+
+        result = group.optimize_scenarios(economics=economics, capex_budget={'2022':7e6}, solver='milp')
+        assert result['capex'].sum() <= 7e6
+        npv = economics['npv']['npv']
+        capex = economics['capex']['2022']
+        best = max(
+            sum(npv[(w,s)] for w,s in zip(group.wells,combo) if s is not None)
+            for combo in itertools.product(['low','high',None], repeat=3)
+            if sum(capex[(w,s)] for w,s in zip(group.wells,combo) if s is not None) <= 7e6
+        )
+        np.testing.assert_allclose(result['npv'].sum(), best)
+
+    def test_optimize_scenarios_greedy(self):
+        group = self.group()
+        economics = group.scenarios_economics(rate=0.1)
+        free = group.optimize_scenarios(economics=economics, solver='greedy')
+        assert (free['scenario'] == 'high').all()
+
+        result = group.optimize_scenarios(economics=economics, capex_budget={'2022':7e6}, solver='greedy')
+        assert result['capex'].sum() <= 7e6 and result['scenario'].notna().any()
+
+        result = group.optimize_scenarios(economics=economics, max_starts=2, solver='greedy')
+        assert result['scenario'].notna().sum() == 2
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,13 +5,17 @@ from pandas.testing import assert_frame_equal
 import pandas as pd
 import os 
 import yaml
+import json
 
 from dcapy.wiener import Brownian, GeometricBrownian,MeanReversion
-from dcapy.dca import ProbVar
+from dcapy.dca import ProbVar, set_legacy_seeds, substream
 from dcapy.schedule import Period, Scenario, Well, model_from_dict
 from dcapy.cashflow import CashFlowParams
 
 class TestSchedule(unittest.TestCase):
+    def tearDown(self):
+        set_legacy_seeds(False)
+
     def test_period(self):
         p3cash_dict = {
             'name':'Period-1',
@@ -78,6 +82,8 @@ class TestSchedule(unittest.TestCase):
         assert_frame_equal(p3_cash.npv([0.1], freq_rate='A', freq_cashflow='M').reset_index(), pd.DataFrame(r))
     
     def test_scenario(self):
+        #The expected values come from integer seeds shared by every variable
+        set_legacy_seeds(True)
         p3_dict = {
             'name':'pdp',
             'dca': {
@@ -360,6 +366,8 @@ class TestSchedule(unittest.TestCase):
         assert_frame_equal(well_1.npv([0.1], freq_rate='A', freq_cashflow='A').reset_index(),pd.DataFrame(r))
         
     def test_group_wells(self):
+        #The expected values come from integer seeds shared by every variable
+        set_legacy_seeds(True)
         workdir = os.path.dirname(__file__)
         with open(os.path.join(workdir,'data','FDP_example1.yml'),'r') as file:
             lp_dict = yaml.safe_load(file)
@@ -378,4 +386,197 @@ class TestSchedule(unittest.TestCase):
         print(cwn[0].fcf(freq_output='A')['cum_fcf'].values)
         assert_frame_equal(pd.DataFrame(cwn[0].fcf(freq_output='A')['cum_fcf'].values), pd.DataFrame(r))
 
-            
\ No newline at end of file
+            
+    def test_period_forecast_serialization(self):
+        p = Period(
+            name = 'pdp',
+            dca = {'ti':'2021-01-01','di':0.3,'freq_di':'A','qi':700,'b':0,'fluid_rate':250.},
+            start = '2021-01-01',
+            end = '2021-12-01',
+            freq_output = 'M'
+        )
+        f = p.generate_forecast()
+        assert p.forecast.df() is f
+        
+        p_loaded = Period(**json.loads(p.json(exclude_none=True)))
+        np.testing.assert_allclose(p_loaded.forecast.df()['oil_rate'], f['oil_rate'])
+        assert p_loaded.forecast.date == p.forecast.date
+
+    def test_period_cashflow_block(self):
+        p = Period(
+            name = 'pdp',
+            dca = {'ti':'2021-01-01','di':0.3,'freq_di':'A','qi':[700,600,500],'b':0,'fluid_rate':250.},
+            start = '2021-01-01',
+            end = '2022-01-01',
+            freq_output = 'M',
+            rate_limit = 300,
+            cashflow_params = [
+                {'name':'fix_opex','value':-5000,'target':'opex','freq_value':'M'},
+                {'name':'income','value':60,'target':'income','multiply':'oil_volume','wi':0.9},
+                {'name':'capex_drill','value':-3000000,'target':'capex','periods':1},
+                {'name':'abandon','value':-100000,'target':'capex','periods':-1}
+            ]
+        )
+        p.generate_forecast()
+        block = p.generate_cashflow(materialize=False)
+        assert p.cashflow is None
+        assert block.values.shape[:2] == (4,3)
+
+        models = block.to_models()
+        fcf = block.fcf()
+        for i, m in enumerate(models):
+            m_fcf = m.fcf()
+            pos = block.dates.get_indexer(m_fcf.index)
+            np.testing.assert_allclose(fcf[i,pos], m_fcf['fcf'].values)
+            np.testing.assert_allclose(np.delete(fcf[i],pos), 0)
+
+        p.generate_cashflow()
+        np.testing.assert_allclose(block.npv([0.01,0.02])['npv'], p.npv([0.01,0.02],freq_rate='M')['npv'])
+        np.testing.assert_allclose(block.irr()['irr'], p.irr()['irr'])
+
+        #Params that multiply a column missing in the forecast are skipped with a warning
+        p.cashflow_params.append(CashFlowParams(name='gas_cost', value=-2, target='opex', multiply='gas_volume'))
+        with self.assertWarns(UserWarning):
+            block = p.generate_cashflow(materialize=False)
+        assert block.values.shape[:2] == (4,3)
+
+    def test_period_summarize(self):
+        #The expected values come from integer seeds shared by every variable
+        set_legacy_seeds(True)
+        p = Period(
+            name = 'pdp',
+            dca = {'ti':'2021-01-01','di':0.3,'freq_di':'A','qi':{'dist':'norm','kw':{'loc':700,'scale':50}},'b':0},
+            start = '2021-01-01',
+            end = '2023-01-01',
+            freq_output = 'M',
+            rate_limit = 450,
+            cashflow_params = [
+                {'name':'income','value':60,'target':'income','multiply':'oil_volume'},
+                {'name':'capex_drill','value':-300000,'target':'capex','periods':1}
+            ]
+        )
+        summary = p.summarize(iter=40, chunksize=40, seed=21, rates=[0.1], keep=True)
+        f = p.generate_forecast(iter=40, seed=21)
+        rate = summary.df('oil_rate')
+        np.testing.assert_allclose(rate['count'], f.groupby('date')['oil_rate'].count())
+        np.testing.assert_allclose(rate['mean'], f.groupby('date')['oil_rate'].mean())
+        p.generate_cashflow()
+        np.testing.assert_allclose(summary.values('npv')[0.1], p.npv([0.1])['npv'])
+
+        summary = p.summarize(iter=50, chunksize=20, seed=21, cashflow=True)
+        assert summary.iterations('oil_rate') == 50
+        assert summary.iterations('fcf') == 50
+        assert len(p.forecast.df()['iteration'].unique()) == 10
+        assert summary.df('oil_cum')['count'].iloc[-1] == 50
+
+    def test_scenario_random_streams(self):
+        period = {
+            'dca': {'ti':'2021-01-01','di':{'dist':'uniform','kw':{'loc':0.1,'scale':0.5}},'freq_di':'A',
+                'qi':{'dist':'uniform','kw':{'loc':500,'scale':100}},'b':0},
+            'start':'2021-01-01', 'end':'2022-01-01', 'freq_output':'M'
+        }
+        sc = Scenario(name='sc', periods=[Period(name='p1',**period), Period(name='p2',**period)])
+
+        for seed in [21, np.random.SeedSequence(21)]:
+            f = sc.generate_forecast(iter=20, freq_output='M', seed=seed)
+            assert_frame_equal(f, sc.generate_forecast(iter=20, freq_output='M', seed=seed))
+            first = f[f.index==f.index.min()]
+            p1 = first.loc[first['period']=='p1']
+            assert not np.isin(p1['oil_rate'].values, first.loc[first['period']=='p2','oil_rate'].values).any()
+
+            #qi and di come from independent substreams
+            rates = f.loc[f['period']=='p1','oil_rate'].values.reshape(20,-1)
+            assert abs(np.corrcoef(rates[:,0], np.log(rates[:,0]/rates[:,1]))[0,1]) < 0.9
+
+        #Legacy integer seeds share one stream between the periods
+        set_legacy_seeds(True)
+        f = sc.generate_forecast(iter=20, freq_output='M', seed=21)
+        first = f[f.index==f.index.min()]
+        np.testing.assert_array_equal(first.loc[first['period']=='p1','oil_rate'], first.loc[first['period']=='p2','oil_rate'])
+
+    def test_scenario_general_params_runs(self):
+        sc = Scenario(name='sc', periods=[
+            Period(name='p1', dca={'ti':'2021-01-01','di':0.3,'freq_di':'A','b':0,'qi':500}, start='2021-01-01', end='2022-01-01', freq_output='M',
+                cashflow_params=[CashFlowParams(name='oil_price', value=60, target='income', multiply='oil_volume')])
+            ],
+            cashflow_params=[CashFlowParams(name='capex', value={'dist':'uniform','kw':{'loc':1e5,'scale':1e5}}, target='capex', periods=1, general=True)]
+        )
+        sc.generate_forecast(iter=3, freq_output='M')
+
+        #Unseeded runs draw new samples of the general params
+        capex = [sc.generate_cashflow(freq_output='M')[0].capex[0].const_value for i in range(3)]
+        assert len(set(capex)) == 3
+
+        capex = [sc.generate_cashflow(freq_output='M', seed=21)[0].capex[0].const_value for i in range(2)]
+        assert capex[0] == capex[1]
+
+        #The values of the iterations are drawn at once from the substream of the param
+        param = sc.cashflow_params[0]
+        assert capex[0] == param.get_values(1, seed=substream(21,'capex'))[0]
+
+    def test_scenario_incremental(self):
+        def scenario():
+            return Scenario(name='sc', periods=[
+                Period(name='p1', dca={'ti':'2021-01-01','di':0.3,'freq_di':'A','b':0,
+                    'qi':{'dist':'norm','kw':{'loc':1000,'scale':100}}}, start='2021-01-01', end='2030-01-01', rate_limit=400, freq_output='M'),
+                Period(name='p2', dca={'ti':'2021-01-01','di':0.2,'freq_di':'A','qi':800,'b':0.5}, 
+                    start='2021-01-01', end='2040-01-01', rate_limit=200, freq_output='M', depends={'period':'p1'}),
+                Period(name='p3', dca={'ti':'2021-01-01','di':0.1,'freq_di':'A','qi':500,'b':0}, 
+                    start='2021-01-01', end='2050-01-01', freq_output='M', depends={'period':'p2','delay':30}),
+            ])
+        assert scenario().period_waves() == [['p1'],['p2'],['p3']]
+
+        sc = scenario()
+        kw = dict(iter=10, seed=21, freq_output='M')
+        f = sc.generate_forecast(incremental=True, **kw)
+        assert_frame_equal(f, scenario().generate_forecast(**kw))
+        forecasts = {p: sc.periods[p].forecast for p in sc.periods}
+        assert_frame_equal(f, sc.generate_forecast(incremental=True, **kw))
+        assert all(sc.periods[p].forecast is forecasts[p] for p in sc.periods)
+
+        #Only the modified period and the ones downstream are forecasted again
+        sc.periods['p2'].dca.di = 0.25
+        f = sc.generate_forecast(incremental=True, **kw)
+        assert [sc.periods[p].forecast is forecasts[p] for p in sc.periods] == [True, False, False]
+        ref = scenario()
+        ref.periods['p2'].dca.di = 0.25
+        assert_frame_equal(f, ref.generate_forecast(**kw))
+
+        #Probabilistic periods without seed are always forecasted
+        sc.generate_forecast(incremental=True, iter=10, freq_output='M')
+        assert sc.periods['p1'].forecast_key(iter=10) is None
+        assert sc.periods['p1'].forecast is not forecasts['p1']
+
+    def test_group_wells_executor(self):
+        workdir = os.path.dirname(__file__)
+        with open(os.path.join(workdir,'data','FDP_example1.yml'),'r') as file:
+            lp_dict = yaml.safe_load(file)
+        
+        sc = model_from_dict(lp_dict).scenarios_maker()
+        lp_serial = model_from_dict(lp_dict)
+        f_serial = lp_serial.generate_forecast(wells=sc[3],freq_output='A',iter=2, seed=21)
+        lp_serial.generate_cashflow(wells=sc[3],freq_output='A')
+        for executor in ['thread','process']:
+            lp = model_from_dict(lp_dict)
+            f = lp.generate_forecast(wells=sc[3],freq_output='A',iter=2, seed=21, executor=executor, workers=2)
+            assert_frame_equal(f, f_serial)
+            lp.generate_cashflow(wells=sc[3],freq_output='A')
+            assert_frame_equal(lp.npv([0.1]), lp_serial.npv([0.1]))
+
+    def test_group_wells_combinations(self):
+        workdir = os.path.dirname(__file__)
+        with open(os.path.join(workdir,'data','FDP_example1.yml'),'r') as file:
+            lp_dict = yaml.safe_load(file)
+
+        sc = model_from_dict(lp_dict).scenarios_maker()
+        result = model_from_dict(lp_dict).evaluate_combinations(sc, rates=[0.1,0.15], freq_output='A', iter=2, seed=21, irr=True)
+        assert result['combination'].nunique() == len(sc)
+        for i in [0,3]:
+            lp = model_from_dict(lp_dict)
+            lp.generate_forecast(wells=sc[i], freq_output='A', iter=2, seed=21)
+            lp.generate_cashflow(wells=sc[i], freq_output='A')
+            npv = lp.npv([0.1,0.15], freq_rate='A', freq_cashflow='A')
+            comb = result[result['combination']==i]
+            np.testing.assert_allclose(comb['npv'], npv['npv'])
+            np.testing.assert_array_equal(comb['iteration'], npv['iteration'])
+            np.testing.assert_allclose(comb['irr'].values[::2], lp.irr(freq_output='A')['irr'], rtol=1e-6)
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from dcapy.summary import Moments, QuantileSketch, Summary
+
+class TestSummary(unittest.TestCase):
+    def test_moments(self):
+        values = np.random.default_rng(21).lognormal(size=(1000,3))
+        values[:100,1] = np.nan
+        moments = Moments(3)
+        for chunk in np.array_split(values[:600], 7):
+            moments.update(chunk)
+        other = Moments(3)
+        other.update(values[600:])
+        moments.merge(other)
+
+        np.testing.assert_allclose(moments.count, [1000,900,1000])
+        np.testing.assert_allclose(moments.mean, np.nanmean(values, axis=0))
+        np.testing.assert_allclose(moments.std(), np.nanstd(values, axis=0))
+        np.testing.assert_array_equal(moments.max, np.nanmax(values, axis=0))
+
+    def test_quantile_sketch(self):
+        rng = np.random.default_rng(21)
+        q = [0, 0.01, 0.1, 0.5, 0.9, 0.99, 1]
+
+        values = rng.normal(size=(150,2))
+        values[:20,1] = np.nan
+        sketch = QuantileSketch(2)
+        sketch.update(values[:100])
+        sketch.update(values[100:])
+        expected = np.array([np.nanquantile(values[:,j], q, method='hazen') for j in range(2)]).T
+        np.testing.assert_allclose(sketch.quantile(q), expected)
+
+        values = rng.lognormal(size=(100000,2))
+        sketch = QuantileSketch(2, compression=100)
+        for chunk in np.array_split(values, 30):
+            sketch.update(chunk)
+        assert sketch.means.shape[0] <= 101
+        estimate = sketch.quantile(q)
+        for j in range(2):
+            np.testing.assert_allclose([np.mean(values[:,j] <= i) for i in estimate[:,j]], q, atol=2e-3)
+
+    def test_summary(self):
+        values = np.random.default_rng(21).normal(size=(500,4))
+        index = pd.period_range('2021-01', periods=4, freq='M')
+        summary = Summary(keep=True)
+        for chunk in np.array_split(values, 3):
+            summary.update('rate', chunk, index=index)
+            summary.update('npv', chunk[:,0])
+
+        assert summary.names == ['rate','npv']
+        assert summary.iterations('rate') == 500
+        np.testing.assert_array_equal(summary.values('rate').values, values)
+        table = summary.df()
+        assert list(table.columns) == ['count','mean','std','min','max','p10','p50','p90']
+        assert table.shape[0] == 5
+        np.testing.assert_allclose(summary.df('npv')['mean'], values[:,0].mean())
+
+if __name__ == '__main__':
+    unittest.main()
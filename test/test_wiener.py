@@ -7,6 +7,21 @@ import pandas as pd
 from dcapy.wiener import Brownian, GeometricBrownian,MeanReversion
 from dcapy.dca import ProbVar
 
+def loop_reference(model, epsilon, dt):
+    #Process stepped one value at a time from the same random draws
+    w = np.zeros(epsilon.shape)
+    w[:,0] = model.initial_condition
+    for n in range(epsilon.shape[0]):
+        for t in range(1,epsilon.shape[1]):
+            if isinstance(model, GeometricBrownian):
+                drift = model.drift * dt - np.power(model.generator.kw['scale'],2) * dt / 2
+                w[n,t] = w[n,t-1]*np.exp(drift + (epsilon[n,t]*np.sqrt(dt)))
+            elif isinstance(model, MeanReversion):
+                w[n,t] = model.m * (1 - np.exp(-model.eta)) + (np.exp(-model.eta) - 1) * w[n,t-1] + epsilon[n,t] + w[n,t-1]
+            else:
+                w[n,t] = w[n,t-1] + model.drift * dt + (epsilon[n,t]*np.sqrt(dt))
+    return w.T
+
 class TestWiener(unittest.TestCase):
     def test_brownian1(self):
         rw = Brownian()
@@ -100,6 +115,17 @@ class TestWiener(unittest.TestCase):
         
         assert_frame_equal(df.iloc[-5:,2:4], pd.DataFrame(r))
         
+    def test_loop_vs_vectorized(self):
+        models = [
+            Brownian(initial_condition=100, drift=0.2, generator=ProbVar(dist='norm', kw={'loc': 0, 'scale': 3}), freq_input='A'),
+            GeometricBrownian(initial_condition=80, generator=ProbVar(dist='norm',kw={'loc':0,'scale':0.26}), drift=0.01, freq_input='A'),
+            MeanReversion(initial_condition=66, generator={'dist':'norm','kw':{'loc':0,'scale':5.13}}, m=46.77, eta=0.112652, freq_input='A')
+        ]
+        for model in models:
+            df = model.generate(120, 30, freq_output='M', seed=21)
+            epsilon = model.weiner_generator(120, 30, seed=21)
+            np.testing.assert_array_equal(df.values, loop_reference(model, epsilon, 1/12))
+
     def test_mr(self):
         oil_mr = MeanReversion(
             initial_condition = 66,
@@ -7,6 +7,24 @@ from datetime import date
 from dcapy import dca
 from dcapy.schedule import Period
 
+def wor_reference(time_array, fluid_rate, slope, wor_i, rate_limit=None, cum_limit=None, wor_limit=None):
+    #Wor forecast of a single iteration stepped in a loop
+    delta_time = np.gradient(time_array)
+    n = time_array.shape[0]
+    wor, bsw, oil_rate, water_rate, oil_cum, water_cum, fluid_cum = [np.zeros(n) for _ in range(7)]
+    for i in range(n):
+        wor[i] = wor_i if i == 0 else np.exp(slope*oil_cum[i-1])*wor_i
+        bsw[i] = wor[i] / (wor[i] + 1)
+        oil_rate[i] = fluid_rate[i]*(1-bsw[i])
+        water_rate[i] = fluid_rate[i]*bsw[i]
+        oil_cum[i] = (oil_cum[i-1] if i > 0 else 0) + oil_rate[i]*delta_time[i]
+        water_cum[i] = (water_cum[i-1] if i > 0 else 0) + water_rate[i]*delta_time[i]
+        fluid_cum[i] = water_cum[i] + oil_cum[i]
+        if i > 0 and ((rate_limit and oil_rate[i] <= rate_limit) or (cum_limit and oil_cum[i] >= cum_limit) or (wor_limit and wor[i] >= wor_limit)):
+            break
+    columns = [oil_rate, water_rate, oil_cum, water_cum, bsw, wor, wor + 1, delta_time, fluid_rate, fluid_cum]
+    return np.stack(columns, axis=1)[:i+1]
+
 class TestArpsBasic(unittest.TestCase):
     def setUp(self):
         workdir = os.path.dirname(__file__)
@@ -22,6 +40,18 @@ class TestArpsBasic(unittest.TestCase):
         f1 = dca.wor_forecast(time1,fluid_rate,slope,wori, rate_limit=None, wor_limit=None, cum_limit=1e5)
         assert_frame_equal(f1, self.df1)
         
+    def test_wor_forecast_batch(self):
+        time1 = np.arange(0,30,1)
+        slope = np.array([3e-6,3e-5,6e-5])
+        wori = dca.bsw_to_wor(np.array([0.5,0.3,0.6]))
+        fluid_rate = np.linspace(5000,4000,30)
+        for limits in [{'rate_limit':2200,'cum_limit':1e5}, {'wor_limit':2.}, {}]:
+            block, steps = dca.wor_forecast_batch(np.tile(time1,(3,1)),fluid_rate,slope,wori, **limits)
+            for i in range(3):
+                ref = wor_reference(time1,fluid_rate,slope[i],wori[i], **limits)
+                assert steps[i] == ref.shape[0]
+                np.testing.assert_allclose(block[i,:steps[i],:], ref, rtol=1e-12)
+        
     def test_wor_class(self):
         bsw = 0.5
         slope = [3.5e-6,3e-6,4e-6]